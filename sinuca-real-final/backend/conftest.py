@@ -0,0 +1,145 @@
+"""
+Fixtures compartilhadas dos testes do backend
+
+Cada módulo de teste monta a sua aplicação com `make_app` (tabelas
+recriadas) numa fixture de escopo de módulo e semeia os dados com
+`create_users` e `open_bet`. Sem TEST_DATABASE_URL o banco é SQLite: em
+memória, ou um arquivo temporário em modo produção para os testes de
+concorrência (memória não tem concorrência).
+
+No PostgreSQL (as tabelas do banco são recriadas):
+    TEST_DATABASE_URL=postgresql://localhost/sinuca_real_test python -m pytest
+
+Uso: python -m pytest
+"""
+
+import itertools
+import os
+from contextlib import contextmanager
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager
+from sqlalchemy import event
+
+from src.models.database import db, init_database
+from src.models.user import User
+from src.models.game import Bet
+
+# Roteiro contra um servidor rodando (python test_payments.py), não é teste do pytest
+collect_ignore = ['test_payments.py']
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+_usernames = itertools.count()
+
+
+@pytest.fixture(scope='session')
+def make_app(tmp_path_factory):
+    """
+    Fábrica de aplicações de teste com as tabelas recriadas
+
+    `make_app(*blueprints, production=False)`: blueprints são pares
+    (blueprint, prefixo). Com production=True o banco é um arquivo SQLite
+    temporário em modo produção (WAL, escritor único).
+    """
+    def make(*blueprints, production=False):
+        uri = TEST_DATABASE_URL
+        if not uri:
+            uri = f"sqlite:///{tmp_path_factory.mktemp('sinuca') / 'test.db'}" if production else 'sqlite://'
+
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = uri
+        app.config['SECRET_KEY'] = 'test'
+        app.config['JWT_SECRET_KEY'] = 'test'
+        app.config['JWT_VERIFY_SUB'] = False  # identidade é o id inteiro do usuário
+        JWTManager(app)
+        init_database(app, production=production)
+        for blueprint, url_prefix in blueprints:
+            app.register_blueprint(blueprint, url_prefix=url_prefix)
+
+        with app.app_context():
+            db.drop_all(bind_key=None)  # só o banco principal (o bind de leitura é o mesmo arquivo)
+            db.create_all(bind_key=None)
+        return app
+
+    return make
+
+
+@pytest.fixture(scope='session')
+def create_users():
+    """`create_users(count, **campos)`: jogadores gravados (requer app context)"""
+    def create(count, **fields):
+        fields.setdefault('balance', Decimal('100.00'))
+        users = []
+        for _ in range(count):
+            i = next(_usernames)
+            users.append(User(email=f'jogador{i}@exemplo.com', username=f'jogador{i}',
+                              name=f'Jogador {i}', password_hash='x', **fields))
+        db.session.add_all(users)
+        db.session.commit()
+        return users
+
+    return create
+
+
+@pytest.fixture(scope='session')
+def open_bet():
+    """`open_bet(creator_id, amount)`: aposta aberta gravada (requer app context)"""
+    def create(creator_id, amount=Decimal('10.00')):
+        fees = Bet.calculate_fees(amount)
+        bet = Bet(creator_id=creator_id, amount=fees['amount'],
+                  platform_fee=fees['platform_fee'], total_prize=fees['total_prize'])
+        db.session.add(bet)
+        db.session.commit()
+        return bet
+
+    return create
+
+
+@pytest.fixture(scope='session')
+def capture_sql():
+    """
+    `with capture_sql(app, prefixo) as statements`: comandos SQL enviados
+    ao banco principal, como (sql, parâmetros); executemany conta uma vez
+    """
+    @contextmanager
+    def capture(app, prefix=''):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(prefix.upper()):
+                statements.append((statement, parameters))
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    return capture
+
+
+@pytest.fixture(scope='session')
+def count_commits():
+    """
+    `with count_commits(app) as commits`: COMMITs de verdade no banco
+    principal (o RELEASE de um SAVEPOINT não conta)
+    """
+    @contextmanager
+    def count(app):
+        commits = []
+        listener = lambda conn: commits.append(conn)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'commit', listener)
+        try:
+            yield commits
+        finally:
+            event.remove(engine, 'commit', listener)
+
+    return count
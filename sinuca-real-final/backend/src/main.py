@@ -9,16 +9,29 @@ from flask_jwt_extended import JWTManager
 from datetime import timedelta
 
 # Importar modelos
-from src.models.database import db
+from src.models.database import db, init_database, database_uri
 from src.models.user import User
 from src.models.game import Game, Bet
 from src.models.transaction import Transaction
+from src.models.tournament import Tournament
+from src.models.settlement import Settlement
 
 from src.routes.auth import auth_bp
 from src.routes.user import user_bp
 from src.routes.game import game_bp
 from src.routes.betting import betting_bp
 from src.routes.payments import payments_bp
+from src.routes.matchmaking import matchmaking_bp
+from src.routes.tournament import tournament_bp
+from src.services.house_bot import house_bot
+from src.services.game_store import game_store
+from src.services.matchmaking import matchmaker
+from src.services.tournament_engine import tournament_engine
+from src.services.ledger import ledger
+from src.services.bet_engine import bet_engine
+from src.services.settlement import settlement_worker
+from src.services.shot_simulator import shot_simulator
+from src.migrations import upgrade as upgrade_schema
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 
@@ -28,15 +41,22 @@ app.config['JWT_SECRET_KEY'] = 'sinuca_real_jwt_secret_key_2025'
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 
 # Configuração do banco de dados
+# (DATABASE_URL aponta para o PostgreSQL em produção; sem ela, SQLite local)
 database_path = os.path.join(os.path.dirname(__file__), 'database', 'sinuca_real.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{database_path}"
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(f"sqlite:///{database_path}")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Inicializar extensões - CORS corrigido para usar variável de ambiente
 cors_origin = os.getenv('CORS_ORIGIN', 'https://junior-lobo.vercel.app')
 CORS(app, origins=[cors_origin])  # Usar variável de ambiente para CORS
 jwt = JWTManager(app)
-db.init_app(app)
+
+# Pool de simulação de tacadas: processos criados agora, antes de qualquer thread
+shot_simulator.start()
+
+# Banco: SQLITE_PRODUCTION_MODE=true liga WAL, PRAGMAs e escritor único
+sqlite_production = os.getenv('SQLITE_PRODUCTION_MODE', 'false').lower() == 'true'
+init_database(app, production=sqlite_production)
 
 # Registrar blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -44,10 +64,13 @@ app.register_blueprint(user_bp, url_prefix='/api/users')
 app.register_blueprint(game_bp, url_prefix='/api/games')
 app.register_blueprint(betting_bp, url_prefix='/api/betting')
 app.register_blueprint(payments_bp, url_prefix='/api/payments')
+app.register_blueprint(matchmaking_bp, url_prefix='/api/matchmaking')
+app.register_blueprint(tournament_bp, url_prefix='/api/tournaments')
 
-# Criar tabelas e dados iniciais
+# Criar tabelas novas, aplicar migrações nas existentes e dados iniciais
 with app.app_context():
     db.create_all()
+    upgrade_schema()
     
     # Verificar se já existem usuários
     if User.query.count() == 0:
@@ -106,69 +129,92 @@ with app.app_context():
                 'creator_id': 3,
                 'amount': 25.00,
                 'platform_fee': 2.50,
-'total_prize': 47.50,
-'status': 'open'
-},
-{
-'creator_id': 2,
-'amount': 50.00,
-'platform_fee': 5.00,
-'total_prize': 95.00,
-'status': 'open'
-},
-{
-'creator_id': 1,
-'amount': 10.00,
-'platform_fee': 1.00,
-'total_prize': 19.00,
-'status': 'open'
-}
-]
-
-for bet_data in bets_data:
-bet = Bet(**bet_data)
-db.session.add(bet)
-
-db.session.commit()
-print("✅ Dados iniciais criados com sucesso!")
+                'total_prize': 47.50,
+                'status': 'open'
+            },
+            {
+                'creator_id': 2,
+                'amount': 50.00,
+                'platform_fee': 5.00,
+                'total_prize': 95.00,
+                'status': 'open'
+            },
+            {
+                'creator_id': 1,
+                'amount': 10.00,
+                'platform_fee': 1.00,
+                'total_prize': 19.00,
+                'status': 'open'
+            }
+        ]
+        
+        for bet_data in bets_data:
+            bet = Bet(**bet_data)
+            db.session.add(bet)
+        
+        db.session.commit()
+        print("✅ Dados iniciais criados com sucesso!")
+
+# Gravação em lote dos jogos em andamento (mantidos em memória)
+game_store.start_writer(app)
+
+# Matchmaking: amplia a janela de rating de quem está esperando
+matchmaker.start(app)
+
+# Torneios: inícios agendados e avanço das chaves a cada resultado
+tournament_engine.start(app)
+
+# Livro-razão: snapshots periódicos dos saldos
+ledger.start(app)
+
+# Liquidação dos jogos finalizados: estatísticas, rating e prêmios em lote
+settlement_worker.start(app)
+
+# Motor de apostas (opcional): criar, aceitar e cancelar por uma fila e um escritor único
+if os.getenv('BET_ENGINE_ENABLED', 'false').lower() == 'true':
+    bet_engine.start(app)
+
+# Bot da casa (opcional): entra em jogos sem aposta nos horários vazios
+if os.getenv('HOUSE_BOT_ENABLED', 'false').lower() == 'true':
+    house_bot.start(app)
 
 # Rota de health check
 @app.route('/api/health')
 def health_check():
-return {
-'status': 'healthy',
-'service': 'Sinuca Real API',
-'version': '2.0.0',
-'database': 'connected'
-}
+    return {
+        'status': 'healthy',
+        'service': 'Sinuca Real API',
+        'version': '2.0.0',
+        'database': 'connected'
+    }
 
 # Rota para servir frontend
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-static_folder_path = app.static_folder
-if static_folder_path is None:
-return "Static folder not configured", 404
-
-if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-return send_from_directory(static_folder_path, path)
-else:
-index_path = os.path.join(static_folder_path, 'index.html')
-if os.path.exists(index_path):
-return send_from_directory(static_folder_path, 'index.html')
-else:
-return {
-'message': 'Sinuca Real API',
-'status': 'running',
-'endpoints': [
-'/api/health',
-'/api/auth/login',
-'/api/auth/register',
-'/api/users/profile',
-'/api/betting/bets',
-'/api/games/create'
-]
-}
+    static_folder_path = app.static_folder
+    if static_folder_path is None:
+        return "Static folder not configured", 404
+    
+    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+        return send_from_directory(static_folder_path, path)
+    else:
+        index_path = os.path.join(static_folder_path, 'index.html')
+        if os.path.exists(index_path):
+            return send_from_directory(static_folder_path, 'index.html')
+        else:
+            return {
+                'message': 'Sinuca Real API',
+                'status': 'running',
+                'endpoints': [
+                    '/api/health',
+                    '/api/auth/login',
+                    '/api/auth/register',
+                    '/api/users/profile',
+                    '/api/betting/bets',
+                    '/api/games/create'
+                ]
+            }
 
 if __name__ == '__main__':
-app.run(host='0.0.0.0', port=5000, debug=Trueção CORS para usar variável de ambiente)
+    app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,231 @@
+"""
+Migrações versionadas do banco
+
+`db.create_all()` cria as tabelas novas (já com os índices declarados nos
+modelos), mas não altera tabelas existentes. As mudanças em tabelas que já
+existem ficam aqui, numeradas e aplicadas em ordem uma única vez; a tabela
+`schema_migrations` guarda as versões aplicadas.
+
+Cada migração é um módulo com VERSION, DESCRIPTION e `upgrade(migrator)`.
+As operações do `Migrator` são idempotentes e feitas sem travar a tabela
+por muito tempo: índices com CREATE INDEX CONCURRENTLY no PostgreSQL e
+preenchimento de colunas em lotes pequenos, cada um no seu commit.
+
+Uso: `upgrade()` no início da aplicação (requer app context) ou
+`python -m src.migrations`.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from src.migrations import (
+    m0001_game_and_rating_columns,
+    m0002_hot_query_indexes,
+    m0003_keyset_pagination_indexes,
+    m0004_wallet_ledger,
+    m0005_bet_version,
+    m0006_settlements,
+)
+
+MIGRATIONS = [
+    m0001_game_and_rating_columns,
+    m0002_hot_query_indexes,
+    m0003_keyset_pagination_indexes,
+    m0004_wallet_ledger,
+    m0005_bet_version,
+    m0006_settlements,
+]
+
+BACKFILL_BATCH = 1000
+ADVISORY_LOCK_ID = 7261001  # serializa migrações de vários processos (PostgreSQL)
+
+
+class Migrator:
+    """Operações de esquema idempotentes usadas pelas migrações"""
+
+    def __init__(self, engine, metadata):
+        self.engine = engine
+        self.metadata = metadata
+        self.dialect = engine.dialect.name
+
+    def has_table(self, table):
+        return inspect(self.engine).has_table(table)
+
+    def has_column(self, table, column):
+        return any(c['name'] == column for c in inspect(self.engine).get_columns(table))
+
+    def has_index(self, table, name):
+        return any(i['name'] == name for i in inspect(self.engine).get_indexes(table))
+
+    def create_table(self, table):
+        """Criar tabela declarada no modelo (com seus índices) se não existir"""
+        if self.has_table(table):
+            return False
+        self.metadata.tables[table].create(self.engine)
+        return True
+
+    def add_column(self, table, column):
+        """Adicionar coluna declarada no modelo (sem default: preencher com `backfill`)"""
+        if not self.has_table(table) or self.has_column(table, column):
+            return False
+
+        definition = self.metadata.tables[table].c[column]
+        ddl_type = definition.type.compile(dialect=self.engine.dialect)
+        with self.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN "{column}" {ddl_type}'))
+        return True
+
+    def drop_not_null(self, table, column):
+        """Tornar coluna opcional (no SQLite, recriando a tabela pelo modelo)"""
+        if not self.has_table(table):
+            return False
+
+        current = next((c for c in inspect(self.engine).get_columns(table) if c['name'] == column), None)
+        if current is None or current['nullable']:
+            return False
+
+        if self.dialect == 'sqlite':
+            self._rebuild_sqlite_table(table)
+        else:
+            with self.engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table} ALTER COLUMN "{column}" DROP NOT NULL'))
+        return True
+
+    def _rebuild_sqlite_table(self, table):
+        """Recriar a tabela com a definição do modelo, copiando as linhas (uma transação)"""
+        from sqlalchemy import MetaData
+        from sqlalchemy.schema import CreateTable
+
+        # Cópia do metadata para resolver as chaves estrangeiras da tabela nova
+        scratch = MetaData()
+        for other in self.metadata.sorted_tables:
+            other.to_metadata(scratch)
+
+        model = self.metadata.tables[table]
+        rebuilt = model.to_metadata(scratch, name=f'{table}__rebuild')
+        existing = {c['name'] for c in inspect(self.engine).get_columns(table)}
+        columns = ', '.join(f'"{c.name}"' for c in model.columns if c.name in existing)
+
+        with self.engine.begin() as conn:
+            conn.execute(CreateTable(rebuilt))
+            conn.execute(text(f'INSERT INTO {rebuilt.name} ({columns}) SELECT {columns} FROM {table}'))
+            conn.execute(text(f'DROP TABLE {table}'))
+            conn.execute(text(f'ALTER TABLE {rebuilt.name} RENAME TO {table}'))
+            for index in model.indexes:
+                index.create(conn, checkfirst=True)
+
+    def create_index(self, name, table, columns, unique=False):
+        """Criar índice sem bloquear escritas (CONCURRENTLY no PostgreSQL)"""
+        if not self.has_table(table):
+            return False
+
+        column_list = ', '.join(columns)
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+
+        if self.dialect == 'postgresql':
+            with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                # Um CONCURRENTLY interrompido deixa o índice inválido: recriar
+                invalid = conn.execute(text(
+                    "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = :name AND NOT i.indisvalid"
+                ), {'name': name}).first()
+                if invalid:
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {name}'))
+                conn.execute(text(f'CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} ({column_list})'))
+        else:
+            with self.engine.begin() as conn:
+                conn.execute(text(f'CREATE {kind} IF NOT EXISTS {name} ON {table} ({column_list})'))
+        return True
+
+    def drop_index(self, name, table):
+        """Remover índice (CONCURRENTLY no PostgreSQL) se existir"""
+        if not self.has_table(table) or not self.has_index(table, name):
+            return False
+
+        if self.dialect == 'postgresql':
+            with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {name}'))
+        else:
+            with self.engine.begin() as conn:
+                conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+        return True
+
+    def backfill(self, table, assignments, condition, params=None, batch_size=BACKFILL_BATCH):
+        """
+        UPDATE em lotes de `batch_size` linhas, um commit por lote
+
+        Returns:
+            Número de linhas atualizadas
+        """
+        if not self.has_table(table):
+            return 0
+
+        statement = text(
+            f'UPDATE {table} SET {assignments} WHERE id IN '
+            f'(SELECT id FROM {table} WHERE {condition} LIMIT {int(batch_size)})'
+        )
+        total = 0
+        while True:
+            with self.engine.begin() as conn:
+                updated = conn.execute(statement, params or {}).rowcount
+            total += updated
+            if updated < batch_size:
+                return total
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, '
+        'description VARCHAR(255) NOT NULL, '
+        'applied_at TIMESTAMP NOT NULL)'
+    ))
+
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+
+
+def upgrade(engine=None, verbose=True):
+    """
+    Aplicar as migrações pendentes, em ordem (requer app context sem `engine`)
+
+    Returns:
+        Versões aplicadas nesta chamada
+    """
+    from src.models.database import db
+
+    engine = engine or db.engine
+    lock = None
+    if engine.dialect.name == 'postgresql':
+        lock = engine.connect()
+        lock.execute(text('SELECT pg_advisory_lock(:id)'), {'id': ADVISORY_LOCK_ID})
+
+    try:
+        done = applied_versions(engine)
+        migrator = Migrator(engine, db.metadata)
+        applied = []
+
+        for migration in sorted(MIGRATIONS, key=lambda m: m.VERSION):
+            if migration.VERSION in done:
+                continue
+
+            migration.upgrade(migrator)
+            with engine.begin() as conn:
+                conn.execute(text(
+                    'INSERT INTO schema_migrations (version, description, applied_at) '
+                    'VALUES (:version, :description, :applied_at)'
+                ), {'version': migration.VERSION, 'description': migration.DESCRIPTION,
+                    'applied_at': datetime.utcnow()})
+            applied.append(migration.VERSION)
+            if verbose:
+                print(f"✅ Migração {migration.VERSION:04d} aplicada: {migration.DESCRIPTION}")
+
+        return applied
+    finally:
+        if lock is not None:
+            lock.execute(text('SELECT pg_advisory_unlock(:id)'), {'id': ADVISORY_LOCK_ID})
+            lock.close()
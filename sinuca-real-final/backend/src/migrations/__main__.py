@@ -0,0 +1,8 @@
+"""Aplicar as migrações pendentes: python -m src.migrations"""
+
+from src.main import app
+from src.migrations import upgrade
+
+with app.app_context():
+    applied = upgrade()
+print(f"✅ {len(applied)} migração(ões) aplicada(s)")
@@ -0,0 +1,23 @@
+"""Colunas novas em tabelas existentes: mesa binária, torneio, Glicko-2 e pagamentos"""
+
+VERSION = 1
+DESCRIPTION = 'Colunas de mesa binária, torneio, Glicko-2 e pagamentos'
+
+
+def upgrade(migrator):
+    # Jogos: mesa e histórico em formato binário, partida de torneio
+    for column in ('table_state', 'shot_log', 'tournament_id'):
+        migrator.add_column('games', column)
+
+    # Usuários: desvio e volatilidade do Glicko-2
+    migrator.add_column('users', 'rating_deviation')
+    migrator.add_column('users', 'rating_volatility')
+    migrator.backfill('users', 'rating_deviation = :rd', 'rating_deviation IS NULL', {'rd': 350.0})
+    migrator.backfill('users', 'rating_volatility = :vol', 'rating_volatility IS NULL', {'vol': 0.06})
+
+    # Transações: campos dos pagamentos externos; saldos opcionais em pagamentos pendentes
+    for column in ('payment_method', 'external_id', 'external_reference', 'metadata',
+                   'balance_before', 'balance_after', 'bet_id', 'game_id'):
+        migrator.add_column('transactions', column)
+    migrator.drop_not_null('transactions', 'balance_before')
+    migrator.drop_not_null('transactions', 'balance_after')
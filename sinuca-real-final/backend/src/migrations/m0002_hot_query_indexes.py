@@ -0,0 +1,25 @@
+"""Índices das consultas mais frequentes (mesmos nomes declarados nos modelos)"""
+
+VERSION = 2
+DESCRIPTION = 'Índices compostos de apostas, jogos e transações'
+
+INDEXES = [
+    # Livro de apostas e listagens por status
+    ('ix_bets_status_created_at', 'bets', ['status', 'created_at']),
+    ('ix_bets_creator_id', 'bets', ['creator_id']),
+    ('ix_bets_opponent_id', 'bets', ['opponent_id']),
+
+    # Jogos aguardando adversário e jogos do usuário
+    ('ix_games_status_player2_id_created_at', 'games', ['status', 'player2_id', 'created_at']),
+    ('ix_games_player1_id', 'games', ['player1_id']),
+    ('ix_games_player2_id', 'games', ['player2_id']),
+
+    # Extrato e webhook de pagamentos
+    ('ix_transactions_user_id_created_at', 'transactions', ['user_id', 'created_at']),
+    ('ix_transactions_external_reference', 'transactions', ['external_reference']),
+]
+
+
+def upgrade(migrator):
+    for name, table, columns in INDEXES:
+        migrator.create_index(name, table, columns)
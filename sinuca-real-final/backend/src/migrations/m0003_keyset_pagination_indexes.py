@@ -0,0 +1,30 @@
+"""Índices das listagens paginadas por cursor: filtro + (chave de ordenação, id)"""
+
+VERSION = 3
+DESCRIPTION = 'Índices de paginação por cursor (jogos, apostas e ranking)'
+
+INDEXES = [
+    # Jogos e apostas do usuário: um índice por ramo do OR, já na ordem da página
+    ('ix_games_player1_id_created_at', 'games', ['player1_id', 'created_at', 'id']),
+    ('ix_games_player2_id_created_at', 'games', ['player2_id', 'created_at', 'id']),
+    ('ix_bets_creator_id_created_at', 'bets', ['creator_id', 'created_at', 'id']),
+    ('ix_bets_opponent_id_created_at', 'bets', ['opponent_id', 'created_at', 'id']),
+
+    # Ranking
+    ('ix_users_skill_rating_id', 'users', ['skill_rating', 'id']),
+]
+
+# Substituídos pelos compostos acima (mesmo prefixo)
+REPLACED = [
+    ('ix_games_player1_id', 'games'),
+    ('ix_games_player2_id', 'games'),
+    ('ix_bets_creator_id', 'bets'),
+    ('ix_bets_opponent_id', 'bets'),
+]
+
+
+def upgrade(migrator):
+    for name, table, columns in INDEXES:
+        migrator.create_index(name, table, columns)
+    for name, table in REPLACED:
+        migrator.drop_index(name, table)
@@ -0,0 +1,32 @@
+"""Livro-razão da carteira: tabelas e lançamento de abertura dos saldos existentes"""
+
+from datetime import datetime
+
+from sqlalchemy import text
+
+VERSION = 4
+DESCRIPTION = 'Livro-razão da carteira (lançamentos e snapshots)'
+
+WALLET = "'user:' || CAST(users.id AS VARCHAR(20))"
+
+# Usuários com saldo e ainda sem lançamentos na carteira
+PENDING = (
+    'FROM users WHERE balance <> 0 AND NOT EXISTS '
+    f'(SELECT 1 FROM ledger_entries e WHERE e.account = {WALLET})'
+)
+
+INSERT = (
+    'INSERT INTO ledger_entries (journal_id, account, amount, type, created_at, updated_at) '
+    "SELECT 'opening:' || CAST(users.id AS VARCHAR(20)), {account}, {amount}, 'opening', :now, :now "
+)
+
+
+def upgrade(migrator):
+    migrator.create_table('ledger_entries')
+    migrator.create_table('balance_snapshots')
+
+    # Contrapartida primeiro: depois da perna da carteira o usuário sai de PENDING
+    now = datetime.utcnow()
+    with migrator.engine.begin() as conn:
+        conn.execute(text(INSERT.format(account="'opening'", amount='-balance') + PENDING), {'now': now})
+        conn.execute(text(INSERT.format(account=WALLET, amount='balance') + PENDING), {'now': now})
@@ -0,0 +1,9 @@
+"""Versão da aposta para o aceite otimista (UPDATE condicional)"""
+
+VERSION = 5
+DESCRIPTION = 'Coluna de versão das apostas'
+
+
+def upgrade(migrator):
+    migrator.add_column('bets', 'version')
+    migrator.backfill('bets', 'version = 0', 'version IS NULL')
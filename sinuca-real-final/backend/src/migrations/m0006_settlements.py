@@ -0,0 +1,9 @@
+"""Fila durável de liquidação dos jogos finalizados"""
+
+VERSION = 6
+DESCRIPTION = 'Tabela de liquidações pendentes'
+
+
+def upgrade(migrator):
+    # Jogos finalizados antes desta versão já foram liquidados na requisição
+    migrator.create_table('settlements')
@@ -1,7 +1,216 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+from contextlib import contextmanager
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+import os
 
-db = SQLAlchemy()
+# Bind do pool de leitura no modo produção do SQLite
+READ_BIND = 'reader'
+
+# PRAGMAs de cada conexão no modo produção: WAL deixa leitores lendo
+# enquanto o escritor grava; synchronous=NORMAL só sincroniza o disco nos
+# checkpoints (seguro em WAL); cache de 64 MB e mmap de 256 MB
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+# PostgreSQL: pool por processo; pre-ping descarta conexões derrubadas pelo
+# servidor ou pelo PgBouncer e recycle renova as antigas
+POSTGRES_ENGINE_OPTIONS = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+    'pool_timeout': 30,
+    'pool_recycle': 1800,
+    'pool_pre_ping': True,
+}
+
+# Valores monetários: Decimal com centavos do banco até a resposta JSON
+CENT = Decimal('0.01')
+
+# Um único escritor (as gravações fazem fila no pool, não no lock do SQLite)
+WRITER_ENGINE_OPTIONS = {'pool_size': 1, 'max_overflow': 0, 'pool_timeout': 30}
+READER_ENGINE_OPTIONS = {'pool_size': 8, 'max_overflow': 16, 'pool_timeout': 30}
+
+class RoutingSession(Session):
+    """Sessão que envia leituras ao pool de leitura e o resto ao escritor"""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engines = self._db.engines
+        if bind is None and READ_BIND in engines:
+            if clause is not None and not isinstance(clause, Select):
+                self.info['wrote'] = True
+            elif self._is_read(clause):
+                return engines[READ_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+    
+    def _is_read(self, clause):
+        # Depois de gravar, a transação lê do escritor para ver as próprias mudanças
+        return (
+            clause is not None
+            and clause._for_update_arg is None
+            and not self._flushing
+            and not self.info.get('wrote')
+        )
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _clear_written(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('wrote', None)
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def to_money(value):
+    """Valor em Decimal com 2 casas (floats passam por str para não herdar o erro binário)"""
+    if value is None:
+        return None
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def money_json(values):
+    """Dicionário de valores monetários como números JSON"""
+    return {key: float(value) for key, value in values.items()}
+
+def database_uri(default):
+    """URI do banco: DATABASE_URL (postgres:// dos provedores vira postgresql://) ou o padrão"""
+    uri = os.getenv('DATABASE_URL') or default
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def is_sqlite_file(uri):
+    """URI de um arquivo SQLite (não em memória)"""
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+def _apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+def _writer_connect(dbapi_connection, connection_record):
+    _apply_pragmas(dbapi_connection, {'journal_mode': 'WAL', **SQLITE_PRAGMAS})
+    # Transações controladas aqui (BEGIN IMMEDIATE), não pelo driver
+    dbapi_connection.isolation_level = None
+
+def _writer_begin(conn):
+    # Pega o lock de escrita no início: sem upgrade de lock (e SQLITE_BUSY) no meio
+    conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+def _reader_connect(dbapi_connection, connection_record):
+    _apply_pragmas(dbapi_connection, {**SQLITE_PRAGMAS, 'query_only': 'ON'})
+
+def init_database(app, production=False):
+    """
+    Inicializar o banco na aplicação
+    
+    PostgreSQL recebe o pool dimensionado com pre-ping. No modo produção
+    com SQLite em arquivo: WAL, PRAGMAs ajustados, pool de leitura separado
+    e um único escritor serializado. SQLite em memória usa o padrão.
+    """
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if make_url(uri).get_backend_name() == 'postgresql':
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            **POSTGRES_ENGINE_OPTIONS, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        }
+    
+    production = production and is_sqlite_file(uri)
+    if production:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = WRITER_ENGINE_OPTIONS
+        app.config['SQLALCHEMY_BINDS'] = {
+            **app.config.get('SQLALCHEMY_BINDS', {}),
+            READ_BIND: {'url': uri, **READER_ENGINE_OPTIONS}
+        }
+    
+    db.init_app(app)
+    
+    if production:
+        with app.app_context():
+            writer, reader = db.engines[None], db.engines[READ_BIND]
+        event.listen(writer, 'connect', _writer_connect)
+        event.listen(writer, 'begin', _writer_begin)
+        event.listen(reader, 'connect', _reader_connect)
+        
+        # Ativar o WAL antes de qualquer leitor abrir o arquivo
+        with writer.connect():
+            pass
+
+@contextmanager
+def unit_of_work():
+    """
+    Agrupar as alterações de uma operação num único commit
+    
+    Dentro do bloco `save()` e `update_balance()` só fazem flush; o commit
+    acontece uma vez, na saída do bloco mais externo. Blocos aninhados
+    entram no externo. Efeitos fora do banco (eventos, cache) registrados
+    com `on_commit` rodam depois do commit.
+    
+    Só o fim normal grava: exceção (em qualquer nível) ou saída por
+    `return abort(...)` desfazem tudo o que a unidade preparou, mesmo que
+    a exceção de um bloco aninhado tenha sido tratada por quem o chamou.
+    """
+    session = db.session
+    depth = session.info.get('uow_depth', 0)
+    session.info['uow_depth'] = depth + 1
+    try:
+        yield session
+    except Exception:
+        session.info['uow_depth'] = depth
+        if depth == 0:
+            session.info.pop('uow_callbacks', None)
+            session.info.pop('uow_aborted', None)
+            session.rollback()
+        else:
+            session.info['uow_aborted'] = True
+        raise
+    
+    session.info['uow_depth'] = depth
+    if depth == 0:
+        callbacks = session.info.pop('uow_callbacks', [])
+        if session.info.pop('uow_aborted', False):
+            session.rollback()
+            return
+        session.commit()
+        for callback in callbacks:
+            callback()
+
+def abort(*result):
+    """
+    Encerrar a operação sem gravar: `return abort(False, "mensagem")`
+    
+    A unidade de trabalho mais externa desfaz o que foi preparado em vez
+    de fazer commit (no motor de apostas, só o SAVEPOINT do comando).
+    
+    Returns:
+        `result`, como tupla
+    """
+    if in_unit_of_work():
+        db.session.info['uow_aborted'] = True
+    return result
+
+def in_unit_of_work():
+    """Há um `unit_of_work()` aberto na sessão atual"""
+    return db.session.info.get('uow_depth', 0) > 0
+
+def on_commit(callback):
+    """Executar depois do commit da unidade de trabalho (ou já, fora de uma)"""
+    if in_unit_of_work():
+        db.session.info.setdefault('uow_callbacks', []).append(callback)
+    else:
+        callback()
 
 class BaseModel(db.Model):
     """Modelo base com campos comuns"""
@@ -22,15 +231,26 @@ class BaseModel(db.Model):
                 result[column.name] = value
         return result
     
-    def save(self):
-        """Salvar no banco de dados"""
+    def save(self, commit=True):
+        """
+        Salvar no banco de dados
+        
+        Com commit=False, ou dentro de `unit_of_work()`, só faz flush (ids
+        gerados, nada confirmado): o commit fica para quem abriu a unidade.
+        """
         db.session.add(self)
-        db.session.commit()
+        if commit and not in_unit_of_work():
+            db.session.commit()
+        else:
+            db.session.flush()
         return self
     
-    def delete(self):
-        """Deletar do banco de dados"""
+    def delete(self, commit=True):
+        """Deletar do banco de dados (mesma regra de commit do `save`)"""
         db.session.delete(self)
-        db.session.commit()
+        if commit and not in_unit_of_work():
+            db.session.commit()
+        else:
+            db.session.flush()
         return True
 
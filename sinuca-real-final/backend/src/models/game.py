@@ -1,9 +1,29 @@
-from src.models.database import db, BaseModel
+from src.models.database import db, BaseModel, abort, on_commit, to_money, unit_of_work
 from datetime import datetime
+from decimal import Decimal
+import base64
 import json
 
+def merge_patch(target, patch):
+    """Aplicar JSON merge patch (RFC 7396): dicts se combinam, None remove"""
+    if not isinstance(patch, dict):
+        return patch
+    if not isinstance(target, dict):
+        target = {}
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        else:
+            target[key] = merge_patch(target.get(key), value)
+    return target
+
 class Game(BaseModel):
     __tablename__ = 'games'
+    __table_args__ = (
+        db.Index('ix_games_status_player2_id_created_at', 'status', 'player2_id', 'created_at'),
+        db.Index('ix_games_player1_id_created_at', 'player1_id', 'created_at', 'id'),
+        db.Index('ix_games_player2_id_created_at', 'player2_id', 'created_at', 'id'),
+    )
     
     # Jogadores
     player1_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -18,7 +38,11 @@ class Game(BaseModel):
     time_limit = db.Column(db.Integer, default=300)  # 5 minutos por jogador
     
     # Dados do jogo (JSON)
-    game_data = db.Column(db.Text, default='{}')  # Estado das bolas, jogadas, etc.
+    game_data = db.Column(db.Text, default='{}')  # Vez, grupos, bola na mão, etc.
+    
+    # Mesa e histórico de tacadas em formato binário (ver table_codec)
+    table_state = db.Column(db.LargeBinary, nullable=True)
+    shot_log = db.Column(db.LargeBinary, nullable=True)
     
     # Timestamps
     started_at = db.Column(db.DateTime, nullable=True)
@@ -27,6 +51,9 @@ class Game(BaseModel):
     # Relacionamento com apostas
     bet_id = db.Column(db.Integer, db.ForeignKey('bets.id'), nullable=True)
     
+    # Torneio (partida de uma chave, ver TournamentMatch)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=True)
+    
     @property
     def duration(self):
         """Duração do jogo em segundos"""
@@ -46,6 +73,49 @@ class Game(BaseModel):
         """Atualizar dados do jogo"""
         self.game_data = json.dumps(data)
     
+    def load_table(self):
+        """Mesa atual (formato binário; JSON antigo como fallback)"""
+        from src.services.physics_engine import TableState
+        from src.services.table_codec import decode_table
+        
+        if self.table_state:
+            return decode_table(self.table_state)
+        return TableState.from_dict(self.game_data_dict.get('table'))
+    
+    def load_shots(self):
+        """Histórico de tacadas (formato binário; JSON antigo como fallback)"""
+        from src.services.table_codec import decode_shots
+        
+        if self.shot_log:
+            return decode_shots(self.shot_log, self.player1_id, self.player2_id)
+        return self.game_data_dict.get('shots') or []
+    
+    def match_state(self, game_state=None):
+        """Estado da partida para as regras do servidor"""
+        from src.services.match_rules import MatchState
+        
+        if game_state is None:
+            game_state = self.game_data_dict
+        return MatchState.from_game_data(self.player1_id, self.player2_id, game_state,
+                                         table=self.load_table(), shots=self.load_shots())
+    
+    @property
+    def last_sequence(self):
+        """Número de sequência da última jogada registrada"""
+        return db.session.query(db.func.max(GameMove.sequence))\
+                         .filter(GameMove.game_id == self.id).scalar() or 0
+    
+    def current_state(self):
+        """Estado atual: último snapshot + jogadas posteriores a ele"""
+        state = self.game_data_dict
+        moves = GameMove.query.filter(GameMove.game_id == self.id)\
+                              .filter(GameMove.sequence > state.get('sequence', 0))\
+                              .order_by(GameMove.sequence.asc()).all()
+        for move in moves:
+            state = merge_patch(state, move.patch_dict)
+            state['sequence'] = move.sequence
+        return state
+    
     def start_game(self):
         """Iniciar jogo"""
         self.status = 'playing'
@@ -53,55 +123,142 @@ class Game(BaseModel):
         self.save()
     
     def finish_game(self, winner_id):
-        """Finalizar jogo"""
-        self.status = 'finished'
-        self.winner_id = winner_id
-        self.finished_at = datetime.utcnow()
+        """
+        Finalizar jogo
         
-        # Atualizar estatísticas dos jogadores
-        from src.models.user import User
+        Grava só o resultado e a liquidação pendente (`Settlement`) num
+        único commit; estatísticas, rating, conquistas e prêmio da aposta
+        ficam para o `settlement_worker`. O UPDATE é condicional ao jogo
+        estar em andamento: dois pedidos de fim simultâneos não liquidam
+        duas vezes.
+        
+        Returns:
+            (sucesso, mensagem)
+        """
+        from sqlalchemy.orm.attributes import set_committed_value
+        from src.models.settlement import Settlement
+        
+        finished_at = datetime.utcnow()
+        with unit_of_work():
+            statement = db.update(Game)\
+                          .where(Game.id == self.id)\
+                          .where(Game.status.in_(['waiting', 'playing']))\
+                          .values(status='finished', winner_id=winner_id, finished_at=finished_at)\
+                          .execution_options(synchronize_session=False)
+            if db.session.execute(statement).rowcount != 1:
+                return abort(False, "Jogo não está em andamento")
+            
+            for key, value in (('status', 'finished'), ('winner_id', winner_id),
+                               ('finished_at', finished_at)):
+                set_committed_value(self, key, value)
+            db.session.add(Settlement(game_id=self.id, winner_id=winner_id))
+            on_commit(lambda: self._after_finish(winner_id))
+        
+        return True, "Jogo finalizado"
+    
+    def _after_finish(self, winner_id):
+        """Efeitos do fim do jogo fora do banco, depois do commit"""
+        from src.services.settlement import settlement_worker
+        settlement_worker.wake()
         
-        player1 = User.query.get(self.player1_id)
-        player2 = User.query.get(self.player2_id)
-        
-        if player1:
-            player1.games_played += 1
-            if winner_id == player1.id:
-                player1.games_won += 1
-                player1.skill_rating += 25
-                player1.add_experience(100)
-            else:
-                player1.skill_rating = max(800, player1.skill_rating - 15)
-                player1.add_experience(25)
-        
-        if player2:
-            player2.games_played += 1
-            if winner_id == player2.id:
-                player2.games_won += 1
-                player2.skill_rating += 25
-                player2.add_experience(100)
-            else:
-                player2.skill_rating = max(800, player2.skill_rating - 15)
-                player2.add_experience(25)
-        
-        # Processar aposta se existir
-        if self.bet_id:
-            bet = Bet.query.get(self.bet_id)
-            if bet:
-                bet.complete_bet(winner_id)
+        from src.services.game_events import game_events
+        game_events.publish(self.id, 'finish', {'winner_id': winner_id}, close=True)
         
+        # Avançar a chave do torneio
+        if self.tournament_id:
+            from src.services.tournament_engine import tournament_engine
+            tournament_engine.report_result(self.id, winner_id)
+    
+    def settle_players(self, players):
+        """
+        Estatísticas, experiência e rating (Glicko-2) dos jogadores
+        
+        Args:
+            players: Dicionário id -> usuário (travados por quem liquida)
+        """
+        player1 = players.get(self.player1_id)
+        player2 = players.get(self.player2_id)
+        
+        for player in (player1, player2):
+            if player:
+                player.games_played += 1
+                if self.winner_id == player.id:
+                    player.games_won += 1
+                    player.add_experience(100)
+                else:
+                    player.add_experience(25)
+        
+        if player1 and player2:
+            from src.services.rating_engine import rating_engine
+            rating_engine.apply_result(player1, player2, self.winner_id)
+    
+    def cancel_game(self):
+        """Cancelar jogo"""
+        self.status = 'cancelled'
+        self.finished_at = datetime.utcnow()
         self.save()
-        db.session.commit()
+        
+        from src.services.game_events import game_events
+        game_events.publish(self.id, 'cancel', {}, close=True)
     
-    def to_dict(self):
-        """Converter para dicionário"""
+    def to_dict(self, debug=False):
+        """
+        Converter para dicionário
+        
+        A mesa e o histórico vão em base64 (formato binário); com debug=True
+        inclui também a versão JSON decodificada.
+        """
         data = super().to_dict()
+        data['table_state'] = base64.b64encode(self.table_state).decode() if self.table_state else None
+        data['shot_log'] = base64.b64encode(self.shot_log).decode() if self.shot_log else None
         data['duration'] = self.duration
         data['game_data_dict'] = self.game_data_dict
+        if debug:
+            data['debug'] = {
+                'table': self.load_table().to_dict(),
+                'shots': self.load_shots()
+            }
         return data
 
+class GameMove(BaseModel):
+    """Jogada incremental (append-only) de um jogo"""
+    __tablename__ = 'game_moves'
+    __table_args__ = (
+        db.UniqueConstraint('game_id', 'sequence', name='uq_game_moves_game_sequence'),
+    )
+    
+    game_id = db.Column(db.Integer, db.ForeignKey('games.id'), nullable=False)
+    sequence = db.Column(db.Integer, nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    patch = db.Column(db.Text, nullable=False)  # JSON merge patch
+    
+    @property
+    def patch_dict(self):
+        """Patch como dicionário"""
+        try:
+            return json.loads(self.patch)
+        except:
+            return {}
+    
+    def to_dict(self):
+        """Converter para dicionário"""
+        data = super().to_dict()
+        data['patch'] = self.patch_dict
+        return data
+
+# Taxa da plataforma sobre o pote das apostas
+PLATFORM_FEE_RATE = Decimal('0.05')
+
+# Aceite perdido para outra requisição (ou aposta fechada): HTTP 409
+BET_NOT_AVAILABLE = "Aposta não está disponível"
+
 class Bet(BaseModel):
     __tablename__ = 'bets'
+    __table_args__ = (
+        db.Index('ix_bets_status_created_at', 'status', 'created_at'),
+        db.Index('ix_bets_creator_id_created_at', 'creator_id', 'created_at', 'id'),
+        db.Index('ix_bets_opponent_id_created_at', 'opponent_id', 'created_at', 'id'),
+    )
     
     # Participantes
     creator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -115,6 +272,7 @@ class Bet(BaseModel):
     # Estado da aposta
     status = db.Column(db.String(20), default='open')  # open, matched, playing, completed, cancelled
     winner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    version = db.Column(db.Integer, default=0)  # incrementada a cada mudança de status (aceite otimista)
     
     # Timestamps
     matched_at = db.Column(db.DateTime, nullable=True)
@@ -125,73 +283,160 @@ class Bet(BaseModel):
     
     @staticmethod
     def calculate_fees(amount):
-        """Calcular taxas da aposta"""
+        """Calcular taxas da aposta (Decimal, em centavos)"""
+        amount = to_money(amount)
         total_pot = amount * 2  # Dois jogadores
-        platform_fee = total_pot * 0.05  # 5% de taxa
+        platform_fee = to_money(total_pot * PLATFORM_FEE_RATE)  # 5% de taxa
         total_prize = total_pot - platform_fee
         
         return {
-            'amount': float(amount),
-            'total_pot': float(total_pot),
-            'platform_fee': float(platform_fee),
-            'total_prize': float(total_prize)
+            'amount': amount,
+            'total_pot': total_pot,
+            'platform_fee': platform_fee,
+            'total_prize': total_prize
         }
     
+    def lock(self):
+        """Recarregar a aposta com SELECT ... FOR UPDATE (estado atual do banco)"""
+        return Bet.query.filter_by(id=self.id)\
+                        .with_for_update()\
+                        .populate_existing()\
+                        .one()
+    
+    def claim(self, opponent_id):
+        """
+        Reservar a aposta aberta para `opponent_id` (UPDATE condicional)
+        
+        A linha só muda se ainda está aberta e na versão lida por esta
+        requisição (`WHERE status = 'open' AND version = ?`); os valores
+        novos voltam ao objeto como já persistidos.
+        
+        Returns:
+            True se esta requisição ficou com a aposta
+        """
+        from sqlalchemy.orm.attributes import set_committed_value
+        
+        matched_at = datetime.utcnow()
+        statement = db.update(Bet)\
+                      .where(Bet.id == self.id)\
+                      .where(Bet.status == 'open')\
+                      .where(Bet.version == (self.version or 0))\
+                      .values(status='matched', opponent_id=opponent_id,
+                              matched_at=matched_at, version=Bet.version + 1)\
+                      .returning(Bet.version)\
+                      .execution_options(synchronize_session=False)
+        row = db.session.execute(statement).first()
+        if row is None:
+            return False
+        
+        for key, value in (('status', 'matched'), ('opponent_id', opponent_id),
+                           ('matched_at', matched_at), ('version', row[0])):
+            set_committed_value(self, key, value)
+        return True
+    
     def accept_bet(self, opponent_id):
-        """Aceitar aposta"""
+        """
+        Aceitar aposta
+        
+        Aceite otimista: a aposta não é travada. O `claim` reserva a aposta
+        num UPDATE condicional pela versão lida; das aceitações simultâneas
+        só uma altera a linha e as outras recebem BET_NOT_AVAILABLE logo,
+        sem esperar pelos saldos. A vencedora debita o escrow dos dois
+        jogadores (UPDATE atômico, nunca negativo) e cria o jogo no mesmo
+        commit.
+        
+        Raises:
+            InsufficientFunds: saldo gasto por outra operação depois da
+                conferência (nada é gravado)
+        """
         from src.models.user import User
         
-        opponent = User.query.get(opponent_id)
-        creator = User.query.get(self.creator_id)
+        if self.status != 'open':
+            return False, BET_NOT_AVAILABLE
+        
+        users = {user.id: user for user in User.query.filter(User.id.in_([self.creator_id, opponent_id]))}
+        opponent = users.get(opponent_id)
+        creator = users.get(self.creator_id)
         
         if not opponent or not creator:
             return False, "Usuário não encontrado"
         
-        if not opponent.can_bet(float(self.amount)):
+        if not opponent.can_bet(self.amount):
             return False, "Saldo insuficiente"
         
-        if not creator.can_bet(float(self.amount)):
+        if not creator.can_bet(self.amount):
             return False, "Criador da aposta não tem saldo suficiente"
         
-        # Debitar valores dos jogadores
-        creator.update_balance(-float(self.amount), 'bet_escrow')
-        opponent.update_balance(-float(self.amount), 'bet_escrow')
-        
-        # Atualizar aposta
-        self.opponent_id = opponent_id
-        self.status = 'matched'
-        self.matched_at = datetime.utcnow()
-        
-        # Criar jogo
-        game = Game(
-            player1_id=self.creator_id,
-            player2_id=opponent_id,
-            bet_id=self.id
-        )
-        game.save()
-        
-        self.save()
-        return True, "Aposta aceita com sucesso"
+        with unit_of_work():
+            if not self.claim(opponent_id):
+                return abort(False, BET_NOT_AVAILABLE)
+            
+            # Debitar valores dos jogadores para o escrow da aposta
+            escrow_account = self.escrow_account
+            creator.update_balance(-self.amount, 'bet_escrow',
+                                   counterpart=escrow_account, bet_id=self.id)
+            opponent.update_balance(-self.amount, 'bet_escrow',
+                                    counterpart=escrow_account, bet_id=self.id)
+            
+            # Criar jogo
+            game = Game(
+                player1_id=self.creator_id,
+                player2_id=opponent_id,
+                bet_id=self.id
+            )
+            db.session.add(game)
+            
+            self.save()
+            return True, "Aposta aceita com sucesso"
     
     def complete_bet(self, winner_id):
-        """Completar aposta"""
+        """Completar aposta (aposta e vencedor travados até o commit)"""
         from src.models.user import User
+        from src.services.ledger import ledger
         
-        if self.status != 'matched':
-            return False, "Aposta não está em andamento"
+        with unit_of_work():
+            self.lock()
+            if self.status != 'matched':
+                return abort(False, "Aposta não está em andamento")
+            
+            winner = User.lock_many([winner_id]).get(winner_id)
+            if not winner:
+                return abort(False, "Vencedor não encontrado")
+            
+            ledger.post_many(self.payout(winner))
+            self.save()
+            
+            return True, "Aposta completada"
+    
+    def payout(self, winner):
+        """
+        Fechar a aposta em andamento para `winner` (ambos já travados)
+        
+        Marca a aposta como completada, soma os ganhos, dá as conquistas e
+        monta os lançamentos do prêmio (escrow -> vencedor) e da taxa
+        (escrow -> plataforma), que zeram o escrow.
         
-        winner = User.query.get(winner_id)
-        if not winner:
-            return False, "Vencedor não encontrado"
+        Returns:
+            Lançamentos para `ledger.post_many`
+        """
+        from src.services.ledger import PLATFORM_FEE
         
-        # Transferir prêmio para o vencedor
-        winner.update_balance(float(self.total_prize), 'bet_win')
-        winner.total_winnings = float(winner.total_winnings) + float(self.total_prize)
+        prize = to_money(self.total_prize)
+        transaction = Transaction(
+            user_id=winner.id,
+            amount=prize,
+            type='bet_win',
+            description=f'Prêmio da aposta #{self.id} - R$ {prize:.2f}',
+            bet_id=self.id
+        )
+        db.session.add(transaction)
+        winner.total_winnings = to_money(winner.total_winnings) + prize
         
         # Atualizar aposta
-        self.winner_id = winner_id
+        self.winner_id = winner.id
         self.status = 'completed'
         self.completed_at = datetime.utcnow()
+        self.version = (self.version or 0) + 1
         
         # Adicionar conquistas
         winner.add_achievement('Primeira Vitória')
@@ -200,32 +445,40 @@ class Bet(BaseModel):
         if winner.games_won >= 10:
             winner.add_achievement('Sequência de 10')
         
-        self.save()
-        db.session.commit()
-        
-        return True, "Aposta completada"
+        escrow_account = self.escrow_account
+        return [
+            ('bet_win', [(winner, prize), (escrow_account, -prize)], transaction, self.id),
+            ('platform_fee', [(escrow_account, -self.platform_fee),
+                              (PLATFORM_FEE, self.platform_fee)], None, self.id),
+        ]
     
     def cancel_bet(self, reason="Cancelada pelo usuário"):
-        """Cancelar aposta"""
+        """Cancelar aposta (reembolsos e status num único commit)"""
         from src.models.user import User
         
-        if self.status == 'completed':
-            return False, "Aposta já foi completada"
-        
-        # Reembolsar jogadores se a aposta foi aceita
-        if self.status == 'matched' and self.opponent_id:
-            creator = User.query.get(self.creator_id)
-            opponent = User.query.get(self.opponent_id)
+        with unit_of_work():
+            self.lock()
+            if self.status == 'completed':
+                return abort(False, "Aposta já foi completada")
             
-            if creator:
-                creator.update_balance(float(self.amount), 'bet_refund')
-            if opponent:
-                opponent.update_balance(float(self.amount), 'bet_refund')
-        
-        self.status = 'cancelled'
-        self.save()
-        
-        return True, "Aposta cancelada"
+            # Reembolsar jogadores se a aposta foi aceita
+            if self.status == 'matched' and self.opponent_id:
+                users = User.lock_many([self.creator_id, self.opponent_id])
+                creator = users.get(self.creator_id)
+                opponent = users.get(self.opponent_id)
+                
+                if creator:
+                    creator.update_balance(self.amount, 'bet_refund',
+                                           counterpart=self.escrow_account, bet_id=self.id)
+                if opponent:
+                    opponent.update_balance(self.amount, 'bet_refund',
+                                            counterpart=self.escrow_account, bet_id=self.id)
+            
+            self.status = 'cancelled'
+            self.version = (self.version or 0) + 1
+            self.save()
+            
+            return True, "Aposta cancelada"
     
     @staticmethod
     def get_open_bets(limit=20):
@@ -234,59 +487,37 @@ class Bet(BaseModel):
                        .order_by(Bet.created_at.desc())\
                        .limit(limit).all()
     
-    def to_dict(self):
-        """Converter para dicionário"""
+    @property
+    def escrow_account(self):
+        """Conta do livro-razão com os valores retidos desta aposta"""
+        from src.services.ledger import escrow
+        return escrow('bet', self.id)
+    
+    def to_dict(self, cards=None):
+        """
+        Converter para dicionário
+        
+        `cards` (id -> cartão) evita uma busca por aposta nas listagens;
+        sem ele o cartão do criador vem do cache de cartões.
+        """
         data = super().to_dict()
         data['amount'] = float(self.amount)
         data['platform_fee'] = float(self.platform_fee)
         data['total_prize'] = float(self.total_prize)
         
         # Incluir dados do criador
-        if hasattr(self, 'creator'):
-            data['creator'] = {
-                'id': self.creator.id,
-                'username': self.creator.username,
-                'name': self.creator.name,
-                'skill_rating': self.creator.skill_rating,
-                'rank': self.creator.rank
-            }
+        if cards is None:
+            from src.services.player_cards import player_cards
+            cards = player_cards.get_cards([self.creator_id])
+        data['creator'] = cards.get(self.creator_id)
         
         return data
 
-class Transaction(BaseModel):
-    __tablename__ = 'transactions'
-    
-    # Usuário
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    
-    # Transação
-    amount = db.Column(db.Numeric(10, 2), nullable=False)
-    type = db.Column(db.String(50), nullable=False)  # deposit, withdrawal, bet_win, bet_loss, etc.
-    description = db.Column(db.String(255), nullable=True)
-    
-    # Saldos
-    balance_before = db.Column(db.Numeric(10, 2), nullable=False)
-    balance_after = db.Column(db.Numeric(10, 2), nullable=False)
-    
-    # Referências
-    bet_id = db.Column(db.Integer, db.ForeignKey('bets.id'), nullable=True)
-    game_id = db.Column(db.Integer, db.ForeignKey('games.id'), nullable=True)
-    
-    # Status
-    status = db.Column(db.String(20), default='completed')  # pending, completed, failed
-    
-    def to_dict(self):
-        """Converter para dicionário"""
-        data = super().to_dict()
-        data['amount'] = float(self.amount)
-        data['balance_before'] = float(self.balance_before)
-        data['balance_after'] = float(self.balance_after)
-        return data
-    
-    @staticmethod
-    def get_user_transactions(user_id, limit=50):
-        """Obter transações do usuário"""
-        return Transaction.query.filter_by(user_id=user_id)\
-                              .order_by(Transaction.created_at.desc())\
-                              .limit(limit).all()
+# Transações ficam em src/models/transaction.py (reexportado aqui)
+from src.models.transaction import Transaction
+
+# Tabela referenciada por Game.tournament_id
+from src.models.tournament import Tournament
 
+# Fila de liquidação dos jogos finalizados
+from src.models.settlement import Settlement
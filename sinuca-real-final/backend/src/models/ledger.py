@@ -0,0 +1,59 @@
+from src.models.database import db, BaseModel, to_money
+from datetime import datetime
+import uuid
+
+class LedgerEntry(BaseModel):
+    """
+    Perna de um lançamento do livro-razão (append-only, partidas dobradas)
+    
+    Cada movimentação grava duas ou mais pernas com o mesmo `journal_id`
+    cuja soma é zero: o que sai de uma conta entra em outra. Contas:
+    `user:<id>` (carteira), `escrow:bet:<id>` e `escrow:tournament:<id>`
+    (valores retidos), `platform_fee`, `gateway` (pagamentos externos),
+    `opening` (saldos iniciais) e `adjustments`. Linhas nunca são
+    alteradas nem apagadas; correções são novos lançamentos.
+    """
+    __tablename__ = 'ledger_entries'
+    __table_args__ = (
+        db.Index('ix_ledger_entries_account_id', 'account', 'id'),
+    )
+    
+    journal_id = db.Column(db.String(40), nullable=False, index=True)
+    account = db.Column(db.String(40), nullable=False)
+    amount = db.Column(db.Numeric(12, 2), nullable=False)  # positivo entra na conta, negativo sai
+    type = db.Column(db.String(50), nullable=False)
+    
+    # Referências
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=True)
+    bet_id = db.Column(db.Integer, db.ForeignKey('bets.id'), nullable=True)
+
+class BalanceSnapshot(BaseModel):
+    """
+    Saldo de uma conta até o lançamento `entry_id` (inclusive)
+    
+    O saldo atual é o do último snapshot mais a soma dos lançamentos
+    posteriores, sem percorrer todo o histórico.
+    """
+    __tablename__ = 'balance_snapshots'
+    __table_args__ = (
+        db.Index('ix_balance_snapshots_account_entry_id', 'account', 'entry_id'),
+    )
+    
+    account = db.Column(db.String(40), nullable=False)
+    balance = db.Column(db.Numeric(14, 2), nullable=False)
+    entry_id = db.Column(db.Integer, nullable=False)
+
+def open_wallet(mapper, connection, user):
+    """Lançar o saldo inicial (bônus de boas-vindas) da carteira criada (after_insert de User)"""
+    balance = to_money(user.balance)
+    if not balance:
+        return
+    
+    now = datetime.utcnow()
+    journal_id = uuid.uuid4().hex
+    connection.execute(LedgerEntry.__table__.insert(), [
+        {'journal_id': journal_id, 'account': f'user:{user.id}', 'amount': balance,
+         'type': 'opening', 'created_at': now, 'updated_at': now},
+        {'journal_id': journal_id, 'account': 'opening', 'amount': -balance,
+         'type': 'opening', 'created_at': now, 'updated_at': now},
+    ])
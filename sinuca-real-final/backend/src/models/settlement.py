@@ -0,0 +1,22 @@
+from src.models.database import db, BaseModel
+
+class Settlement(BaseModel):
+    """
+    Liquidação pendente de um jogo finalizado (fila durável)
+    
+    `Game.finish_game` grava o resultado e esta linha no mesmo commit; o
+    `settlement_worker` aplica estatísticas, rating, conquistas e o prêmio
+    da aposta em lotes e marca a linha como `settled` na mesma transação.
+    Uma linha por jogo (`game_id` único): nada é liquidado duas vezes.
+    """
+    __tablename__ = 'settlements'
+    __table_args__ = (
+        db.Index('ix_settlements_status_id', 'status', 'id'),
+    )
+    
+    game_id = db.Column(db.Integer, db.ForeignKey('games.id'), nullable=False, unique=True)
+    winner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    status = db.Column(db.String(20), default='pending')  # pending, settled, failed
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    settled_at = db.Column(db.DateTime, nullable=True)
@@ -0,0 +1,227 @@
+from src.models.database import db, BaseModel, to_money
+from datetime import datetime
+from decimal import Decimal
+
+class Tournament(BaseModel):
+    __tablename__ = 'tournaments'
+    
+    PLATFORM_FEE_RATE = Decimal('0.05')  # Mesma taxa das apostas (5%)
+    
+    name = db.Column(db.String(100), nullable=False)
+    creator_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    # Configurações
+    format = db.Column(db.String(20), default='single')  # single, double (eliminação simples ou dupla)
+    game_type = db.Column(db.String(20), default='8ball')
+    max_players = db.Column(db.Integer, nullable=False)
+    
+    # Valores: inscrições ficam retidas até o fim do torneio
+    entry_fee = db.Column(db.Numeric(10, 2), nullable=False)
+    prize_pool = db.Column(db.Numeric(10, 2), default=0.00)
+    platform_fee = db.Column(db.Numeric(10, 2), default=0.00)
+    players_count = db.Column(db.Integer, default=0)
+    
+    # Estado
+    status = db.Column(db.String(20), default='registration')  # registration, running, finished, cancelled
+    winner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    # Timestamps
+    starts_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def lock(self):
+        """Recarregar o torneio com SELECT ... FOR UPDATE (vagas e prêmio atuais)"""
+        return Tournament.query.filter_by(id=self.id)\
+                               .with_for_update()\
+                               .populate_existing()\
+                               .one()
+    
+    def join(self, user):
+        """Inscrever jogador (debita a inscrição; torneio e jogador travados até o commit)"""
+        from src.models.user import User
+        
+        self.lock()
+        User.lock_many([user.id])
+        if self.status != 'registration':
+            return False, "Inscrições encerradas"
+        
+        if self.players_count >= self.max_players:
+            return False, "Torneio lotado"
+        
+        if TournamentEntry.query.filter_by(tournament_id=self.id, user_id=user.id).first():
+            return False, "Você já está inscrito"
+        
+        fee = to_money(self.entry_fee)
+        if not user.can_bet(fee):
+            return False, "Saldo insuficiente"
+        
+        if fee > 0:
+            user.update_balance(-fee, 'tournament_entry', commit=False, counterpart=self.escrow_account)
+        
+        db.session.add(TournamentEntry(tournament_id=self.id, user_id=user.id))
+        self.players_count += 1
+        self.prize_pool = to_money(self.prize_pool) + fee
+        self.save()
+        
+        return True, "Inscrição realizada"
+    
+    def leave(self, user):
+        """Cancelar inscrição antes do início (reembolsa a inscrição)"""
+        from src.models.user import User
+        
+        self.lock()
+        User.lock_many([user.id])
+        if self.status != 'registration':
+            return False, "Torneio já começou"
+        
+        entry = TournamentEntry.query.filter_by(tournament_id=self.id, user_id=user.id).first()
+        if not entry:
+            return False, "Você não está inscrito"
+        
+        fee = to_money(self.entry_fee)
+        if fee > 0:
+            user.update_balance(fee, 'tournament_refund', commit=False, counterpart=self.escrow_account)
+        
+        db.session.delete(entry)
+        self.players_count -= 1
+        self.prize_pool = to_money(self.prize_pool) - fee
+        self.save()
+        
+        return True, "Inscrição cancelada"
+    
+    def cancel(self):
+        """Cancelar torneio e reembolsar os inscritos"""
+        from src.models.user import User
+        
+        self.lock()
+        if self.status != 'registration':
+            return False, "Torneio já começou"
+        
+        fee = to_money(self.entry_fee)
+        if fee > 0:
+            entries = TournamentEntry.query.filter_by(tournament_id=self.id).all()
+            users = User.lock_many([entry.user_id for entry in entries])
+            for entry in entries:
+                user = users.get(entry.user_id)
+                if user:
+                    user.update_balance(fee, 'tournament_refund', commit=False,
+                                        counterpart=self.escrow_account)
+        
+        self.status = 'cancelled'
+        self.finished_at = datetime.utcnow()
+        self.save()
+        
+        return True, "Torneio cancelado"
+    
+    def finish(self, winner_id):
+        """Encerrar torneio e pagar o prêmio ao campeão"""
+        from src.models.user import User
+        
+        pool = to_money(self.prize_pool)
+        self.platform_fee = to_money(pool * self.PLATFORM_FEE_RATE)
+        prize = pool - self.platform_fee
+        
+        self.status = 'finished'
+        self.winner_id = winner_id
+        self.finished_at = datetime.utcnow()
+        
+        winner = User.lock_many([winner_id]).get(winner_id)
+        if winner and prize > 0:
+            winner.update_balance(prize, 'tournament_win', commit=False, counterpart=self.escrow_account)
+            winner.total_winnings = to_money(winner.total_winnings) + prize
+        if self.platform_fee > 0:
+            from src.services.ledger import ledger, PLATFORM_FEE
+            ledger.post('platform_fee', [(self.escrow_account, -self.platform_fee),
+                                         (PLATFORM_FEE, self.platform_fee)])
+        if winner:
+            winner.add_achievement('Campeão de Torneio')
+        
+        entry = TournamentEntry.query.filter_by(tournament_id=self.id, user_id=winner_id).first()
+        if entry:
+            entry.status = 'champion'
+    
+    @property
+    def escrow_account(self):
+        """Conta do livro-razão com as inscrições retidas"""
+        from src.services.ledger import escrow
+        return escrow('tournament', self.id)
+    
+    @property
+    def prize(self):
+        """Prêmio do campeão (inscrições menos a taxa da plataforma)"""
+        pool = to_money(self.prize_pool)
+        return pool - to_money(pool * self.PLATFORM_FEE_RATE)
+    
+    def to_dict(self, include_bracket=False):
+        """Converter para dicionário"""
+        data = super().to_dict()
+        data['entry_fee'] = float(self.entry_fee)
+        data['prize_pool'] = float(self.prize_pool)
+        data['platform_fee'] = float(self.platform_fee)
+        data['prize'] = float(self.prize)
+        
+        if include_bracket:
+            entries = TournamentEntry.query.filter_by(tournament_id=self.id)\
+                                           .order_by(TournamentEntry.seed.asc(), TournamentEntry.id.asc()).all()
+            matches = TournamentMatch.query.filter_by(tournament_id=self.id)\
+                                           .order_by(TournamentMatch.id.asc()).all()
+            data['entries'] = [entry.to_dict() for entry in entries]
+            data['matches'] = [match.to_dict() for match in matches]
+        
+        return data
+
+class TournamentEntry(BaseModel):
+    """Inscrição de um jogador no torneio"""
+    __tablename__ = 'tournament_entries'
+    __table_args__ = (
+        db.UniqueConstraint('tournament_id', 'user_id', name='uq_tournament_entries_tournament_user'),
+    )
+    
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    seed = db.Column(db.Integer, nullable=True)  # Definido no início, por skill_rating
+    status = db.Column(db.String(20), default='registered')  # registered, playing, eliminated, champion
+
+class TournamentMatch(BaseModel):
+    """
+    Nó da chave: uma partida do torneio
+    
+    O vencedor segue para `next_match_id` (na vaga `next_slot`) e, na
+    eliminação dupla, o perdedor da chave de vencedores cai para
+    `loser_match_id`. `pending_slots` conta as vagas ainda não definidas;
+    quando chega a zero a partida começa (ou vira bye se falta oponente).
+    """
+    __tablename__ = 'tournament_matches'
+    
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournaments.id'), nullable=False, index=True)
+    bracket = db.Column(db.String(20), default='winners')  # winners, losers, final
+    round = db.Column(db.Integer, nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    
+    # Jogadores e vagas pendentes
+    player1_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    player2_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    pending_slots = db.Column(db.Integer, default=2)
+    
+    # Estado
+    status = db.Column(db.String(20), default='waiting')  # waiting, playing, finished, bye, empty
+    game_id = db.Column(db.Integer, db.ForeignKey('games.id'), nullable=True, unique=True)
+    winner_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    loser_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    
+    # Ligações da chave
+    next_match_id = db.Column(db.Integer, db.ForeignKey('tournament_matches.id'), nullable=True)
+    next_slot = db.Column(db.Integer, nullable=True)  # 1 ou 2
+    loser_match_id = db.Column(db.Integer, db.ForeignKey('tournament_matches.id'), nullable=True)
+    loser_slot = db.Column(db.Integer, nullable=True)
+    
+    game = db.relationship('Game', foreign_keys=[game_id])
+    
+    def set_player(self, slot, player_id):
+        """Preencher uma vaga (None = vaga vazia, sem jogador)"""
+        if slot == 1:
+            self.player1_id = player_id
+        else:
+            self.player2_id = player_id
+        self.pending_slots -= 1
@@ -1,63 +1,46 @@
-from src.models.database import db
-from datetime import datetime
+from src.models.database import db, BaseModel
 import json
 
-class Transaction(db.Model):
-    """Modelo para transações financeiras"""
+class Transaction(BaseModel):
+    """Modelo para transações financeiras (carteira e pagamentos)"""
     
     __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_transactions_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_transactions_external_reference', 'external_reference'),
+    )
     
-    id = db.Column(db.Integer, primary_key=True)
+    # Usuário
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    type = db.Column(db.String(50), nullable=False)  # deposit, withdrawal, bet_win, bet_loss, platform_fee
-    amount = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(50), default='pending')  # pending, approved, rejected, cancelled
-    payment_method = db.Column(db.String(50))  # pix, credit_card, debit_card
-    external_id = db.Column(db.String(100))  # ID no gateway de pagamento
-    external_reference = db.Column(db.String(100))  # Referência externa única
-    description = db.Column(db.Text)
-    metadata = db.Column(db.Text)  # JSON com dados extras
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relacionamentos
-    user = db.relationship('User', backref='transactions')
+    # Transação
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    type = db.Column(db.String(50), nullable=False)  # deposit, withdrawal, bet_win, bet_loss, platform_fee, etc.
+    description = db.Column(db.String(255), nullable=True)
     
-    def save(self):
-        """Salvar transação no banco"""
-        db.session.add(self)
-        db.session.commit()
+    # Saldos (movimentações da carteira)
+    balance_before = db.Column(db.Numeric(10, 2), nullable=True)
+    balance_after = db.Column(db.Numeric(10, 2), nullable=True)
     
-    def to_dict(self):
-        """Converter para dicionário"""
-        metadata_dict = {}
-        if self.metadata:
-            try:
-                metadata_dict = json.loads(self.metadata)
-            except:
-                pass
-        
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'type': self.type,
-            'amount': self.amount,
-            'status': self.status,
-            'payment_method': self.payment_method,
-            'external_id': self.external_id,
-            'external_reference': self.external_reference,
-            'description': self.description,
-            'metadata': metadata_dict,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    # Referências
+    bet_id = db.Column(db.Integer, db.ForeignKey('bets.id'), nullable=True)
+    game_id = db.Column(db.Integer, db.ForeignKey('games.id'), nullable=True)
+    
+    # Status
+    status = db.Column(db.String(20), default='completed')  # pending, completed, approved, rejected, cancelled, failed
+    
+    # Pagamento externo
+    payment_method = db.Column(db.String(50), nullable=True)  # pix, credit_card, debit_card
+    external_id = db.Column(db.String(100), nullable=True)  # ID no gateway de pagamento
+    external_reference = db.Column(db.String(100), nullable=True)  # Referência externa única
+    extra_data = db.Column('metadata', db.Text, nullable=True)  # JSON com dados extras
     
     @property
     def metadata_dict(self):
         """Obter metadata como dicionário"""
-        if self.metadata:
+        if self.extra_data:
             try:
-                return json.loads(self.metadata)
+                return json.loads(self.extra_data)
             except:
                 return {}
         return {}
@@ -65,8 +48,21 @@ class Transaction(db.Model):
     @metadata_dict.setter
     def metadata_dict(self, value):
         """Definir metadata como dicionário"""
-        if value:
-            self.metadata = json.dumps(value)
-        else:
-            self.metadata = None
-
+        self.extra_data = json.dumps(value) if value else None
+    
+    def to_dict(self):
+        """Converter para dicionário"""
+        data = super().to_dict()
+        data.pop('metadata', None)
+        data['amount'] = float(self.amount)
+        data['balance_before'] = float(self.balance_before) if self.balance_before is not None else None
+        data['balance_after'] = float(self.balance_after) if self.balance_after is not None else None
+        data['metadata'] = self.metadata_dict
+        return data
+    
+    @staticmethod
+    def get_user_transactions(user_id, limit=50):
+        """Obter transações do usuário"""
+        return Transaction.query.filter_by(user_id=user_id)\
+                              .order_by(Transaction.created_at.desc())\
+                              .limit(limit).all()
@@ -1,10 +1,13 @@
-from src.models.database import db, BaseModel
+from src.models.database import db, BaseModel, in_unit_of_work, to_money
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token
 import json
 
 class User(BaseModel):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_skill_rating_id', 'skill_rating', 'id'),
+    )
     
     # Informações básicas
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
@@ -30,6 +33,8 @@ class User(BaseModel):
     games_played = db.Column(db.Integer, default=0)
     games_won = db.Column(db.Integer, default=0)
     skill_rating = db.Column(db.Integer, default=1200)
+    rating_deviation = db.Column(db.Float, default=350.0)  # Glicko-2 RD
+    rating_volatility = db.Column(db.Float, default=0.06)
     
     # Conquistas (JSON)
     achievements = db.Column(db.Text, default='[]')
@@ -69,13 +74,18 @@ class User(BaseModel):
     @property
     def rank(self):
         """Determinar rank baseado no skill rating"""
-        if self.skill_rating < 1000:
+        return User.rank_for(self.skill_rating)
+    
+    @staticmethod
+    def rank_for(skill_rating):
+        """Rank correspondente a um skill rating"""
+        if skill_rating < 1000:
             return 'Bronze'
-        elif self.skill_rating < 1300:
+        elif skill_rating < 1300:
             return 'Prata'
-        elif self.skill_rating < 1600:
+        elif skill_rating < 1600:
             return 'Ouro'
-        elif self.skill_rating < 1900:
+        elif skill_rating < 1900:
             return 'Platina'
         else:
             return 'Diamante'
@@ -121,28 +131,67 @@ class User(BaseModel):
             elif self.level == 50:
                 self.add_achievement('Mestre')
     
-    def update_balance(self, amount, transaction_type='adjustment'):
-        """Atualizar saldo e criar transação"""
-        old_balance = float(self.balance)
-        self.balance = float(self.balance) + amount
+    def update_balance(self, amount, transaction_type='adjustment', commit=True,
+                       counterpart=None, bet_id=None, transaction=None):
+        """
+        Atualizar saldo e criar transação
+        
+        O saldo muda por um UPDATE atômico guardado (nunca negativo) e a
+        movimentação entra no livro-razão contra `counterpart` (escrow,
+        gateway...). `transaction` reaproveita uma transação já criada
+        (ex.: depósito pendente). Com commit=False, ou dentro de
+        `unit_of_work()`, tudo só entra na sessão: quem travou as linhas faz
+        um único commit no fim da operação.
         
-        # Criar transação
+        Raises:
+            InsufficientFunds: débito maior que o saldo
+        """
         from src.models.game import Transaction
-        transaction = Transaction(
-            user_id=self.id,
-            amount=amount,
-            type=transaction_type,
-            description=f'Ajuste de saldo: {amount:+.2f}',
-            balance_before=old_balance,
-            balance_after=float(self.balance)
-        )
-        transaction.save()
+        from src.services.ledger import ledger
+        
+        amount = to_money(amount)
+        if transaction is None:
+            transaction = Transaction(
+                user_id=self.id,
+                amount=amount,
+                type=transaction_type,
+                description=f'Ajuste de saldo: {amount:+.2f}',
+                bet_id=bet_id
+            )
+        db.session.add(transaction)
+        db.session.flush()  # id da transação para os lançamentos
+        
+        before, after = ledger.transfer(self, amount, transaction_type, counterpart=counterpart,
+                                        transaction=transaction, bet_id=bet_id)
+        transaction.balance_before = before
+        transaction.balance_after = after
+        
+        if commit and not in_unit_of_work():
+            db.session.commit()
         
         return self.balance
     
     def can_bet(self, amount):
         """Verificar se pode fazer aposta"""
-        return float(self.balance) >= amount
+        return to_money(self.balance) >= to_money(amount)
+    
+    @staticmethod
+    def lock_many(user_ids):
+        """
+        Carregar usuários com SELECT ... FOR UPDATE, travados em ordem de id
+        
+        A ordem fixa evita deadlock entre duas operações sobre o mesmo par
+        de jogadores. No SQLite o FOR UPDATE é ignorado (o lock é o do banco).
+        
+        Returns:
+            Dicionário id -> usuário
+        """
+        users = User.query.filter(User.id.in_(set(user_ids)))\
+                          .order_by(User.id)\
+                          .with_for_update()\
+                          .populate_existing()\
+                          .all()
+        return {user.id: user for user in users}
     
     def to_dict(self, include_sensitive=False):
         """Converter para dicionário"""
@@ -184,3 +233,6 @@ class User(BaseModel):
     def __repr__(self):
         return f'<User {self.username}>'
 
+# Livro-razão: o saldo inicial de cada carteira criada vira um lançamento
+from src.models.ledger import LedgerEntry, BalanceSnapshot, open_wallet
+db.event.listen(User, 'after_insert', open_wallet)
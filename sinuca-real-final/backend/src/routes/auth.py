@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from src.models.user import User
 from src.models.database import db
+from src.services.player_cards import player_cards
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -135,6 +136,7 @@ def update_profile():
             user.username = new_username
         
         user.save()
+        player_cards.invalidate(user.id)
         
         return jsonify({
             'message': 'Perfil atualizado com sucesso',
@@ -2,35 +2,44 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import User
 from src.models.game import Bet, Game
-from src.models.database import db
+from src.models.database import db, money_json
+from src.services.bet_book import bet_book, MIN_AMOUNT, MAX_AMOUNT
+from src.services.projections import bet_for_player, cards_for_bets
+from src.services.pagination import InvalidCursor, Keyset, page_args, paginate_union
+from src.services.bet_engine import bet_engine
 
 betting_bp = Blueprint('betting', __name__)
 
+# Ordem de /my-bets e /history (índices por jogador terminam em created_at, id)
+BETS_KEYSET = Keyset(Bet.created_at, Bet.id)
+
 @betting_bp.route('/bets', methods=['GET'])
+@jwt_required(optional=True)
 def get_open_bets():
-    """Obter apostas abertas"""
+    """Obter apostas abertas (filtros por valor e janela de rating)"""
     try:
+        user_id = get_jwt_identity()
         limit = request.args.get('limit', 20, type=int)
         limit = min(limit, 50)  # Máximo 50 apostas
         
-        # Buscar apostas abertas com dados do criador
-        bets = db.session.query(Bet).join(User, Bet.creator_id == User.id)\
-                        .filter(Bet.status == 'open')\
-                        .order_by(Bet.created_at.desc())\
-                        .limit(limit).all()
-        
-        bets_data = []
-        for bet in bets:
-            bet_data = bet.to_dict()
-            bet_data['creator'] = {
-                'id': bet.creator.id,
-                'username': bet.creator.username,
-                'name': bet.creator.name,
-                'skill_rating': bet.creator.skill_rating,
-                'rank': bet.creator.rank,
-                'level': bet.creator.level
-            }
-            bets_data.append(bet_data)
+        min_amount = request.args.get('min_amount', MIN_AMOUNT, type=float)
+        max_amount = request.args.get('max_amount', MAX_AMOUNT, type=float)
+        rating_window = request.args.get('rating_window', type=int)
+        
+        # Janela de rating em torno do usuário logado (ou de ?rating=)
+        rating = request.args.get('rating', type=int)
+        if rating is None and rating_window is not None and user_id:
+            user = User.query.get(user_id)
+            rating = user.skill_rating if user else None
+        
+        bets_data = bet_book.search(
+            min_amount=min_amount,
+            max_amount=max_amount,
+            rating=rating,
+            rating_window=rating_window,
+            exclude_user_id=user_id,
+            limit=limit
+        )
         
         return jsonify({
             'bets': bets_data
@@ -45,11 +54,6 @@ def create_bet():
     """Criar nova aposta"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'Usuário não encontrado'}), 404
-        
         data = request.get_json()
         amount = data.get('amount', 0)
         
@@ -63,26 +67,9 @@ def create_bet():
         if amount > 500:
             return jsonify({'error': 'Valor máximo da aposta é R$ 500,00'}), 400
         
-        if not user.can_bet(amount):
-            return jsonify({'error': 'Saldo insuficiente'}), 400
-        
-        # Calcular taxas
-        fees = Bet.calculate_fees(amount)
-        
-        # Criar aposta
-        bet = Bet(
-            creator_id=user_id,
-            amount=fees['amount'],
-            platform_fee=fees['platform_fee'],
-            total_prize=fees['total_prize']
-        )
-        bet.save()
-        
-        return jsonify({
-            'message': 'Aposta criada com sucesso',
-            'bet': bet.to_dict(),
-            'fees': fees
-        }), 201
+        # Criar aposta (no motor de apostas, se ligado)
+        status, body = bet_engine.execute('create', user_id=user_id, amount=amount)
+        return jsonify(body), status
         
     except Exception as e:
         db.session.rollback()
@@ -91,7 +78,20 @@ def create_bet():
 @betting_bp.route('/bets/<int:bet_id>/accept', methods=['POST'])
 @jwt_required()
 def accept_bet(bet_id):
-    """Aceitar aposta"""
+    """Aceitar aposta (409 se outra requisição ficou com ela)"""
+    try:
+        user_id = get_jwt_identity()
+        status, body = bet_engine.execute('accept', bet_id=bet_id, user_id=user_id)
+        return jsonify(body), status
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@betting_bp.route('/bets/accept-best', methods=['POST'])
+@jwt_required()
+def accept_best_bet():
+    """Aceitar a aposta aberta mais compatível (valor e rating do criador)"""
     try:
         user_id = get_jwt_identity()
         user = User.query.get(user_id)
@@ -99,62 +99,52 @@ def accept_bet(bet_id):
         if not user:
             return jsonify({'error': 'Usuário não encontrado'}), 404
         
-        bet = Bet.query.get(bet_id)
-        if not bet:
-            return jsonify({'error': 'Aposta não encontrada'}), 404
-        
-        if bet.status != 'open':
-            return jsonify({'error': 'Aposta não está disponível'}), 400
-        
-        if bet.creator_id == user_id:
-            return jsonify({'error': 'Você não pode aceitar sua própria aposta'}), 400
-        
-        # Aceitar aposta
-        success, message = bet.accept_bet(user_id)
-        
-        if not success:
-            return jsonify({'error': message}), 400
-        
-        return jsonify({
-            'message': message,
-            'bet': bet.to_dict(),
-            'game_id': bet.game.id if bet.game else None
-        }), 200
+        data = request.get_json() or {}
+        try:
+            min_amount = float(data.get('min_amount', MIN_AMOUNT))
+            max_amount = float(data.get('max_amount', MAX_AMOUNT))
+            rating_window = data.get('rating_window')
+            rating_window = int(rating_window) if rating_window is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Filtros inválidos'}), 400
+        
+        if min_amount > max_amount:
+            return jsonify({'error': 'Valor mínimo maior que o máximo'}), 400
+        
+        # Reservar a melhor aposta no livro (outra requisição não a recebe)
+        bet_id = bet_book.best_match(user_id, user.skill_rating, min_amount, max_amount, rating_window)
+        if bet_id is None:
+            return jsonify({'error': 'Nenhuma aposta compatível encontrada'}), 404
+        
+        try:
+            status, body = bet_engine.execute('accept', bet_id=bet_id, user_id=user_id)
+        except Exception:
+            # Erro ou tempo esgotado: a aposta pode continuar aberta
+            _restore_reserved(bet_id)
+            raise
+        if status not in (200, 409):
+            _restore_reserved(bet_id)
+        return jsonify(body), status
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+def _restore_reserved(bet_id):
+    """Devolver ao livro a aposta reservada se o aceite não aconteceu (lida do banco)"""
+    db.session.rollback()
+    bet = db.session.get(Bet, bet_id)
+    if bet:
+        bet_book.restore(bet)
+
 @betting_bp.route('/bets/<int:bet_id>/cancel', methods=['POST'])
 @jwt_required()
 def cancel_bet(bet_id):
     """Cancelar aposta"""
     try:
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'Usuário não encontrado'}), 404
-        
-        bet = Bet.query.get(bet_id)
-        if not bet:
-            return jsonify({'error': 'Aposta não encontrada'}), 404
-        
-        if bet.creator_id != user_id:
-            return jsonify({'error': 'Você só pode cancelar suas próprias apostas'}), 403
-        
-        if bet.status not in ['open', 'matched']:
-            return jsonify({'error': 'Aposta não pode ser cancelada'}), 400
-        
-        # Cancelar aposta
-        success, message = bet.cancel_bet()
-        
-        if not success:
-            return jsonify({'error': message}), 400
-        
-        return jsonify({
-            'message': message
-        }), 200
+        status, body = bet_engine.execute('cancel', bet_id=bet_id, user_id=user_id)
+        return jsonify(body), status
         
     except Exception as e:
         db.session.rollback()
@@ -163,45 +153,28 @@ def cancel_bet(bet_id):
 @betting_bp.route('/my-bets', methods=['GET'])
 @jwt_required()
 def get_my_bets():
-    """Obter apostas do usuário"""
+    """Obter apostas do usuário (paginado por cursor)"""
     try:
         user_id = get_jwt_identity()
+        limit, after, offset = page_args(request, BETS_KEYSET)
         
-        # Apostas criadas pelo usuário
-        created_bets = Bet.query.filter_by(creator_id=user_id)\
-                              .order_by(Bet.created_at.desc()).all()
-        
-        # Apostas aceitas pelo usuário
-        accepted_bets = Bet.query.filter_by(opponent_id=user_id)\
-                               .order_by(Bet.created_at.desc()).all()
-        
-        # Combinar e ordenar
-        all_bets = created_bets + accepted_bets
-        all_bets.sort(key=lambda x: x.created_at, reverse=True)
+        # Apostas criadas ou aceitas pelo usuário; cartões numa busca só
+        page = paginate_union(
+            Bet.query, Bet, BETS_KEYSET,
+            [Bet.creator_id == user_id, Bet.opponent_id == user_id],
+            limit, after, offset
+        )
         
-        bets_data = []
-        for bet in all_bets:
-            bet_data = bet.to_dict()
-            bet_data['user_role'] = 'creator' if bet.creator_id == user_id else 'opponent'
-            
-            # Adicionar dados do oponente
-            if bet.opponent_id:
-                opponent = User.query.get(bet.opponent_id)
-                if opponent:
-                    bet_data['opponent'] = {
-                        'id': opponent.id,
-                        'username': opponent.username,
-                        'name': opponent.name,
-                        'skill_rating': opponent.skill_rating,
-                        'rank': opponent.rank
-                    }
-            
-            bets_data.append(bet_data)
+        cards = cards_for_bets(page.items)
+        bets_data = [bet_for_player(bet, user_id, cards) for bet in page.items]
         
         return jsonify({
-            'bets': bets_data
+            'bets': bets_data,
+            'next_cursor': page.next_cursor
         }), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'Cursor inválido'}), 400
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
@@ -217,7 +190,7 @@ def calculate_bet_fees():
         
         fees = Bet.calculate_fees(amount)
         
-        return jsonify(fees), 200
+        return jsonify(money_json(fees)), 200
         
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
@@ -225,28 +198,27 @@ def calculate_bet_fees():
 @betting_bp.route('/history', methods=['GET'])
 @jwt_required()
 def get_betting_history():
-    """Obter histórico de apostas do usuário"""
+    """Obter histórico de apostas do usuário (paginado por cursor; estatísticas da página)"""
     try:
         user_id = get_jwt_identity()
-        limit = request.args.get('limit', 20, type=int)
-        limit = min(limit, 50)
+        limit, after, offset = page_args(request, BETS_KEYSET)
         
         # Apostas completadas do usuário
-        completed_bets = Bet.query.filter(
-            db.or_(
-                Bet.creator_id == user_id,
-                Bet.opponent_id == user_id
-            )
-        ).filter_by(status='completed')\
-         .order_by(Bet.completed_at.desc())\
-         .limit(limit).all()
+        completed = Bet.status == 'completed'
+        page = paginate_union(
+            Bet.query, Bet, BETS_KEYSET,
+            [db.and_(Bet.creator_id == user_id, completed),
+             db.and_(Bet.opponent_id == user_id, completed)],
+            limit, after, offset
+        )
         
         history = []
         total_won = 0
         total_lost = 0
         
-        for bet in completed_bets:
-            bet_data = bet.to_dict()
+        cards = cards_for_bets(page.items)
+        for bet in page.items:
+            bet_data = bet.to_dict(cards)
             
             # Determinar se ganhou ou perdeu
             if bet.winner_id == user_id:
@@ -269,9 +241,12 @@ def get_betting_history():
         
         return jsonify({
             'history': history,
-            'stats': stats
+            'stats': stats,
+            'next_cursor': page.next_cursor
         }), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'Cursor inválido'}), 400
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
@@ -1,11 +1,25 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import User
 from src.models.game import Game, Bet
 from src.models.database import db
+from src.services.game_events import ChannelFull, game_events
+from src.services.game_store import game_store, rule_fields
+from src.services.projections import cards_for_games, game_detail, game_for_player, games_with_bet, open_game
+from src.services.pagination import InvalidCursor, Keyset, page_args, paginate_union
+from src.services.table_codec import decode_table, encode_table
+from src.services.shot_simulator import shot_simulator, MAX_SHOTS
+from src.services.replay_verifier import replay_verifier
+from src.services.settlement import settlement_worker
+
+import base64
+import math
 
 game_bp = Blueprint('game', __name__)
 
+# Ordem de /my-games (índices por jogador terminam em created_at, id)
+GAMES_KEYSET = Keyset(Game.created_at, Game.id)
+
 @game_bp.route('/create', methods=['POST'])
 @jwt_required()
 def create_game():
@@ -93,8 +107,8 @@ def start_game(game_id):
         if not game.player2_id:
             return jsonify({'error': 'Aguardando segundo jogador'}), 400
         
-        # Iniciar jogo
-        game.start_game()
+        # Iniciar jogo (passa a ser servido da memória)
+        game_store.start(game)
         
         return jsonify({
             'message': 'Jogo iniciado',
@@ -128,11 +142,63 @@ def finish_game(game_id):
         if winner_id not in [game.player1_id, game.player2_id]:
             return jsonify({'error': 'Vencedor inválido'}), 400
         
-        # Finalizar jogo
-        game.finish_game(winner_id)
+        # Gravar o estado em memória antes de conferir e finalizar
+        game_store.close(game_id)
+        
+        # Confirmar vencedor pelo replay do histórico de tacadas
+        # (obrigatório em jogos com dinheiro: aposta ou torneio)
+        if game.tournament_id and not game.load_shots():
+            return jsonify({'error': 'Jogo de torneio sem histórico de tacadas'}), 400
+        
+        if game.bet_id or game.tournament_id or game.shot_log or game.game_data_dict.get('shots'):
+            verified, message = replay_verifier.verify_game(game, winner_id)
+            if not verified:
+                return jsonify({'error': message}), 400
+        
+        # Finalizar jogo (estatísticas e prêmio ficam para o worker de liquidação)
+        success, message = game.finish_game(winner_id)
+        if not success:
+            return jsonify({'error': message}), 400
+        
+        return jsonify({
+            'message': message,
+            'game': game.to_dict(),
+            'settlement': 'pending'
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@game_bp.route('/<int:game_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_game(game_id):
+    """Cancelar jogo sem aposta"""
+    try:
+        user_id = get_jwt_identity()
+        
+        game = Game.query.get(game_id)
+        if not game:
+            return jsonify({'error': 'Jogo não encontrado'}), 404
+        
+        if game.player1_id != user_id and game.player2_id != user_id:
+            return jsonify({'error': 'Você não está neste jogo'}), 403
+        
+        if game.status not in ['waiting', 'playing']:
+            return jsonify({'error': 'Jogo não pode ser cancelado'}), 400
+        
+        if game.bet_id:
+            return jsonify({'error': 'Jogos com aposta não podem ser cancelados'}), 400
+        
+        if game.tournament_id:
+            return jsonify({'error': 'Jogos de torneio não podem ser cancelados'}), 400
+        
+        # Gravar o estado em memória antes de cancelar
+        game_store.close(game_id)
+        game.cancel_game()
         
         return jsonify({
-            'message': 'Jogo finalizado',
+            'message': 'Jogo cancelado',
             'game': game.to_dict()
         }), 200
         
@@ -146,8 +212,19 @@ def get_game(game_id):
     """Obter dados do jogo"""
     try:
         user_id = get_jwt_identity()
+        debug = request.args.get('debug') == '1'
         
-        game = Game.query.get(game_id)
+        # Jogo em andamento: resposta montada da memória
+        live = game_store.get(game_id)
+        if live:
+            if live.player1_id != user_id and live.player2_id != user_id:
+                return jsonify({'error': 'Acesso negado'}), 403
+            
+            return jsonify({
+                'game': live.to_dict(debug=debug)
+            }), 200
+        
+        game = games_with_bet().filter(Game.id == game_id).first()
         if not game:
             return jsonify({'error': 'Jogo não encontrado'}), 404
         
@@ -155,36 +232,9 @@ def get_game(game_id):
         if game.player1_id != user_id and game.player2_id != user_id:
             return jsonify({'error': 'Acesso negado'}), 403
         
-        game_data = game.to_dict()
-        
-        # Adicionar dados dos jogadores
-        if game.player1_id:
-            player1 = User.query.get(game.player1_id)
-            if player1:
-                game_data['player1'] = {
-                    'id': player1.id,
-                    'username': player1.username,
-                    'name': player1.name,
-                    'skill_rating': player1.skill_rating,
-                    'rank': player1.rank
-                }
-        
-        if game.player2_id:
-            player2 = User.query.get(game.player2_id)
-            if player2:
-                game_data['player2'] = {
-                    'id': player2.id,
-                    'username': player2.username,
-                    'name': player2.name,
-                    'skill_rating': player2.skill_rating,
-                    'rank': player2.rank
-                }
-        
-        # Adicionar dados da aposta se existir
-        if game.bet_id:
-            bet = Bet.query.get(game.bet_id)
-            if bet:
-                game_data['bet'] = bet.to_dict()
+        # Aposta na mesma consulta; jogadores do cache de cartões
+        game_data = game_detail(game, debug=debug)
+        game_data['game_data_dict'] = game.current_state()
         
         return jsonify({
             'game': game_data
@@ -193,6 +243,69 @@ def get_game(game_id):
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@game_bp.route('/<int:game_id>/events', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_game_events(game_id):
+    """Eventos do jogo ao vivo (Server-Sent Events)"""
+    try:
+        user_id = get_jwt_identity()
+        
+        game = game_store.get(game_id) or Game.query.get(game_id)
+        if not game:
+            return jsonify({'error': 'Jogo não encontrado'}), 404
+        
+        if game.player1_id != user_id and game.player2_id != user_id:
+            return jsonify({'error': 'Acesso negado'}), 403
+        
+        # Retomar a partir do último evento recebido
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id', 0)
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            last_event_id = 0
+        
+        # Jogo encerrado sem canal em memória (ex.: após reinício)
+        if not game_events.has_channel(game_id) and game.status in ['finished', 'cancelled']:
+            if game.status == 'finished':
+                game_events.publish(game_id, 'finish', {'winner_id': game.winner_id}, close=True)
+            else:
+                game_events.publish(game_id, 'cancel', {}, close=True)
+        
+        return Response(game_events.stream(game_id, last_event_id),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@game_bp.route('/<int:game_id>/watch', methods=['GET'])
+def watch_game(game_id):
+    """Assistir ao jogo como espectador (Server-Sent Events)"""
+    try:
+        game = game_store.get(game_id)
+        if not game and not game_events.has_channel(game_id):
+            if not Game.query.get(game_id):
+                return jsonify({'error': 'Jogo não encontrado'}), 404
+            return jsonify({'error': 'Jogo não está em andamento'}), 400
+        
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id', 0)
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            last_event_id = 0
+        
+        try:
+            stream = game_events.stream(game_id, last_event_id, spectator=True)
+        except ChannelFull:
+            return jsonify({'error': 'Limite de espectadores atingido'}), 503
+        
+        return Response(stream,
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
 @game_bp.route('/<int:game_id>/update', methods=['POST'])
 @jwt_required()
 def update_game_state(game_id):
@@ -200,70 +313,259 @@ def update_game_state(game_id):
     try:
         user_id = get_jwt_identity()
         
-        game = Game.query.get(game_id)
-        if not game:
-            return jsonify({'error': 'Jogo não encontrado'}), 404
+        live = game_store.get(game_id)
+        if not live:
+            if not Game.query.get(game_id):
+                return jsonify({'error': 'Jogo não encontrado'}), 404
+            return jsonify({'error': 'Jogo não está em andamento'}), 400
         
-        if game.player1_id != user_id and game.player2_id != user_id:
+        if live.player1_id != user_id and live.player2_id != user_id:
             return jsonify({'error': 'Você não está neste jogo'}), 403
         
-        if game.status != 'playing':
+        data = request.get_json()
+        
+        # Jogada incremental: aplicada em memória, gravada em lote
+        if 'patch' in data:
+            sequence = data.get('sequence')
+            if not isinstance(sequence, int) or not isinstance(data['patch'], dict):
+                return jsonify({'error': 'Sequência e patch são obrigatórios'}), 400
+            
+            protected = rule_fields(data['patch'])
+            if protected:
+                return jsonify({
+                    'error': 'Campos controlados pelo servidor',
+                    'fields': protected
+                }), 400
+            
+            success, message, expected = live.apply_move(user_id, sequence, data['patch'])
+            if not success:
+                return jsonify({
+                    'error': message,
+                    'expected_sequence': expected
+                }), 409
+            
+            return jsonify({
+                'message': message,
+                'sequence': sequence,
+                'next_sequence': expected
+            }), 200
+        
+        game_state = data.get('game_state', {})
+        if not isinstance(game_state, dict):
+            return jsonify({'error': 'Estado do jogo inválido'}), 400
+        
+        protected = rule_fields(game_state)
+        if protected:
+            return jsonify({
+                'error': 'Campos controlados pelo servidor',
+                'fields': protected
+            }), 400
+        
+        # Atualizar estado do jogo (snapshot completo, substitui as jogadas anteriores)
+        success, message = live.replace_state(game_state)
+        if not success:
+            return jsonify({'error': message}), 400
+        
+        return jsonify({
+            'message': message,
+            'game_data': live.current_state()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@game_bp.route('/<int:game_id>/shot', methods=['POST'])
+@jwt_required()
+def play_shot(game_id):
+    """Executar tacada no servidor a partir de (ângulo, força)"""
+    try:
+        user_id = get_jwt_identity()
+        
+        live = game_store.get(game_id)
+        if not live:
+            if not Game.query.get(game_id):
+                return jsonify({'error': 'Jogo não encontrado'}), 404
             return jsonify({'error': 'Jogo não está em andamento'}), 400
         
+        if live.player1_id != user_id and live.player2_id != user_id:
+            return jsonify({'error': 'Você não está neste jogo'}), 403
+        
         data = request.get_json()
-        game_state = data.get('game_state', {})
+        angle = data.get('angle')
+        power = data.get('power')
+        cue_position = data.get('cue_position')
         
-        # Atualizar estado do jogo
-        game.update_game_data(game_state)
-        game.save()
+        if not isinstance(angle, (int, float)) or not isinstance(power, (int, float)):
+            return jsonify({'error': 'Ângulo e força são obrigatórios'}), 400
+        
+        if not math.isfinite(angle) or not math.isfinite(power):
+            return jsonify({'error': 'Ângulo e força devem ser números finitos'}), 400
+        
+        if power <= 0 or power > 100:
+            return jsonify({'error': 'Força deve estar entre 0 e 100'}), 400
+        
+        if cue_position is not None:
+            try:
+                cue_position = (float(cue_position[0]), float(cue_position[1]))
+            except (IndexError, TypeError, ValueError):
+                return jsonify({'error': 'Posição da branca inválida'}), 400
+        
+        # Aplicar regras e simular tacada a partir do estado em memória
+        success, message, result = live.play_shot(user_id, angle, power, cue_position)
+        if not success:
+            return jsonify({'error': message}), 400
         
         return jsonify({
-            'message': 'Estado do jogo atualizado',
-            'game_data': game.game_data_dict
+            'message': 'Tacada executada',
+            'shot': result.to_dict(),
+            'game_data': live.current_state(),
+            'table_state': base64.b64encode(live.table_state).decode()
         }), 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@game_bp.route('/<int:game_id>/simulate', methods=['POST'])
+@jwt_required()
+def simulate_shots(game_id):
+    """Simular tacadas candidatas sobre o estado atual da mesa"""
+    try:
+        user_id = get_jwt_identity()
+        
+        game = game_store.get(game_id) or Game.query.get(game_id)
+        if not game:
+            return jsonify({'error': 'Jogo não encontrado'}), 404
+        
+        if game.player1_id != user_id and game.player2_id != user_id:
+            return jsonify({'error': 'Você não está neste jogo'}), 403
+        
+        data = request.get_json()
+        shots = data.get('shots', [])
+        include_table = data.get('include_table', True)
+        
+        if not shots:
+            return jsonify({'error': 'Informe ao menos uma tacada'}), 400
+        
+        if len(shots) > MAX_SHOTS:
+            return jsonify({'error': f'Máximo de {MAX_SHOTS} tacadas por simulação'}), 400
+        
+        try:
+            candidates = [(float(shot['angle']), float(shot['power'])) for shot in shots]
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'Cada tacada precisa de ângulo e força'}), 400
+        
+        if not all(math.isfinite(angle) and math.isfinite(power) for angle, power in candidates):
+            return jsonify({'error': 'Ângulo e força devem ser números finitos'}), 400
+        
+        if any(power <= 0 or power > 100 for _, power in candidates):
+            return jsonify({'error': 'Força deve estar entre 0 e 100'}), 400
+        
+        table = decode_table(game.table_state) if game.table_state else game.load_table()
+        results = shot_simulator.simulate(table, candidates)
+        
+        results_data = []
+        for (angle, power), result in zip(candidates, results):
+            shot_data = result.to_dict()
+            if not include_table:
+                shot_data.pop('table')
+            shot_data['angle'] = angle
+            shot_data['power'] = power
+            results_data.append(shot_data)
+        
+        return jsonify({
+            'results': results_data
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@game_bp.route('/<int:game_id>/state', methods=['GET'])
+@jwt_required()
+def get_table_state(game_id):
+    """Obter a mesa atual no formato binário (application/octet-stream)"""
+    try:
+        user_id = get_jwt_identity()
+        
+        game = game_store.get(game_id) or Game.query.get(game_id)
+        if not game:
+            return jsonify({'error': 'Jogo não encontrado'}), 404
+        
+        if game.player1_id != user_id and game.player2_id != user_id:
+            return jsonify({'error': 'Acesso negado'}), 403
+        
+        return Response(game.table_state or encode_table(game.load_table()),
+                        mimetype='application/octet-stream')
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@game_bp.route('/<int:game_id>/replay', methods=['GET'])
+@jwt_required()
+def get_replay(game_id):
+    """Obter o histórico de tacadas no formato binário (application/octet-stream)"""
+    try:
+        user_id = get_jwt_identity()
+        
+        game = game_store.get(game_id) or Game.query.get(game_id)
+        if not game:
+            return jsonify({'error': 'Jogo não encontrado'}), 404
+        
+        if game.player1_id != user_id and game.player2_id != user_id:
+            return jsonify({'error': 'Acesso negado'}), 403
+        
+        return Response(game.shot_log or b'', mimetype='application/octet-stream')
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
 @game_bp.route('/my-games', methods=['GET'])
 @jwt_required()
 def get_my_games():
-    """Obter jogos do usuário"""
+    """Obter jogos do usuário (paginado por cursor)"""
     try:
         user_id = get_jwt_identity()
-        limit = request.args.get('limit', 20, type=int)
-        limit = min(limit, 50)
+        limit, after, offset = page_args(request, GAMES_KEYSET)
         
-        # Jogos do usuário
-        games = Game.query.filter(
-            db.or_(
-                Game.player1_id == user_id,
-                Game.player2_id == user_id
-            )
-        ).order_by(Game.created_at.desc()).limit(limit).all()
+        # Jogos do usuário; cartões dos oponentes numa busca só
+        page = paginate_union(
+            games_with_bet(), Game, GAMES_KEYSET,
+            [Game.player1_id == user_id, Game.player2_id == user_id],
+            limit, after, offset
+        )
+        
+        cards = cards_for_games(page.items)
+        games_data = [game_for_player(game, user_id, cards) for game in page.items]
+        
+        return jsonify({
+            'games': games_data,
+            'next_cursor': page.next_cursor
+        }), 200
+        
+    except InvalidCursor:
+        return jsonify({'error': 'Cursor inválido'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@game_bp.route('/live', methods=['GET'])
+def get_live_games():
+    """Jogos em andamento com aposta, das maiores apostas para as menores"""
+    try:
+        limit = request.args.get('limit', 10, type=int)
+        limit = min(limit, 20)
+        
+        games = Game.query.join(Bet, Game.bet_id == Bet.id)\
+                          .filter(Game.status == 'playing')\
+                          .order_by(Bet.amount.desc())\
+                          .limit(limit).all()
         
         games_data = []
         for game in games:
-            game_data = game.to_dict()
-            
-            # Adicionar dados do oponente
-            opponent_id = game.player2_id if game.player1_id == user_id else game.player1_id
-            if opponent_id:
-                opponent = User.query.get(opponent_id)
-                if opponent:
-                    game_data['opponent'] = {
-                        'id': opponent.id,
-                        'username': opponent.username,
-                        'name': opponent.name,
-                        'skill_rating': opponent.skill_rating,
-                        'rank': opponent.rank
-                    }
-            
-            # Resultado para o usuário
-            if game.winner_id:
-                game_data['result'] = 'won' if game.winner_id == user_id else 'lost'
-            
+            live = game_store.get(game.id)
+            game_data = live.to_dict() if live else game.to_dict()
+            metrics = game_events.metrics(game.id)
+            game_data['spectators'] = metrics['spectators'] if metrics else 0
             games_data.append(game_data)
         
         return jsonify({
@@ -273,6 +575,33 @@ def get_my_games():
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@game_bp.route('/broadcast/metrics', methods=['GET'])
+@jwt_required()
+def get_broadcast_metrics():
+    """Métricas dos streams ao vivo: clientes conectados e atraso de entrega"""
+    try:
+        channels = game_events.metrics()
+        
+        return jsonify({
+            'channels': {str(game_id): metrics for game_id, metrics in channels.items()},
+            'subscribers': sum(m['subscribers'] for m in channels.values()),
+            'spectators': sum(m['spectators'] for m in channels.values()),
+            'max_broadcast_lag_ms': max((m['broadcast_lag_ms'] for m in channels.values()), default=0)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@game_bp.route('/settlements/stats', methods=['GET'])
+@jwt_required()
+def get_settlement_stats():
+    """Fila de liquidação: jogos pendentes e atraso da mais antiga"""
+    try:
+        return jsonify(settlement_worker.stats()), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
 @game_bp.route('/active', methods=['GET'])
 def get_active_games():
     """Obter jogos ativos (aguardando jogadores)"""
@@ -280,28 +609,14 @@ def get_active_games():
         limit = request.args.get('limit', 10, type=int)
         limit = min(limit, 20)
         
-        # Jogos aguardando jogadores
-        games = Game.query.filter_by(status='waiting')\
-                         .filter(Game.player2_id.is_(None))\
-                         .order_by(Game.created_at.desc())\
-                         .limit(limit).all()
+        # Jogos aguardando jogadores; cartões dos criadores numa busca só
+        games = Game.query.filter(Game.status == 'waiting')\
+                          .filter(Game.player2_id.is_(None))\
+                          .order_by(Game.created_at.desc())\
+                          .limit(limit).all()
         
-        games_data = []
-        for game in games:
-            game_data = game.to_dict()
-            
-            # Adicionar dados do criador
-            creator = User.query.get(game.player1_id)
-            if creator:
-                game_data['creator'] = {
-                    'id': creator.id,
-                    'username': creator.username,
-                    'name': creator.name,
-                    'skill_rating': creator.skill_rating,
-                    'rank': creator.rank
-                }
-            
-            games_data.append(game_data)
+        cards = cards_for_games(games)
+        games_data = [open_game(game, cards) for game in games]
         
         return jsonify({
             'games': games_data
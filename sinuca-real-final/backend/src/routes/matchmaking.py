@@ -0,0 +1,87 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.models.user import User
+from src.models.game import Game
+from src.models.database import db
+from src.services.matchmaking import matchmaker
+
+matchmaking_bp = Blueprint('matchmaking', __name__)
+
+@matchmaking_bp.route('/queue', methods=['POST'])
+@jwt_required()
+def join_queue():
+    """Entrar na fila de matchmaking"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user:
+            return jsonify({'error': 'Usuário não encontrado'}), 404
+        
+        data = request.get_json() or {}
+        game_type = data.get('game_type', '8ball')
+        time_limit = data.get('time_limit', 300)
+        
+        ticket = matchmaker.enqueue(user, game_type, time_limit)
+        
+        if ticket.game_id:
+            return jsonify({
+                'message': 'Oponente encontrado',
+                'matchmaking': ticket.to_dict(),
+                'game': Game.query.get(ticket.game_id).to_dict()
+            }), 201
+        
+        return jsonify({
+            'message': 'Aguardando oponente',
+            'matchmaking': ticket.to_dict()
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@matchmaking_bp.route('/queue', methods=['GET'])
+@jwt_required()
+def get_queue_status():
+    """Situação do jogador na fila"""
+    try:
+        user_id = get_jwt_identity()
+        
+        ticket = matchmaker.status(user_id)
+        if not ticket:
+            return jsonify({'error': 'Você não está na fila'}), 404
+        
+        return jsonify({
+            'matchmaking': ticket.to_dict()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@matchmaking_bp.route('/queue', methods=['DELETE'])
+@jwt_required()
+def leave_queue():
+    """Sair da fila de matchmaking"""
+    try:
+        user_id = get_jwt_identity()
+        
+        if not matchmaker.cancel(user_id):
+            return jsonify({'error': 'Você não está na fila'}), 404
+        
+        return jsonify({
+            'message': 'Você saiu da fila'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@matchmaking_bp.route('/stats', methods=['GET'])
+def get_queue_stats():
+    """Jogadores aguardando por tipo de jogo"""
+    try:
+        return jsonify({
+            'waiting': matchmaker.stats()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
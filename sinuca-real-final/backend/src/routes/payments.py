@@ -2,13 +2,18 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import User
 from src.models.game import Transaction
-from src.models.database import db
+from src.models.database import db, to_money
 from src.services.mercadopago_service import mercadopago_service
+from src.services.pagination import InvalidCursor, Keyset, page_args, paginate
+from src.services.ledger import InsufficientFunds
 import uuid
 from datetime import datetime
 
 payments_bp = Blueprint('payments', __name__)
 
+# Ordem do extrato (índice user_id, created_at)
+TRANSACTIONS_KEYSET = Keyset(Transaction.created_at, Transaction.id)
+
 @payments_bp.route('/deposit/pix', methods=['POST'])
 @jwt_required()
 def create_pix_deposit():
@@ -137,12 +142,12 @@ def create_card_deposit():
             external_reference=external_reference,
             description=f"Depósito via cartão - {installments}x R$ {amount/installments:.2f}"
         )
-        transaction.save()
+        db.session.add(transaction)
         
-        # Se aprovado, creditar na carteira
+        # Se aprovado, creditar na carteira (mesmo commit da transação)
         if status == 'approved':
-            user.balance += amount
-            user.save()
+            user.update_balance(amount, 'deposit', commit=False, transaction=transaction)
+        db.session.commit()
         
         return jsonify({
             'message': 'Pagamento processado com sucesso',
@@ -181,13 +186,6 @@ def create_withdrawal():
         if amount < 20:
             return jsonify({'error': 'Valor mínimo para saque é R$ 20,00'}), 400
         
-        if amount > user.balance:
-            return jsonify({'error': 'Saldo insuficiente'}), 400
-        
-        # Debitar da carteira
-        user.balance -= amount
-        user.save()
-        
         # Criar transação de saque
         transaction = Transaction(
             user_id=user_id,
@@ -196,9 +194,15 @@ def create_withdrawal():
             status='pending',
             payment_method='pix',
             description=f"Saque via PIX - R$ {amount:.2f}",
-            metadata={'pix_key': pix_key}
+            metadata_dict={'pix_key': pix_key}
         )
-        transaction.save()
+        
+        # Debitar da carteira (o UPDATE atômico não deixa o saldo negativo)
+        try:
+            user.update_balance(-to_money(amount), 'withdrawal', transaction=transaction)
+        except InsufficientFunds:
+            db.session.rollback()
+            return jsonify({'error': 'Saldo insuficiente'}), 400
         
         return jsonify({
             'message': 'Solicitação de saque criada com sucesso',
@@ -216,18 +220,15 @@ def create_withdrawal():
 @payments_bp.route('/transactions', methods=['GET'])
 @jwt_required()
 def get_transactions():
-    """Obter histórico de transações"""
+    """Obter histórico de transações (paginado por cursor)"""
     try:
         user_id = get_jwt_identity()
-        limit = request.args.get('limit', 20, type=int)
-        limit = min(limit, 50)
+        limit, after, offset = page_args(request, TRANSACTIONS_KEYSET)
         
-        transactions = Transaction.query.filter_by(user_id=user_id)\
-                                      .order_by(Transaction.created_at.desc())\
-                                      .limit(limit).all()
+        page = paginate(Transaction.query.filter_by(user_id=user_id), TRANSACTIONS_KEYSET, limit, after, offset)
         
         transactions_data = []
-        for transaction in transactions:
+        for transaction in page.items:
             transaction_data = transaction.to_dict()
             
             # Adicionar informações específicas do tipo
@@ -250,9 +251,12 @@ def get_transactions():
             transactions_data.append(transaction_data)
         
         return jsonify({
-            'transactions': transactions_data
+            'transactions': transactions_data,
+            'next_cursor': page.next_cursor
         }), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'Cursor inválido'}), 400
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
@@ -307,9 +311,10 @@ def mercadopago_webhook():
             external_reference = result.get("external_reference")
             
             if external_reference:
+                # Transação travada: webhook e consulta de status não creditam duas vezes
                 transaction = Transaction.query.filter_by(
                     external_reference=external_reference
-                ).first()
+                ).with_for_update().first()
                 
                 if transaction:
                     old_status = transaction.status
@@ -317,7 +322,6 @@ def mercadopago_webhook():
                     
                     # Atualizar status da transação
                     transaction.status = new_status
-                    transaction.save()
                     
                     # Se pagamento foi aprovado e era depósito
                     if (new_status == 'approved' and 
@@ -325,10 +329,12 @@ def mercadopago_webhook():
                         transaction.type == 'deposit'):
                         
                         # Creditar na carteira do usuário
-                        user = User.query.get(transaction.user_id)
+                        user = db.session.get(User, transaction.user_id)
                         if user:
-                            user.balance += transaction.amount
-                            user.save()
+                            user.update_balance(transaction.amount, 'deposit', commit=False,
+                                                transaction=transaction)
+                    
+                    db.session.commit()
         
         return jsonify({'status': 'ok'}), 200
         
@@ -356,20 +362,24 @@ def get_payment_status(payment_id):
         
         if payment_info["success"]:
             # Atualizar status local se necessário
+            transaction = Transaction.query.filter_by(id=transaction.id)\
+                                           .with_for_update()\
+                                           .populate_existing()\
+                                           .one()
             if transaction.status != payment_info["status"]:
                 old_status = transaction.status
                 transaction.status = payment_info["status"]
-                transaction.save()
                 
                 # Se foi aprovado e é depósito, creditar
                 if (payment_info["status"] == 'approved' and 
                     old_status == 'pending' and 
                     transaction.type == 'deposit'):
                     
-                    user = User.query.get(user_id)
+                    user = db.session.get(User, user_id)
                     if user:
-                        user.balance += transaction.amount
-                        user.save()
+                        user.update_balance(transaction.amount, 'deposit', commit=False,
+                                            transaction=transaction)
+            db.session.commit()
             
             return jsonify({
                 'payment_id': payment_id,
@@ -0,0 +1,214 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime, timedelta
+from src.models.user import User
+from src.models.tournament import Tournament
+from src.models.database import db
+from src.services.tournament_engine import tournament_engine, naive_utc, BRACKET_SIZES
+
+tournament_bp = Blueprint('tournament', __name__)
+
+@tournament_bp.route('/', methods=['GET'])
+def get_tournaments():
+    """Listar torneios (filtro por status)"""
+    try:
+        status = request.args.get('status', 'registration')
+        limit = min(request.args.get('limit', 20, type=int), 50)
+        
+        tournaments = Tournament.query.filter_by(status=status)\
+                                      .order_by(Tournament.starts_at.asc())\
+                                      .limit(limit).all()
+        
+        return jsonify({
+            'tournaments': [tournament.to_dict() for tournament in tournaments]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@tournament_bp.route('/', methods=['POST'])
+@jwt_required()
+def create_tournament():
+    """Criar torneio"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user:
+            return jsonify({'error': 'Usuário não encontrado'}), 404
+        
+        data = request.get_json() or {}
+        name = (data.get('name') or '').strip()
+        tournament_format = data.get('format', 'single')
+        max_players = data.get('max_players', 8)
+        entry_fee = data.get('entry_fee', 0)
+        
+        # Validações
+        if not name:
+            return jsonify({'error': 'Nome do torneio é obrigatório'}), 400
+        
+        if tournament_format not in ['single', 'double']:
+            return jsonify({'error': 'Formato inválido (single ou double)'}), 400
+        
+        if max_players not in BRACKET_SIZES:
+            return jsonify({'error': f'Número de jogadores deve ser um de {list(BRACKET_SIZES)}'}), 400
+        
+        if entry_fee < 0 or entry_fee > 500:
+            return jsonify({'error': 'Inscrição deve ser entre R$ 0,00 e R$ 500,00'}), 400
+        
+        if data.get('starts_at'):
+            starts_at = naive_utc(datetime.fromisoformat(data['starts_at']))
+        else:
+            starts_at = datetime.utcnow() + timedelta(minutes=data.get('starts_in_minutes', 15))
+        
+        tournament = Tournament(
+            name=name,
+            creator_id=user_id,
+            format=tournament_format,
+            game_type=data.get('game_type', '8ball'),
+            max_players=max_players,
+            entry_fee=entry_fee,
+            starts_at=starts_at
+        )
+        tournament.save()
+        tournament_engine.schedule_start(tournament)
+        
+        return jsonify({
+            'message': 'Torneio criado com sucesso',
+            'tournament': tournament.to_dict()
+        }), 201
+        
+    except ValueError:
+        return jsonify({'error': 'Data de início inválida'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@tournament_bp.route('/<int:tournament_id>', methods=['GET'])
+def get_tournament(tournament_id):
+    """Obter torneio com inscritos e chave"""
+    try:
+        tournament = Tournament.query.get(tournament_id)
+        if not tournament:
+            return jsonify({'error': 'Torneio não encontrado'}), 404
+        
+        return jsonify({
+            'tournament': tournament.to_dict(include_bracket=True)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@tournament_bp.route('/<int:tournament_id>/join', methods=['POST'])
+@jwt_required()
+def join_tournament(tournament_id):
+    """Inscrever-se no torneio (debita a inscrição)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user:
+            return jsonify({'error': 'Usuário não encontrado'}), 404
+        
+        tournament = Tournament.query.get(tournament_id)
+        if not tournament:
+            return jsonify({'error': 'Torneio não encontrado'}), 404
+        
+        success, message = tournament.join(user)
+        
+        if not success:
+            return jsonify({'error': message}), 400
+        
+        return jsonify({
+            'message': message,
+            'tournament': tournament.to_dict()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@tournament_bp.route('/<int:tournament_id>/leave', methods=['POST'])
+@jwt_required()
+def leave_tournament(tournament_id):
+    """Cancelar inscrição (reembolsa a inscrição)"""
+    try:
+        user_id = get_jwt_identity()
+        user = User.query.get(user_id)
+        
+        if not user:
+            return jsonify({'error': 'Usuário não encontrado'}), 404
+        
+        tournament = Tournament.query.get(tournament_id)
+        if not tournament:
+            return jsonify({'error': 'Torneio não encontrado'}), 404
+        
+        success, message = tournament.leave(user)
+        
+        if not success:
+            return jsonify({'error': message}), 400
+        
+        return jsonify({
+            'message': message,
+            'tournament': tournament.to_dict()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@tournament_bp.route('/<int:tournament_id>/start', methods=['POST'])
+@jwt_required()
+def start_tournament(tournament_id):
+    """Iniciar o torneio antes do horário (só o criador)"""
+    try:
+        user_id = get_jwt_identity()
+        
+        tournament = Tournament.query.get(tournament_id)
+        if not tournament:
+            return jsonify({'error': 'Torneio não encontrado'}), 404
+        
+        if tournament.creator_id != user_id:
+            return jsonify({'error': 'Só o criador pode iniciar o torneio'}), 403
+        
+        success, message = tournament_engine.start_tournament(tournament)
+        
+        if not success:
+            return jsonify({'error': message}), 400
+        
+        return jsonify({
+            'message': message,
+            'tournament': tournament.to_dict(include_bracket=True)
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
+
+@tournament_bp.route('/<int:tournament_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_tournament(tournament_id):
+    """Cancelar torneio antes do início (reembolsa os inscritos)"""
+    try:
+        user_id = get_jwt_identity()
+        
+        tournament = Tournament.query.get(tournament_id)
+        if not tournament:
+            return jsonify({'error': 'Torneio não encontrado'}), 404
+        
+        if tournament.creator_id != user_id:
+            return jsonify({'error': 'Só o criador pode cancelar o torneio'}), 403
+        
+        success, message = tournament.cancel()
+        
+        if not success:
+            return jsonify({'error': message}), 400
+        
+        return jsonify({
+            'message': message,
+            'tournament': tournament.to_dict()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro interno: {str(e)}'}), 500
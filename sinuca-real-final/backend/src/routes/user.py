@@ -2,28 +2,36 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import User
 from src.models.game import Transaction
+from src.models.database import db, to_money
+from src.services.pagination import InvalidCursor, Keyset, page_args, paginate
+from src.services.ledger import InsufficientFunds
 
 user_bp = Blueprint('user', __name__)
 
+# Ordem do ranking (índice skill_rating, id)
+LEADERBOARD_KEYSET = Keyset(User.skill_rating, User.id)
+
 @user_bp.route('/leaderboard', methods=['GET'])
 def get_leaderboard():
-    """Obter ranking de usuários"""
+    """Obter ranking de usuários (paginado por cursor)"""
     try:
-        limit = request.args.get('limit', 10, type=int)
-        limit = min(limit, 50)  # Máximo 50 usuários
+        limit, after, offset = page_args(request, LEADERBOARD_KEYSET, default=10)
         
-        users = User.get_leaderboard(limit)
+        page = paginate(User.query.filter_by(is_active=True), LEADERBOARD_KEYSET, limit, after, offset)
         
         leaderboard = []
-        for i, user in enumerate(users, 1):
+        for i, user in enumerate(page.items, page.offset + 1):
             user_data = user.to_dict()
             user_data['position'] = i
             leaderboard.append(user_data)
         
         return jsonify({
-            'leaderboard': leaderboard
+            'leaderboard': leaderboard,
+            'next_cursor': page.next_cursor
         }), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'Cursor inválido'}), 400
     except Exception as e:
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
@@ -147,22 +155,18 @@ def deposit():
         if amount > 1000:
             return jsonify({'error': 'Valor máximo de depósito é R$ 1.000,00'}), 400
         
-        # Simular depósito
-        old_balance = float(user.balance)
-        user.balance = float(user.balance) + amount
-        user.total_deposits = float(user.total_deposits) + amount
+        # Simular depósito (crédito atômico no saldo + lançamento no livro-razão)
+        amount = to_money(amount)
+        user = User.lock_many([user_id])[user_id]
+        user.total_deposits = to_money(user.total_deposits) + amount
         
-        # Criar transação
         transaction = Transaction(
             user_id=user_id,
             amount=amount,
             type='deposit',
-            description=f'Depósito via PIX - R$ {amount:.2f}',
-            balance_before=old_balance,
-            balance_after=float(user.balance)
+            description=f'Depósito via PIX - R$ {amount:.2f}'
         )
-        transaction.save()
-        user.save()
+        user.update_balance(amount, 'deposit', transaction=transaction)
         
         return jsonify({
             'message': 'Depósito realizado com sucesso',
@@ -192,28 +196,25 @@ def withdraw():
         if amount <= 0:
             return jsonify({'error': 'Valor deve ser maior que zero'}), 400
         
-        if amount > float(user.balance):
-            return jsonify({'error': 'Saldo insuficiente'}), 400
-        
         if amount < 10:
             return jsonify({'error': 'Valor mínimo de saque é R$ 10,00'}), 400
         
-        # Simular saque
-        old_balance = float(user.balance)
-        user.balance = float(user.balance) - amount
-        user.total_withdrawals = float(user.total_withdrawals) + amount
+        # Simular saque (débito atômico: o UPDATE não deixa o saldo negativo)
+        amount = to_money(amount)
+        user = User.lock_many([user_id])[user_id]
+        user.total_withdrawals = to_money(user.total_withdrawals) + amount
         
-        # Criar transação
         transaction = Transaction(
             user_id=user_id,
             amount=-amount,
             type='withdrawal',
-            description=f'Saque via PIX - R$ {amount:.2f}',
-            balance_before=old_balance,
-            balance_after=float(user.balance)
+            description=f'Saque via PIX - R$ {amount:.2f}'
         )
-        transaction.save()
-        user.save()
+        try:
+            user.update_balance(-amount, 'withdrawal', transaction=transaction)
+        except InsufficientFunds:
+            db.session.rollback()
+            return jsonify({'error': 'Saldo insuficiente'}), 400
         
         return jsonify({
             'message': 'Saque solicitado com sucesso',
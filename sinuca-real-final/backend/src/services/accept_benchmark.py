@@ -0,0 +1,162 @@
+"""
+Benchmark de aceites sob disputa: requisição direta x motor de apostas
+
+Threads aceitam sem parar as apostas abertas mais antigas (HOT_BETS por
+vez, então várias threads disputam a mesma aposta) num arquivo SQLite
+novo em modo produção, e mede apostas aceitas por segundo, aceites
+perdidos (409), erros e latência.
+
+Direto, cada aceite é uma transação no escritor do SQLite; com o motor
+(`BetEngine`), os aceites entram numa fila e são aplicados em lotes, uma
+transação por lote.
+
+Uso: python -m src.services.accept_benchmark [threads] [segundos]
+"""
+
+import os
+import random
+import tempfile
+import threading
+import time
+
+from flask import Flask
+
+from src.models.database import db, init_database
+
+USERS = 200
+OPEN_BETS = 5000
+HOT_BETS = 16  # apostas disputadas ao mesmo tempo
+
+
+def _create_app(path):
+    from src.models.user import User
+    from src.models.game import Bet
+    from src.models.tournament import Tournament  # registra a tabela da FK de games
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    init_database(app, production=True)
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+        users = [
+            User(email=f'bench{i}@exemplo.com', username=f'bench{i}', name=f'Bench {i}',
+                 password_hash='x', balance=1000000)
+            for i in range(USERS)
+        ]
+        db.session.add_all(users)
+        db.session.flush()
+
+        fees = Bet.calculate_fees(10)
+        db.session.add_all([
+            Bet(creator_id=users[i % USERS].id, amount=fees['amount'], platform_fee=fees['platform_fee'],
+                total_prize=fees['total_prize'], status='open')
+            for i in range(OPEN_BETS)
+        ])
+        db.session.commit()
+        bet_ids = [bet_id for (bet_id,) in db.session.query(Bet.id).order_by(Bet.id).all()]
+    return app, bet_ids
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_load(use_engine, threads=32, seconds=5.0):
+    """Aceites disputados em `threads` threads por `seconds` segundos num banco novo"""
+    from src.services.bet_book import bet_book
+    from src.services.bet_engine import BetEngine
+
+    directory = tempfile.mkdtemp(prefix='sinuca_accept_')
+    app, bet_ids = _create_app(os.path.join(directory, 'bench.db'))
+    with app.app_context():
+        bet_book.load()  # fora da medição
+
+    engine = BetEngine()
+    if use_engine:
+        engine.start(app)
+
+    pending = list(reversed(bet_ids))  # a mais antiga no fim
+    hot = [pending.pop() for _ in range(HOT_BETS)]
+    stats = {'accepted': 0, 'conflicts': 0, 'errors': 0, 'latency': []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(seed):
+        rng = random.Random(seed)
+        user_id = seed % USERS + 1
+        local = {'accepted': 0, 'conflicts': 0, 'errors': 0, 'latency': []}
+
+        while time.perf_counter() < deadline:
+            with lock:
+                if not hot:
+                    break
+                bet_id = rng.choice(hot)
+
+            with app.app_context():
+                started = time.perf_counter()
+                try:
+                    status, _ = engine.execute('accept', bet_id=bet_id, user_id=user_id)
+                except Exception:
+                    db.session.rollback()
+                    status = 500
+                local['latency'].append(time.perf_counter() - started)
+
+            if status in (200, 409):
+                with lock:
+                    if bet_id in hot:
+                        hot.remove(bet_id)
+                        if pending:
+                            hot.append(pending.pop())
+            if status == 200:
+                local['accepted'] += 1
+            elif status == 409:
+                local['conflicts'] += 1
+            elif status != 400:  # 400: aposta do próprio jogador
+                local['errors'] += 1
+
+        with lock:
+            for key, value in local.items():
+                stats[key] += value
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    with app.app_context():
+        for db_engine in db.engines.values():
+            db_engine.dispose()
+
+    return {
+        'mode': 'motor' if use_engine else 'direto',
+        'accepted_per_second': stats['accepted'] / seconds,
+        'accepted': stats['accepted'],
+        'conflicts': stats['conflicts'],
+        'errors': stats['errors'],
+        'avg_batch': engine.stats()['avg_batch'],
+        'p99_ms': _percentile(stats['latency'], 0.99) * 1000,
+    }
+
+
+def benchmark(threads=32, seconds=5.0):
+    """Mesma disputa sem e com o motor (antes e depois)"""
+    return [run_load(False, threads, seconds), run_load(True, threads, seconds)]
+
+
+if __name__ == '__main__':
+    import sys
+
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+
+    print(f"{'modo':<8} {'aceitas/s':>10} {'aceitas':>8} {'409':>6} {'erros':>6} {'lote':>6} {'p99':>10}")
+    for result in benchmark(threads, seconds):
+        print(f"{result['mode']:<8} {result['accepted_per_second']:>10.0f} {result['accepted']:>8} "
+              f"{result['conflicts']:>6} {result['errors']:>6} {result['avg_batch']:>6.1f} "
+              f"{result['p99_ms']:>8.1f}ms")
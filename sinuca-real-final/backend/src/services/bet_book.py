@@ -0,0 +1,252 @@
+"""
+Livro de apostas abertas
+
+Índice em memória das apostas com status `open`, por faixa de valor
+(AMOUNT_BUCKET reais) e, dentro de cada faixa, ordenado pelo skill_rating
+do criador. Uma consulta por faixa de valor e janela de rating visita só
+as faixas de valor pedidas e faz busca binária no rating de cada uma, em
+vez de varrer a tabela `bets`.
+
+O livro é carregado do banco no primeiro uso e mantido em sincronia pelas
+rotas de criar, aceitar e cancelar aposta. O rating do criador muda na
+liquidação dos jogos: `update_creators` re-indexa as apostas abertas dele
+com o rating novo. Vive em um único processo, como o `game_store`.
+"""
+
+import bisect
+import heapq
+import threading
+from collections import OrderedDict
+
+AMOUNT_BUCKET = 5  # largura da faixa de valor, em reais
+MIN_AMOUNT = 5
+MAX_AMOUNT = 500
+
+
+class BookEntry:
+    """Aposta aberta no livro"""
+
+    def __init__(self, bet):
+        from src.services.projections import player_card
+
+        creator = bet.creator
+        self.bet_id = bet.id
+        self.creator_id = bet.creator_id
+        self.amount = float(bet.amount)
+        self.rating = creator.skill_rating
+        self.created_at = bet.created_at
+
+        # Resposta de GET /bets pronta, sem consultar o banco
+        card = dict(player_card(creator), level=creator.level)
+        self.data = bet.to_dict({creator.id: card})
+
+    @property
+    def key(self):
+        return (self.rating, self.bet_id)
+
+    @property
+    def bucket(self):
+        return int(self.amount // AMOUNT_BUCKET)
+
+
+class BetBook:
+    """Apostas abertas indexadas por valor e rating do criador"""
+
+    def __init__(self):
+        self.entries = OrderedDict()  # bet_id -> BookEntry, em ordem de criação
+        self.buckets = {}  # faixa de valor -> lista ordenada de (rating, bet_id)
+        self.by_creator = {}  # creator_id -> {bet_id}
+        self.loaded = False
+        self._lock = threading.RLock()
+
+    def load(self):
+        """Carregar as apostas abertas do banco (requer app context)"""
+        from sqlalchemy.orm import joinedload
+        from src.models.game import Bet
+
+        with self._lock:
+            self.entries.clear()
+            self.buckets.clear()
+            self.by_creator.clear()
+            # Rating e nível do criador entram na chave e na resposta
+            bets = Bet.query.options(joinedload(Bet.creator))\
+                            .filter(Bet.status == 'open')\
+                            .order_by(Bet.created_at.asc(), Bet.id.asc()).all()
+            for bet in bets:
+                self._insert(BookEntry(bet))
+            self.loaded = True
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def _insert(self, entry):
+        self.entries[entry.bet_id] = entry
+        self.by_creator.setdefault(entry.creator_id, set()).add(entry.bet_id)
+        bisect.insort(self.buckets.setdefault(entry.bucket, []), entry.key)
+
+    def _unindex(self, entry):
+        keys = self.buckets[entry.bucket]
+        del keys[bisect.bisect_left(keys, entry.key)]
+        if not keys:
+            del self.buckets[entry.bucket]
+
+    def _delete(self, bet_id):
+        entry = self.entries.pop(bet_id, None)
+        if entry is None:
+            return None
+        self._unindex(entry)
+        bets = self.by_creator[entry.creator_id]
+        bets.discard(bet_id)
+        if not bets:
+            del self.by_creator[entry.creator_id]
+        return entry
+
+    def add(self, bet):
+        """Registrar aposta criada"""
+        with self._lock:
+            self._ensure_loaded()
+            if bet.id not in self.entries:
+                self._insert(BookEntry(bet))
+
+    def remove(self, bet_id):
+        """Tirar aposta aceita ou cancelada"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._delete(bet_id)
+
+    def _buckets_between(self, min_amount, max_amount):
+        first = int(min_amount // AMOUNT_BUCKET)
+        last = int(max_amount // AMOUNT_BUCKET)
+        if last - first + 1 > len(self.buckets):
+            return sorted(b for b in self.buckets if first <= b <= last)
+        return [b for b in range(first, last + 1) if b in self.buckets]
+
+    def _matching(self, min_amount, max_amount, min_rating, max_rating, exclude_user_id):
+        """Entradas no intervalo de valor e rating"""
+        for bucket in self._buckets_between(min_amount, max_amount):
+            keys = self.buckets[bucket]
+            start = bisect.bisect_left(keys, (min_rating, -1))
+            stop = bisect.bisect_right(keys, (max_rating, float('inf')))
+            for _, bet_id in keys[start:stop]:
+                entry = self.entries[bet_id]
+                if entry.creator_id != exclude_user_id and min_amount <= entry.amount <= max_amount:
+                    yield entry
+
+    def search(self, min_amount=MIN_AMOUNT, max_amount=MAX_AMOUNT, rating=None,
+               rating_window=None, exclude_user_id=None, limit=20):
+        """
+        Apostas abertas filtradas (requer app context no primeiro uso)
+
+        Sem filtro de rating, as mais recentes primeiro; com filtro, as de
+        rating mais próximo primeiro.
+        """
+        with self._lock:
+            self._ensure_loaded()
+
+            if rating is None or rating_window is None:
+                if min_amount <= MIN_AMOUNT and max_amount >= MAX_AMOUNT:
+                    # Sem filtros: percorre só as mais recentes
+                    found = []
+                    for entry in reversed(self.entries.values()):
+                        if entry.creator_id != exclude_user_id:
+                            found.append(entry)
+                            if len(found) == limit:
+                                break
+                    return [entry.data for entry in found]
+
+                matches = self._matching(min_amount, max_amount, float('-inf'), float('inf'),
+                                         exclude_user_id)
+                best = heapq.nlargest(limit, matches, key=lambda e: (e.created_at, e.bet_id))
+                return [entry.data for entry in best]
+
+            matches = self._matching(min_amount, max_amount, rating - rating_window,
+                                     rating + rating_window, exclude_user_id)
+            best = heapq.nsmallest(limit, matches,
+                                   key=lambda e: (abs(e.rating - rating), e.created_at, e.bet_id))
+            return [entry.data for entry in best]
+
+    def best_match(self, user_id, rating, min_amount=MIN_AMOUNT, max_amount=MAX_AMOUNT,
+                   rating_window=None):
+        """
+        Tirar do livro a melhor aposta para o jogador: rating do criador mais
+        próximo (a mais antiga no empate), dentro dos filtros
+
+        Returns:
+            bet_id reservado, ou None; devolva com `restore` se o aceite falhar
+        """
+        with self._lock:
+            self._ensure_loaded()
+
+            best = None  # (distância de rating, criada em, entrada)
+            for bucket in self._buckets_between(min_amount, max_amount):
+                keys = self.buckets[bucket]
+
+                # Busca binária no rating e caminha para os dois lados, do mais próximo ao mais distante
+                right = bisect.bisect_left(keys, (rating, -1))
+                left = right - 1
+                while left >= 0 or right < len(keys):
+                    if right >= len(keys) or (left >= 0 and rating - keys[left][0] <= keys[right][0] - rating):
+                        index, left = left, left - 1
+                    else:
+                        index, right = right, right + 1
+
+                    entry = self.entries[keys[index][1]]
+                    distance = abs(entry.rating - rating)
+                    if rating_window is not None and distance > rating_window:
+                        break
+                    if best is not None and distance > best[0]:
+                        break
+                    if entry.creator_id == user_id or not min_amount <= entry.amount <= max_amount:
+                        continue
+                    if best is None or (distance, entry.created_at) < best[:2]:
+                        best = (distance, entry.created_at, entry)
+
+            if best is None:
+                return None
+            return self._delete(best[2].bet_id).bet_id
+
+    def update_creators(self, cards):
+        """
+        Atualizar rating e cartão dos criadores (após a liquidação)
+
+        Args:
+            cards: creator_id -> cartão do jogador (com skill_rating e level)
+        """
+        with self._lock:
+            if not self.loaded:
+                return  # a carga do banco já vem com o rating novo
+
+            for creator_id, card in cards.items():
+                for bet_id in self.by_creator.get(creator_id, ()):
+                    entry = self.entries[bet_id]
+                    if entry.rating != card['skill_rating']:
+                        self._unindex(entry)
+                        entry.rating = card['skill_rating']
+                        bisect.insort(self.buckets.setdefault(entry.bucket, []), entry.key)
+                    entry.data = dict(entry.data, creator=card)
+
+    def clear(self):
+        """Descartar o livro (recarregado do banco no próximo uso)"""
+        with self._lock:
+            self.entries.clear()
+            self.buckets.clear()
+            self.by_creator.clear()
+            self.loaded = False
+
+    def restore(self, bet):
+        """Devolver ao livro uma aposta reservada que continua aberta"""
+        if bet.status == 'open':
+            self.add(bet)
+
+    def stats(self):
+        with self._lock:
+            self._ensure_loaded()
+            return {
+                'open_bets': len(self.entries),
+                'amount_buckets': len(self.buckets)
+            }
+
+
+# Instância global do livro de apostas
+bet_book = BetBook()
@@ -0,0 +1,282 @@
+"""
+Motor de apostas com escritor único (opcional)
+
+Quando uma aposta grande aparece, centenas de aceites disputam as mesmas
+linhas; no SQLite cada um espera pelo lock de escrita. Com o motor
+ligado (`BET_ENGINE_ENABLED=true`), criar, aceitar e cancelar aposta
+viram comandos numa fila única consumida por uma thread escritora. Ela
+aplica os comandos em lotes de até BATCH_SIZE numa única transação (um
+SAVEPOINT por comando: o erro de um não desfaz os outros) e entrega o
+resultado às requisições que esperam num `Future`, depois do commit.
+
+Dentro do lote a aposta já aceita fica no mapa de identidade da sessão:
+os aceites seguintes na mesma aposta recebem 409 sem nenhuma consulta.
+
+Desligado, `execute` roda o comando na própria requisição, numa unidade
+de trabalho, com o mesmo resultado. Os comandos devolvem
+(status HTTP, corpo JSON); as respostas de erro saem por `abort`, que
+desfaz o que o comando preparou. O motor vive em um único processo, como o
+`bet_book`.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+
+from src.models.database import abort, db, money_json, on_commit, unit_of_work
+
+BATCH_SIZE = 64  # comandos por transação
+COMMAND_TIMEOUT = 30  # segundos que a requisição espera pelo resultado
+
+
+def create_bet(user_id, amount):
+    """Criar aposta aberta (valor já validado pela rota)"""
+    from src.models.user import User
+    from src.models.game import Bet
+    from src.services.bet_book import bet_book
+
+    user = db.session.get(User, user_id)
+    if not user:
+        return abort(404, {'error': 'Usuário não encontrado'})
+
+    if not user.can_bet(amount):
+        return abort(400, {'error': 'Saldo insuficiente'})
+
+    fees = Bet.calculate_fees(amount)
+    bet = Bet(
+        creator_id=user_id,
+        amount=fees['amount'],
+        platform_fee=fees['platform_fee'],
+        total_prize=fees['total_prize']
+    )
+    bet.save()
+    on_commit(lambda: bet_book.add(bet))
+
+    return 201, {
+        'message': 'Aposta criada com sucesso',
+        'bet': bet.to_dict(),
+        'fees': money_json(fees)
+    }
+
+
+def accept_bet(bet_id, user_id):
+    """Aceitar aposta (409 se outra requisição ficou com ela)"""
+    from src.models.user import User
+    from src.models.game import Bet, BET_NOT_AVAILABLE
+    from src.services.bet_book import bet_book
+
+    # Aposta primeiro: no lote, quem perdeu recebe 409 sem nenhuma consulta
+    bet = db.session.get(Bet, bet_id)
+    if not bet:
+        return abort(404, {'error': 'Aposta não encontrada'})
+
+    if bet.status != 'open':
+        return abort(409, {'error': BET_NOT_AVAILABLE})
+
+    if not db.session.get(User, user_id):
+        return abort(404, {'error': 'Usuário não encontrado'})
+
+    if bet.creator_id == user_id:
+        return abort(400, {'error': 'Você não pode aceitar sua própria aposta'})
+
+    success, message = bet.accept_bet(user_id)
+    if not success:
+        return abort(409 if message == BET_NOT_AVAILABLE else 400, {'error': message})
+
+    on_commit(lambda: bet_book.remove(bet_id))
+    return 200, {
+        'message': message,
+        'bet': bet.to_dict(),
+        'game_id': bet.game.id if bet.game else None
+    }
+
+
+def cancel_bet(bet_id, user_id):
+    """Cancelar aposta do próprio usuário (reembolsa se já aceita)"""
+    from src.models.user import User
+    from src.models.game import Bet
+    from src.services.bet_book import bet_book
+
+    if not db.session.get(User, user_id):
+        return abort(404, {'error': 'Usuário não encontrado'})
+
+    bet = db.session.get(Bet, bet_id)
+    if not bet:
+        return abort(404, {'error': 'Aposta não encontrada'})
+
+    if bet.creator_id != user_id:
+        return abort(403, {'error': 'Você só pode cancelar suas próprias apostas'})
+
+    if bet.status not in ['open', 'matched']:
+        return abort(400, {'error': 'Aposta não pode ser cancelada'})
+
+    success, message = bet.cancel_bet()
+    if not success:
+        return abort(400, {'error': message})
+
+    on_commit(lambda: bet_book.remove(bet_id))
+    return 200, {'message': message}
+
+
+COMMANDS = {
+    'create': create_bet,
+    'accept': accept_bet,
+    'cancel': cancel_bet,
+}
+
+
+class Command:
+    """Comando na fila com o Future da requisição"""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.future = Future()
+        self.result = None
+
+
+class BetEngine:
+    """Fila única de comandos de apostas aplicada em lotes por uma thread"""
+
+    def __init__(self, batch_size=BATCH_SIZE, timeout=COMMAND_TIMEOUT):
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.commands = queue.Queue()
+        self.batches = 0
+        self.applied = 0
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def execute(self, name, **args):
+        """
+        Executar um comando e esperar o resultado
+
+        Returns:
+            (status HTTP, corpo JSON)
+        """
+        if not self.running:
+            return self._run_inline(name, args)
+        return self.submit(name, **args).result(timeout=self.timeout)
+
+    def submit(self, name, **args):
+        """Enfileirar um comando para a thread escritora (Future com o resultado)"""
+        if name not in COMMANDS:
+            raise ValueError(f'Comando desconhecido: {name}')
+        command = Command(name, args)
+        self.commands.put(command)
+        return command.future
+
+    def _run_inline(self, name, args):
+        """Comando na requisição, na sua própria unidade de trabalho"""
+        from src.services.ledger import InsufficientFunds
+
+        try:
+            with unit_of_work():
+                return COMMANDS[name](**args)
+        except InsufficientFunds:
+            return 400, {'error': 'Saldo insuficiente'}
+
+    def _apply(self, command):
+        """Aplicar um comando do lote no seu SAVEPOINT (erro desfaz só ele)"""
+        from src.services.ledger import InsufficientFunds
+
+        callbacks = db.session.info.setdefault('uow_callbacks', [])
+        pending = len(callbacks)
+        savepoint = db.session.begin_nested()
+        try:
+            command.result = COMMANDS[command.name](**command.args)
+        except Exception as e:
+            # Efeitos do comando desfeito não rodam; objetos voltam do banco
+            savepoint.rollback()
+            db.session.info.pop('uow_aborted', None)
+            del callbacks[pending:]
+            db.session.expire_all()
+            if not isinstance(e, InsufficientFunds):
+                raise
+            command.result = (400, {'error': 'Saldo insuficiente'})
+            return
+
+        if db.session.info.pop('uow_aborted', False):
+            # Resposta de erro: só o SAVEPOINT do comando é desfeito
+            savepoint.rollback()
+            del callbacks[pending:]
+        else:
+            savepoint.commit()
+
+    def apply_batch(self, batch):
+        """
+        Aplicar um lote numa transação e responder às requisições
+
+        Se o commit do lote falha, cada comando é refeito sozinho para que
+        um erro não derrube os outros.
+        """
+        try:
+            with unit_of_work():
+                for command in batch:
+                    self._apply(command)
+        except Exception:
+            if len(batch) == 1:
+                raise
+            for command in batch:
+                self._apply_alone(command)
+            return
+
+        for command in batch:
+            command.future.set_result(command.result)
+        self.batches += 1
+        self.applied += len(batch)
+
+    def _apply_alone(self, command):
+        try:
+            self.apply_batch([command])
+        except Exception as e:
+            db.session.rollback()
+            command.future.set_exception(e)
+
+    def _next_batch(self):
+        """Esperar o próximo comando e juntar os que já estão na fila"""
+        batch = [self.commands.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.commands.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self, app):
+        """Loop da thread escritora"""
+        while True:
+            batch = self._next_batch()
+            with app.app_context():
+                try:
+                    self.apply_batch(batch)
+                except Exception as e:
+                    db.session.rollback()
+                    for command in batch:
+                        if not command.future.done():
+                            command.future.set_exception(e)
+                    print(f"⚠️ Erro no motor de apostas: {str(e)}")
+
+    def start(self, app):
+        """Iniciar a thread escritora (os comandos passam a ir para a fila)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, args=(app,), daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stats(self):
+        """Fila, lotes aplicados e tamanho médio do lote"""
+        return {
+            'running': self.running,
+            'queued': self.commands.qsize(),
+            'batches': self.batches,
+            'applied': self.applied,
+            'avg_batch': round(self.applied / self.batches, 2) if self.batches else 0.0
+        }
+
+
+# Instância global do motor de apostas
+bet_engine = BetEngine()
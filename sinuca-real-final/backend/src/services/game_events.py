@@ -0,0 +1,326 @@
+"""
+Eventos ao vivo dos jogos (Server-Sent Events)
+
+Cada jogo tem um canal com os últimos eventos (jogada, tacada, troca de
+vez, fim), já serializados no formato SSE no momento da publicação. Os
+clientes de `GET /api/games/<id>/events` esperam no canal e recebem cada
+evento uma vez; com `Last-Event-ID` retomam de onde pararam. Se o evento
+pedido já saiu do buffer (ou o servidor reiniciou), o cliente recebe
+`reset` e deve recarregar o jogo com `GET /api/games/<id>`.
+
+Espectadores (`GET /api/games/<id>/watch`) leem o mesmo buffer: cada
+evento é serializado uma vez e todas as conexões copiam os mesmos frames,
+cada uma só com o seu cursor (id do último evento entregue). O buffer é
+um anel de tamanho fixo e o número de espectadores por jogo é limitado,
+então a memória por partida é limitada. Espectador que fica mais de
+MAX_SPECTATOR_LAG eventos atrás é desconectado (evento `dropped`) em vez
+de acumular uma fila própria.
+
+Cada cliente espera no seu próprio `threading.Event`: a publicação acorda
+só quem está esperando, e cada um copia os frames do anel sem lock. Canais
+sem clientes são os primeiros descartados quando passa de MAX_CHANNELS.
+
+Os canais vivem em memória no mesmo processo do `game_store`.
+"""
+
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+
+EVENT_BUFFER_SIZE = 256  # eventos guardados por jogo para retomada
+MAX_CHANNELS = 10000
+MAX_SPECTATORS = 5000  # espectadores por jogo
+MAX_SPECTATOR_LAG = 64  # eventos de atraso antes de desconectar o espectador
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 2000
+LAG_SMOOTHING = 0.1  # peso da última medida na média do atraso de entrega
+
+
+def format_event(event_id, event, data):
+    """Serializar um evento no formato SSE"""
+    lines = [f"event: {event}", f"data: {json.dumps(data)}"]
+    if event_id is not None:
+        lines.insert(0, f"id: {event_id}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class ChannelFull(Exception):
+    """Limite de espectadores do jogo atingido"""
+
+
+class Subscriber:
+    """Cliente conectado a um canal: cursor e o seu próprio sinal de acordar"""
+
+    def __init__(self, subscriber_id, cursor, spectator):
+        self.id = subscriber_id
+        self.cursor = cursor  # último evento entregue
+        self.spectator = spectator
+        self.wakeup = threading.Event()
+
+
+class EventChannel:
+    """Buffer circular de eventos de um jogo, compartilhado por todos os clientes"""
+
+    def __init__(self, buffer_size=EVENT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.frames = [None] * buffer_size  # evento `id` fica em frames[id % buffer_size]
+        self.published_at = [0.0] * buffer_size
+        self.last_id = 0
+        self.closed = False
+        self.evicted = False  # canal descartado: clientes recebem `reset`
+        self.snapshot = None  # último evento com o estado completo da mesa
+        self.lock = threading.Lock()
+
+        # Clientes conectados e os que estão esperando o próximo evento
+        self.subscribers = {}  # id -> Subscriber
+        self.waiting = set()
+        self.spectators = 0
+        self.dropped = 0
+        self.delivery_lag = 0.0  # média móvel, em segundos
+
+    @property
+    def oldest_id(self):
+        return max(1, self.last_id - self.buffer_size + 1)
+
+    def _wake(self):
+        """Tirar a lista de quem espera (chamar com o lock); acordar fora do lock"""
+        waiting, self.waiting = self.waiting, set()
+        return waiting
+
+    def publish(self, event, data, close=False, snapshot=False):
+        """Serializar o evento uma vez, guardar no anel e acordar quem espera"""
+        with self.lock:
+            event_id = self.last_id + 1
+            slot = event_id % self.buffer_size
+            self.frames[slot] = format_event(event_id, event, data)
+            self.published_at[slot] = time.monotonic()
+            # Frame antes do id e id antes de `closed`: leitores sem lock veem tudo
+            self.last_id = event_id
+            if snapshot:
+                self.snapshot = self.frames[slot]
+            self.closed = self.closed or close
+            waiting = self._wake()
+
+        for subscriber in waiting:
+            subscriber.wakeup.set()
+        return event_id
+
+    def evict(self):
+        """Descartar o canal e acordar os clientes (que recebem `reset`)"""
+        with self.lock:
+            self.evicted = True
+            waiting = self._wake()
+        for subscriber in waiting:
+            subscriber.wakeup.set()
+
+    def since(self, last_id):
+        """
+        Eventos posteriores a `last_id`, sem lock (o anel só é reescrito
+        depois de `buffer_size` publicações; se isso acontecer durante a
+        cópia, vira lacuna)
+
+        Returns:
+            (frames, novo last_id, houve lacuna)
+        """
+        gap = False
+        while True:
+            current = self.last_id
+            oldest = max(1, current - self.buffer_size + 1)
+            if last_id > current or last_id < oldest - 1:
+                gap, last_id = True, oldest - 1
+
+            frames = [self.frames[i % self.buffer_size] for i in range(last_id + 1, current + 1)]
+            if self.last_id - self.buffer_size < last_id + 1:
+                return frames, current, gap
+
+    def wait(self, subscriber, timeout):
+        """Esperar evento novo (volta na hora se já houver, ou se o canal fechou)"""
+        with self.lock:
+            if self.last_id != subscriber.cursor or self.closed or self.evicted:
+                return
+            subscriber.wakeup.clear()
+            self.waiting.add(subscriber)
+        subscriber.wakeup.wait(timeout)
+
+    def subscribe(self, subscriber_id, last_id, spectator=False):
+        """
+        Registrar o cliente
+
+        Espectador novo (sem `last_id`) começa pelo último estado completo
+        da mesa e segue só os eventos seguintes (ou o evento final).
+
+        Returns:
+            (Subscriber, frames iniciais)
+        """
+        with self.lock:
+            initial = []
+            if spectator:
+                self.spectators += 1
+                if not last_id:
+                    last_id = self.last_id - 1 if self.closed else self.last_id
+                    initial = [self.snapshot] if self.snapshot else []
+            subscriber = self.subscribers[subscriber_id] = Subscriber(subscriber_id, last_id, spectator)
+            return subscriber, initial
+
+    def unsubscribe(self, subscriber):
+        """Remover o cliente (pode ser chamado mais de uma vez)"""
+        with self.lock:
+            if self.subscribers.pop(subscriber.id, None) is None:
+                return
+            self.waiting.discard(subscriber)
+            if subscriber.spectator:
+                self.spectators -= 1
+
+    def record_delivery(self, event_id):
+        """Atualizar a média do tempo entre publicar e entregar um evento"""
+        lag = time.monotonic() - self.published_at[event_id % self.buffer_size]
+        self.delivery_lag += LAG_SMOOTHING * (lag - self.delivery_lag)
+
+    def metrics(self):
+        """Espectadores e atraso de entrega do canal"""
+        with self.lock:
+            lags = [self.last_id - subscriber.cursor for subscriber in self.subscribers.values()]
+            return {
+                'subscribers': len(lags),
+                'spectators': self.spectators,
+                'last_event_id': self.last_id,
+                'max_lag_events': max(lags, default=0),
+                'dropped': self.dropped,
+                'broadcast_lag_ms': round(self.delivery_lag * 1000, 2),
+                'closed': self.closed
+            }
+
+
+class EventStream:
+    """
+    Corpo da resposta SSE
+
+    A inscrição é feita antes da resposta começar; `close()` (chamado pelo
+    servidor WSGI ao fim da conexão, mesmo que nenhum frame tenha sido
+    enviado) libera o lugar do cliente.
+    """
+
+    def __init__(self, frames, channel, subscriber):
+        self.frames = frames
+        self.channel = channel
+        self.subscriber = subscriber
+
+    def __iter__(self):
+        return self.frames
+
+    def close(self):
+        self.frames.close()
+        self.channel.unsubscribe(self.subscriber)
+
+
+class GameEvents:
+    """Canais de eventos de todos os jogos"""
+
+    def __init__(self, max_channels=MAX_CHANNELS, max_spectators=MAX_SPECTATORS):
+        self.max_channels = max_channels
+        self.max_spectators = max_spectators
+        self.channels = OrderedDict()  # game_id -> EventChannel
+        self._lock = threading.Lock()
+        self._subscriber_ids = itertools.count(1)
+
+    def _channel(self, game_id):
+        """Canal do jogo (chamar com o lock)"""
+        channel = self.channels.get(game_id)
+        if channel is not None:
+            self.channels.move_to_end(game_id)
+            return channel
+
+        channel = self.channels[game_id] = EventChannel()
+        excess = len(self.channels) - self.max_channels
+        if excess > 0:
+            # Primeiro os mais antigos sem clientes; com todos ocupados, os
+            # mais antigos mesmo assim (os clientes recebem `reset`)
+            idle = [key for key, other in self.channels.items()
+                    if not other.subscribers and other is not channel][:excess]
+            busy = [key for key in self.channels if key not in idle and key != game_id]
+            for key in idle + busy[:excess - len(idle)]:
+                self.channels.pop(key).evict()
+        return channel
+
+    def channel(self, game_id):
+        """Canal do jogo (criado sob demanda, descarta os mais antigos)"""
+        with self._lock:
+            return self._channel(game_id)
+
+    def has_channel(self, game_id):
+        return game_id in self.channels
+
+    def publish(self, game_id, event, data, close=False, snapshot=False):
+        """Publicar um evento no jogo; retorna o id do evento"""
+        return self.channel(game_id).publish(event, data, close, snapshot)
+
+    def stream(self, game_id, last_id=0, spectator=False):
+        """
+        Resposta SSE: eventos após `last_id`, depois os novos até o jogo terminar
+
+        O limite de espectadores e a inscrição são feitos sob o mesmo lock
+        (o de criar e descartar canais), então o limite não é ultrapassado
+        e um canal com clientes nunca é descartado sem avisá-los.
+
+        Raises:
+            ChannelFull: limite de espectadores atingido
+        """
+        with self._lock:
+            channel = self._channel(game_id)
+            if spectator and channel.spectators >= self.max_spectators:
+                raise ChannelFull()
+            subscriber, initial = channel.subscribe(next(self._subscriber_ids), last_id, spectator)
+        return EventStream(self._frames(game_id, channel, subscriber, initial), channel, subscriber)
+
+    def _frames(self, game_id, channel, subscriber, initial):
+        try:
+            yield f"retry: {RETRY_MILLISECONDS}\n\n" + ''.join(initial)
+
+            while True:
+                channel.wait(subscriber, HEARTBEAT_SECONDS)
+                if channel.evicted:
+                    yield format_event(None, 'reset', {'game_id': game_id})
+                    return
+
+                # Espectador atrasado demais: desconectar em vez de enfileirar
+                if subscriber.spectator and channel.last_id - subscriber.cursor > MAX_SPECTATOR_LAG:
+                    with channel.lock:
+                        channel.dropped += 1
+                    yield format_event(None, 'dropped', {'game_id': game_id})
+                    return
+
+                closed = channel.closed
+                frames, subscriber.cursor, gap = channel.since(subscriber.cursor)
+
+                if gap:
+                    yield format_event(None, 'reset', {'game_id': game_id})
+                if frames:
+                    yield ''.join(frames)
+                    channel.record_delivery(subscriber.cursor)
+                elif not closed:
+                    yield ': ping\n\n'
+
+                if closed:
+                    return
+        finally:
+            channel.unsubscribe(subscriber)
+
+    def metrics(self, game_id=None):
+        """Métricas de um jogo ou dos canais com clientes conectados"""
+        if game_id is not None:
+            channel = self.channels.get(game_id)
+            return channel.metrics() if channel else None
+
+        with self._lock:
+            channels = list(self.channels.items())
+        return {
+            game_id: metrics
+            for game_id, metrics in ((game_id, channel.metrics()) for game_id, channel in channels)
+            if metrics['subscribers']
+        }
+
+
+# Instância global dos eventos
+game_events = GameEvents()
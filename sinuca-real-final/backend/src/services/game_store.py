@@ -0,0 +1,393 @@
+"""
+Armazenamento em memória dos jogos em andamento (write-behind)
+
+Jogos com status `playing` ficam em memória no processo: leituras, jogadas
+incrementais e tacadas são respondidas sem tocar no banco. Um loop de
+fundo grava em lote, a cada FLUSH_INTERVAL segundos, o snapshot dos jogos
+alterados (`Game.game_data`, `table_state`, `shot_log`) junto com as
+jogadas pendentes em `game_moves`, num único commit. Início, fim e
+cancelamento gravam na hora.
+
+Recuperação após queda: o jogo é recarregado do último snapshot gravado
+mais as jogadas do log posteriores a ele (`Game.current_state`). Perde-se
+no máximo o que chegou depois do último flush.
+
+O estado do cliente (patches e snapshots de `/update`) fica separado dos
+campos de regras (vez, grupos, bola na mão, vencedor, última tacada,
+sequência), que só o servidor altera; patches e snapshots que tocam
+esses campos são recusados. `Game.game_data` guarda os dois juntos.
+
+O armazenamento vive em um único processo (como o bot da casa); com
+vários workers, as rotas de jogo devem ser atendidas pelo mesmo processo.
+"""
+
+import base64
+import copy
+import json
+import threading
+import time
+from datetime import datetime
+
+from src.services.game_events import game_events
+from src.services.table_codec import append_shot, decode_shots, decode_table, encode_table
+
+FLUSH_INTERVAL = 1.0  # segundos entre gravações em lote
+
+# Campos do estado controlados pelo servidor (regras, tacadas e sequência)
+RULE_FIELDS = frozenset({'turn', 'groups', 'ball_in_hand', 'winner_id', 'last_shot',
+                         'sequence', 'table', 'shots'})
+
+
+def rule_fields(data):
+    """Campos de regras presentes em um patch ou snapshot do cliente"""
+    if not isinstance(data, dict):
+        return []
+    return sorted(RULE_FIELDS & data.keys())
+
+
+class LiveGame:
+    """Estado em memória de um jogo em andamento"""
+
+    def __init__(self, game):
+        from src.services.projections import game_detail
+
+        self.id = game.id
+        self.player1_id = game.player1_id
+        self.player2_id = game.player2_id
+        self.bet_id = game.bet_id
+        self.status = 'playing'
+
+        # Recuperação: último snapshot + jogadas posteriores do log
+        self.state = game.current_state()
+        self.rules = {key: self.state.pop(key) for key in list(self.state) if key in RULE_FIELDS}
+        self.rules.pop('sequence', None)
+        self.sequence = game.last_sequence
+        self.table_state = game.table_state or encode_table(game.load_table())
+        self.shot_log = game.shot_log
+        self.shot_count = len(game.load_shots())
+
+        # Campos que não mudam durante a partida
+        self.info = game_detail(game)
+
+        self.moves = []  # jogadas ainda não gravadas: (sequência, jogador, patch)
+        self.dirty = False
+        self.closed = False
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()  # do snapshot ao commit: gravações em ordem
+
+    def _game_data(self):
+        """Estado do cliente com os campos de regras (chamar com o lock)"""
+        data = copy.deepcopy(self.state)
+        data.update(copy.deepcopy(self.rules))
+        data['sequence'] = self.sequence
+        return data
+
+    def current_state(self):
+        """Cópia do estado atual (snapshot + jogadas)"""
+        with self.lock:
+            return self._game_data()
+
+    def load_shots(self):
+        return decode_shots(self.shot_log, self.player1_id, self.player2_id)
+
+    def match_state(self):
+        """Estado da partida para as regras do servidor"""
+        from src.services.match_rules import MatchState
+
+        with self.lock:
+            return MatchState.from_game_data(self.player1_id, self.player2_id, self.rules,
+                                             table=decode_table(self.table_state),
+                                             shots=self.load_shots())
+
+    def to_dict(self, debug=False):
+        """Mesmo formato de `Game.to_dict`, montado da memória"""
+        with self.lock:
+            data = dict(self.info)
+            data['game_data_dict'] = self._game_data()
+            data['game_data'] = json.dumps(data['game_data_dict'])
+            data['table_state'] = base64.b64encode(self.table_state).decode()
+            data['shot_log'] = base64.b64encode(self.shot_log).decode() if self.shot_log else None
+            if debug:
+                data['debug'] = {
+                    'table': decode_table(self.table_state).to_dict(),
+                    'shots': self.load_shots()
+                }
+        return data
+
+    def apply_move(self, player_id, sequence, patch):
+        """
+        Registrar jogada incremental (patch) na sequência
+
+        O patch não pode tocar os campos de regras (ver `rule_fields`).
+
+        Returns:
+            (sucesso, mensagem, sequência esperada)
+        """
+        from src.models.game import merge_patch
+
+        with self.lock:
+            if self.closed:
+                return False, "Jogo não está em andamento", None
+            if rule_fields(patch):
+                return False, "Campos controlados pelo servidor", None
+
+            expected = self.sequence + 1
+            if sequence != expected:
+                return False, "Jogada fora de sequência", expected
+
+            self.state = merge_patch(self.state, copy.deepcopy(patch))
+            self.sequence = sequence
+            self.moves.append((sequence, player_id, json.dumps(patch)))
+            self.dirty = True
+            game_events.publish(self.id, 'move', {
+                'sequence': sequence,
+                'player_id': player_id,
+                'patch': patch
+            })
+
+        return True, "Jogada registrada", sequence + 1
+
+    def replace_state(self, game_state):
+        """
+        Substituir o estado do cliente (snapshot completo enviado por ele)
+
+        Os campos de regras continuam os do servidor; um snapshot que os
+        inclua é recusado.
+        """
+        with self.lock:
+            if self.closed:
+                return False, "Jogo não está em andamento"
+            if rule_fields(game_state):
+                return False, "Campos controlados pelo servidor"
+            self.state = copy.deepcopy(game_state)
+            self.dirty = True
+            game_events.publish(self.id, 'state', {'game_data': self._game_data()})
+        return True, "Estado do jogo atualizado"
+
+    def play_shot(self, player_id, angle, power, cue_position=None):
+        """Executar tacada com as regras e a física do servidor"""
+        match = self.match_state()
+        shot_count = len(match.shots)
+
+        valid, message = match.validate_shot(player_id, cue_position)
+        if not valid:
+            return False, message, None
+
+        result = match.apply_shot(player_id, angle, power, cue_position)
+
+        with self.lock:
+            if self.closed:
+                return False, "Jogo não está em andamento", None
+            if self.shot_count != shot_count:
+                # Outra tacada foi aplicada enquanto esta era simulada
+                return False, "Não é sua vez", None
+
+            previous_turn = self.rules.get('turn', self.player1_id)
+            self.rules.update(match.rules_data())
+            self.rules.pop('table', None)
+            self.rules.pop('shots', None)
+            self.rules['last_shot'] = {
+                'player_id': player_id,
+                'angle': float(angle),
+                'power': float(power),
+                'pocketed': result.pocketed,
+                'first_hit': result.first_hit,
+                'scratch': result.scratch
+            }
+            self.table_state = encode_table(match.table)
+            self.shot_log = append_shot(self.shot_log, match.shots[-1],
+                                        self.player1_id, self.player2_id)
+            self.shot_count += 1
+            self.dirty = True
+
+            game_events.publish(self.id, 'shot', dict(
+                self.rules['last_shot'],
+                table_state=base64.b64encode(self.table_state).decode(),
+                turn=match.turn,
+                ball_in_hand=match.ball_in_hand,
+                groups=self.rules['groups']
+            ), snapshot=True)
+            if match.turn != previous_turn or match.ball_in_hand:
+                game_events.publish(self.id, 'turn', {
+                    'turn': match.turn,
+                    'ball_in_hand': match.ball_in_hand,
+                    'groups': self.rules['groups']
+                })
+
+        return True, "Tacada executada", result
+
+    def take_snapshot(self):
+        """Separar o que precisa ser gravado (zera as jogadas pendentes)"""
+        with self.lock:
+            moves, self.moves = self.moves, []
+            self.dirty = False
+            return json.dumps(self._game_data()), self.table_state, self.shot_log, moves
+
+    def restore(self, moves):
+        """Devolver jogadas de um flush que falhou"""
+        with self.lock:
+            self.moves = moves + self.moves
+            self.dirty = True
+
+
+class GameStore:
+    """Jogos em andamento em memória, gravados em lote no banco"""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self.games = {}  # game_id -> LiveGame
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def get(self, game_id):
+        """
+        Jogo em andamento (carrega do banco na primeira vez)
+
+        Returns:
+            LiveGame, ou None se o jogo não existe ou não está em andamento
+        """
+        live = self.games.get(game_id)
+        if live is not None:
+            return live
+
+        from src.models.game import Game
+        from src.services.projections import games_with_bet
+
+        game = games_with_bet().filter(Game.id == game_id).first()
+        if not game or game.status != 'playing':
+            return None
+
+        with self._lock:
+            return self.games.setdefault(game_id, LiveGame(game))
+
+    def start(self, game):
+        """Iniciar jogo (gravado na hora) e passar a servi-lo da memória"""
+        game.start_game()
+        with self._lock:
+            self.games[game.id] = LiveGame(game)
+        self._announce(game.id, game.player1_id, game.player2_id)
+
+    def start_many(self, games):
+        """
+        Iniciar vários jogos num único commit (junto com o que mais estiver
+        pendente na sessão); cada um é carregado na memória no primeiro acesso
+        """
+        from src.models.database import db
+
+        now = datetime.utcnow()
+        for game in games:
+            game.status = 'playing'
+            game.started_at = now
+        db.session.add_all(games)
+        db.session.flush()
+
+        # Lidos antes do commit, que expira os objetos
+        started = [(game.id, game.player1_id, game.player2_id) for game in games]
+        db.session.commit()
+
+        for game_id, player1_id, player2_id in started:
+            self._announce(game_id, player1_id, player2_id)
+
+    def _announce(self, game_id, player1_id, player2_id):
+        game_events.publish(game_id, 'start', {
+            'player1_id': player1_id,
+            'player2_id': player2_id,
+            'turn': player1_id
+        }, snapshot=True)
+
+    def close(self, game_id):
+        """Gravar e tirar o jogo da memória (antes de finalizar ou cancelar)"""
+        with self._lock:
+            live = self.games.pop(game_id, None)
+        if live is None:
+            return
+        with live.lock:
+            live.closed = True
+        try:
+            self._write([live], closing=True)
+        except Exception:
+            # O jogo volta à memória com as jogadas devolvidas, para o próximo flush
+            with live.lock:
+                live.closed = False
+            with self._lock:
+                self.games[game_id] = live
+            raise
+
+    def flush(self):
+        """Gravar em lote todos os jogos alterados; retorna quantos foram gravados"""
+        with self._lock:
+            dirty = [live for live in self.games.values() if live.dirty]
+        return self._write(dirty)
+
+    def _write(self, games, closing=False):
+        """
+        Gravar snapshots e jogadas pendentes em um único commit
+
+        Cada jogo fica com o `write_lock` do snapshot até o commit (travados
+        em ordem de id): um flush atrasado não grava por cima do snapshot
+        mais novo de `close`, e jogos já fechados ficam só com o de `close`.
+        """
+        games = sorted(games, key=lambda live: live.id)
+        for live in games:
+            live.write_lock.acquire()
+        try:
+            batch = [(live, live.take_snapshot()) for live in games if closing or not live.closed]
+            return self._commit(batch)
+        finally:
+            for live in games:
+                live.write_lock.release()
+
+    def _commit(self, batch):
+        """Gravar os snapshots separados (devolve as jogadas se falhar)"""
+        from src.models.database import db
+        from src.models.game import Game, GameMove
+
+        if not batch:
+            return 0
+
+        now = datetime.utcnow()
+        try:
+            db.session.execute(db.update(Game), [
+                {
+                    'id': live.id,
+                    'game_data': game_data,
+                    'table_state': table_state,
+                    'shot_log': shot_log,
+                    'updated_at': now
+                }
+                for live, (game_data, table_state, shot_log, _) in batch
+            ])
+            db.session.add_all([
+                GameMove(game_id=live.id, sequence=sequence, player_id=player_id, patch=patch)
+                for live, (_, _, _, moves) in batch
+                for sequence, player_id, patch in moves
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for live, (_, _, _, moves) in batch:
+                live.restore(moves)
+            raise
+
+        return len(batch)
+
+    def run(self, app):
+        """Loop de gravação em lote"""
+        while True:
+            time.sleep(self.flush_interval)
+            with app.app_context():
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"⚠️ Erro ao gravar jogos em andamento: {str(e)}")
+
+    def start_writer(self, app):
+        """Iniciar a gravação em lote em uma thread de fundo"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, args=(app,), daemon=True)
+            self._thread.start()
+        return self._thread
+
+
+# Instância global do armazenamento
+game_store = GameStore()
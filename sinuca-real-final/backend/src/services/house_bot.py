@@ -0,0 +1,271 @@
+"""
+Bot da casa (adversário Monte Carlo)
+
+Em horários vazios o bot entra em jogos sem aposta criados por
+`/api/games/create` e joga contra o criador. Cada jogada é escolhida
+amostrando tacadas candidatas (mira de bola fantasma em cada caçapa mais
+tacadas aleatórias), simulando-as em lotes e pontuando o resultado com as
+regras do servidor, dentro de um orçamento de tempo por jogada.
+
+As buscas rodam no pool de processos compartilhado; cada busca é limitada
+pelo orçamento de tempo e cada mesa tem no máximo uma busca em andamento,
+então nenhuma mesa monopoliza os workers.
+"""
+
+import math
+import secrets
+import threading
+import time
+
+import numpy as np
+
+from src.services.match_rules import EIGHT_BALL
+from src.services.physics_engine import BALL_RADIUS, CUE_INDEX, POCKETS
+from src.services.game_store import game_store
+from src.services.shot_simulator import ShotSimulator, shot_simulator
+from src.services.table_codec import quantize_angle, quantize_power
+
+BOT_USERNAME = 'bot_da_casa'
+BOT_EMAIL = 'bot@sinucareal.com'
+BOT_NAME = 'Bot da Casa'
+
+MOVE_TIME_BUDGET = 0.2  # segundos por jogada
+SEARCH_ROUND = 16  # tacadas por chamada do simulador (orçamento verificado entre lotes)
+JOIN_AFTER_SECONDS = 30  # espera antes de o bot entrar num jogo
+MAX_BOT_TABLES = 50
+
+# A busca já roda num worker do pool: os lotes são simulados no próprio processo
+_search_simulator = ShotSimulator(workers=1)
+
+# Níveis de dificuldade pelas faixas de skill_rating de User.rank
+DIFFICULTY_LEVELS = [
+    {'name': 'iniciante', 'max_rating': 1000, 'samples': 24, 'angle_noise': 0.05, 'power_noise': 0.15},
+    {'name': 'intermediario', 'max_rating': 1300, 'samples': 64, 'angle_noise': 0.02, 'power_noise': 0.08},
+    {'name': 'avancado', 'max_rating': 1600, 'samples': 160, 'angle_noise': 0.008, 'power_noise': 0.04},
+    {'name': 'mestre', 'max_rating': None, 'samples': 400, 'angle_noise': 0.003, 'power_noise': 0.02}
+]
+
+
+def difficulty_for_rating(skill_rating):
+    """Nível do bot para enfrentar um jogador com este skill_rating"""
+    for level in DIFFICULTY_LEVELS:
+        if level['max_rating'] is None or skill_rating < level['max_rating']:
+            return level
+    return DIFFICULTY_LEVELS[-1]
+
+
+def _target_balls(match, player_id):
+    """Bolas que o jogador pode mirar"""
+    targets = match.remaining_of(player_id)
+    if targets:
+        return targets
+    if match.group_balls(player_id):
+        return {EIGHT_BALL}
+    return {n for n, p in zip(match.table.numbers, match.table.pocketed) if not p and n not in (0, EIGHT_BALL)}
+
+
+def _candidate_shots(match, player_id, rng, count):
+    """Metade mira de bola fantasma (bola alvo -> caçapa), metade aleatória"""
+    table = match.table
+    cue_x, cue_y = table.positions[CUE_INDEX]
+
+    aims = []
+    for number in _target_balls(match, player_id):
+        target = table.positions[table.numbers.index(number)]
+        for pocket in POCKETS:
+            direction = pocket - target
+            direction /= np.hypot(*direction)
+            ghost_x, ghost_y = target - direction * 2 * BALL_RADIUS
+            aims.append(math.atan2(ghost_y - cue_y, ghost_x - cue_x))
+
+    aimed = count // 2 if aims else 0
+    angles = np.concatenate([
+        rng.choice(aims, aimed) + rng.normal(0, 0.004, aimed) if aimed else np.empty(0),
+        rng.uniform(-math.pi, math.pi, count - aimed)
+    ])
+    powers = rng.uniform(25, 100, count)
+    return list(zip(angles.tolist(), powers.tolist()))
+
+
+def _score(after, player_id, result):
+    """Pontuar o estado após uma tacada do ponto de vista do jogador"""
+    if after.winner_id:
+        return 1000 if after.winner_id == player_id else -1000
+
+    own = after.group_balls(player_id)
+    rival = after.group_balls(after.opponent_of(player_id))
+    object_balls = [n for n in result.pocketed if n not in (0, EIGHT_BALL)]
+
+    score = 10 * sum(1 for n in object_balls if n in own or not own)
+    score -= 5 * sum(1 for n in object_balls if n in rival)
+    if after.turn == player_id:
+        score += 100
+    if after.ball_in_hand:
+        score -= 50
+    return score
+
+
+def search_shot(match, bot_id, skill_rating, seed, budget=MOVE_TIME_BUDGET):
+    """
+    Escolher a tacada do bot (executado no worker)
+
+    Sorteia de uma vez as candidatas do nível e as simula em lotes de
+    SEARCH_ROUND, cada lote uma única chamada do simulador (com o mesmo
+    resolvedor das tacadas de verdade); o orçamento de tempo é verificado
+    entre lotes. À melhor tacada é aplicado o ruído de execução do nível.
+
+    Returns:
+        (ângulo, força, tacadas avaliadas)
+    """
+    deadline = time.perf_counter() + budget
+    level = difficulty_for_rating(skill_rating)
+    rng = np.random.default_rng(seed)
+    candidates = [(quantize_angle(math.remainder(angle, 2 * math.pi)), quantize_power(power))
+                  for angle, power in _candidate_shots(match, bot_id, rng, level['samples'])]
+
+    best_score, best_shot = -math.inf, (0.0, 50.0)
+    evaluated = 0
+    for start in range(0, len(candidates), SEARCH_ROUND):
+        if evaluated and time.perf_counter() >= deadline:
+            break
+        batch = candidates[start:start + SEARCH_ROUND]
+        for shot, result in zip(batch, _search_simulator.simulate(match.table, batch)):
+            trial = match.copy()
+            trial.apply_result(bot_id, result)
+            score = _score(trial, bot_id, result)
+            if score > best_score:
+                best_score, best_shot = score, shot
+        evaluated += len(batch)
+
+    angle, power = best_shot
+    angle += rng.normal(0, level['angle_noise'])
+    power = float(np.clip(power * (1 + rng.normal(0, level['power_noise'])), 5, 100))
+    return angle, power, evaluated
+
+
+class HouseBot:
+    """Executa o bot em várias mesas ao mesmo tempo"""
+
+    def __init__(self, max_tables=MAX_BOT_TABLES, join_after=JOIN_AFTER_SECONDS,
+                 move_budget=MOVE_TIME_BUDGET):
+        self.max_tables = max_tables
+        self.join_after = join_after
+        self.move_budget = move_budget
+        self.searches = {}  # game_id -> Future da busca em andamento
+        self._thread = None
+
+    def get_bot_user(self):
+        """Obter (ou criar) o usuário do bot"""
+        from src.models.user import User
+
+        bot = User.find_by_username(BOT_USERNAME)
+        if not bot:
+            bot = User(
+                email=BOT_EMAIL,
+                username=BOT_USERNAME,
+                name=BOT_NAME,
+                balance=0.00,
+                is_verified=True
+            )
+            bot.set_password(secrets.token_urlsafe(32))
+            bot.save()
+        return bot
+
+    def join_waiting_games(self, bot):
+        """Entrar em jogos sem aposta que estão esperando há algum tempo"""
+        from datetime import datetime, timedelta
+        from src.models.game import Game
+
+        active = Game.query.filter(Game.status == 'playing')\
+                           .filter(Game.player2_id == bot.id).count()
+        free = self.max_tables - active
+        if free <= 0:
+            return []
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.join_after)
+        games = Game.query.filter_by(status='waiting')\
+                          .filter(Game.player2_id.is_(None))\
+                          .filter(Game.bet_id.is_(None))\
+                          .filter(Game.player1_id != bot.id)\
+                          .filter(Game.created_at <= cutoff)\
+                          .order_by(Game.created_at.asc())\
+                          .limit(free).all()
+
+        for game in games:
+            game.player2_id = bot.id
+            game_store.start(game)
+        return games
+
+    def play_turns(self, bot):
+        """Disparar buscas nas mesas em que é a vez do bot e aplicar as prontas"""
+        from src.models.game import Game
+        from src.models.user import User
+
+        games = Game.query.filter(Game.status == 'playing')\
+                          .filter(Game.player2_id == bot.id).all()
+
+        for game in games:
+            live = game_store.get(game.id)
+            if live is None:
+                continue
+            match = live.match_state()
+
+            if match.winner_id:
+                self.searches.pop(game.id, None)
+                self.finish(game, match.winner_id)
+                continue
+
+            future = self.searches.get(game.id)
+            if future is None:
+                if match.turn == bot.id:
+                    opponent = User.query.get(game.player1_id)
+                    self.searches[game.id] = shot_simulator.executor.submit(
+                        search_shot, match, bot.id, opponent.skill_rating if opponent else 1200,
+                        (game.id, len(match.shots)), self.move_budget
+                    )
+                continue
+
+            if not future.done():
+                continue
+
+            del self.searches[game.id]
+            angle, power, _ = future.result()
+            success, _, _ = live.play_shot(bot.id, angle, power)
+            if success:
+                match = live.match_state()
+                if match.winner_id:
+                    self.finish(game, match.winner_id)
+
+    def finish(self, game, winner_id):
+        """Gravar o estado em memória e finalizar o jogo"""
+        game_store.close(game.id)
+        game.finish_game(winner_id)
+
+    def tick(self):
+        """Uma rodada do bot (requer app context)"""
+        bot = self.get_bot_user()
+        self.join_waiting_games(bot)
+        self.play_turns(bot)
+
+    def run(self, app, interval=0.5):
+        """Loop do bot"""
+        while True:
+            with app.app_context():
+                try:
+                    self.tick()
+                except Exception as e:
+                    from src.models.database import db
+                    db.session.rollback()
+                    print(f"⚠️ Erro no bot da casa: {str(e)}")
+            time.sleep(interval)
+
+    def start(self, app):
+        """Iniciar o bot em uma thread de fundo"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, args=(app,), daemon=True)
+            self._thread.start()
+        return self._thread
+
+
+# Instância global do bot
+house_bot = HouseBot()
@@ -0,0 +1,359 @@
+"""
+Livro-razão da carteira (partidas dobradas, append-only)
+
+Toda movimentação de dinheiro é um lançamento com pernas que somam zero
+(`LedgerEntry`): a carteira do jogador contra o escrow da aposta ou do
+torneio, a taxa da plataforma, o gateway de pagamento ou ajustes.
+
+O saldo da carteira (`users.balance`) muda só por um UPDATE atômico,
+`SET balance = balance + :valor`, com a condição de não ficar negativo na
+própria cláusula WHERE. Não há leitura-modificação-escrita em Python:
+duas apostas e um depósito simultâneos no mesmo jogador não perdem
+atualizações, e um débito sem saldo falha com `InsufficientFunds`.
+
+As contas do sistema (escrow, taxa, gateway) não têm linha de saldo, que
+seria disputada por toda aposta; o saldo delas, e o de qualquer conta,
+vem do último `BalanceSnapshot` mais os lançamentos posteriores.
+Snapshots são gravados periodicamente por uma thread de fundo.
+"""
+
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.models.database import db, to_money
+
+ESCROW = 'escrow'
+PLATFORM_FEE = 'platform_fee'
+GATEWAY = 'gateway'
+ADJUSTMENTS = 'adjustments'
+OPENING = 'opening'
+
+# Conta do outro lado da carteira para cada tipo de movimentação
+COUNTERPARTS = {
+    'deposit': GATEWAY,
+    'withdrawal': GATEWAY,
+}
+
+SNAPSHOT_INTERVAL = 300  # segundos entre snapshots
+SNAPSHOT_LAG = timedelta(seconds=60)  # lançamentos mais novos ficam para o próximo (transações ainda abertas)
+
+
+class InsufficientFunds(ValueError):
+    """Débito maior que o saldo da carteira"""
+
+
+class UnbalancedEntry(ValueError):
+    """Pernas de um lançamento que não somam zero"""
+
+
+def wallet(user_id):
+    """Conta da carteira de um jogador"""
+    return f'user:{user_id}'
+
+
+def escrow(kind, object_id):
+    """Conta de valores retidos de uma aposta ('bet') ou torneio ('tournament')"""
+    return f'{ESCROW}:{kind}:{object_id}'
+
+
+class Ledger:
+    """Lançamentos, saldos atômicos e snapshots"""
+
+    def __init__(self, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.snapshot_interval = snapshot_interval
+        self._thread = None
+
+    def post(self, entry_type, legs, transaction=None, bet_id=None):
+        """
+        Gravar um lançamento (na sessão atual, sem commit)
+
+        Args:
+            entry_type: Tipo do lançamento (deposit, bet_escrow, ...)
+            legs: Lista de (conta, valor); soma zero. Pernas de carteira
+                podem ser um objeto User no lugar da conta
+            transaction: Transação da carteira ligada ao lançamento
+            bet_id: Aposta ligada ao lançamento
+
+        Returns:
+            Dicionário user_id -> (saldo antes, saldo depois) das carteiras
+        """
+        return self.post_many([(entry_type, legs, transaction, bet_id)])
+
+    def post_many(self, entries):
+        """
+        Gravar vários lançamentos com um UPDATE de saldo por lote
+
+        O total de cada carteira é somado antes: débitos vão um a um pelo
+        UPDATE guardado e todos os créditos num único UPDATE (CASE por id).
+        As pernas entram num INSERT só. O saldo antes/depois de cada
+        transação é o da carteira na ordem dos lançamentos.
+
+        Args:
+            entries: Lista de (tipo, pernas, transação, bet_id), como em `post`
+
+        Returns:
+            Dicionário user_id -> (saldo antes, saldo depois) das carteiras
+        """
+        from src.models.ledger import LedgerEntry
+        from src.models.user import User
+
+        entries = [
+            (entry_type, [(account, to_money(amount)) for account, amount in legs], transaction, bet_id)
+            for entry_type, legs, transaction, bet_id in entries
+        ]
+        totals = {}  # user_id -> [usuário, total]
+        for _, legs, _, _ in entries:
+            if sum(amount for _, amount in legs) != 0:
+                raise UnbalancedEntry(legs)
+            for account, amount in legs:
+                if isinstance(account, User):
+                    totals.setdefault(account.id, [account, Decimal('0.00')])[1] += amount
+
+        # Ids das transações novas para os lançamentos
+        if any(transaction is not None and transaction.id is None for _, _, transaction, _ in entries):
+            db.session.flush()
+
+        balances = {}
+        credits = []
+        for user, total in totals.values():
+            if total < 0:
+                balances[user.id] = self._apply(user, total)
+            elif total > 0:
+                credits.append((user, total))
+            else:
+                balances[user.id] = (to_money(user.balance), to_money(user.balance))
+        balances.update(self._apply_credits(credits))
+
+        rows = []
+        running = {user_id: before for user_id, (before, _) in balances.items()}
+        now = datetime.utcnow()
+        for entry_type, legs, transaction, bet_id in entries:
+            journal_id = uuid.uuid4().hex
+            for account, amount in legs:
+                if isinstance(account, User):
+                    before = running[account.id]
+                    running[account.id] = before + amount
+                    if transaction is not None and transaction.user_id == account.id:
+                        transaction.balance_before = before
+                        transaction.balance_after = running[account.id]
+                    account = wallet(account.id)
+                rows.append({
+                    'journal_id': journal_id,
+                    'account': account,
+                    'amount': amount,
+                    'type': entry_type,
+                    'transaction_id': transaction.id if transaction else None,
+                    'bet_id': bet_id,
+                    'created_at': now,
+                    'updated_at': now
+                })
+
+        if rows:
+            db.session.execute(db.insert(LedgerEntry), rows)
+        return balances
+
+    def _apply(self, user, amount):
+        """
+        UPDATE atômico do saldo, negado se ficaria negativo
+
+        O saldo novo volta pelo RETURNING e é gravado no objeto como valor
+        já persistido (o ORM não emite outro UPDATE).
+        """
+        from src.models.user import User
+
+        # -0.005: em centavos equivale a >= 0, e tolera o REAL do SQLite
+        statement = db.update(User)\
+                      .where(User.id == user.id)\
+                      .where(User.balance + amount > Decimal('-0.005'))\
+                      .values(balance=db.func.round(User.balance + amount, 2))\
+                      .returning(User.balance)\
+                      .execution_options(synchronize_session=False)
+        row = db.session.execute(statement).first()
+        if row is None:
+            raise InsufficientFunds(f'Saldo insuficiente para {amount:+.2f}')
+
+        after = to_money(row[0])
+        set_committed_value(user, 'balance', after)
+        return after - amount, after
+
+    def _apply_credits(self, credits):
+        """
+        Créditos de várias carteiras num único UPDATE (crédito nunca fica negativo)
+
+        Returns:
+            Dicionário user_id -> (saldo antes, saldo depois)
+        """
+        from src.models.user import User
+
+        if not credits:
+            return {}
+        amounts = {user.id: amount for user, amount in credits}
+        statement = db.update(User)\
+                      .where(User.id.in_(list(amounts)))\
+                      .values(balance=db.func.round(User.balance + db.case(amounts, value=User.id), 2))\
+                      .returning(User.id, User.balance)\
+                      .execution_options(synchronize_session=False)
+        after = {user_id: to_money(balance) for user_id, balance in db.session.execute(statement)}
+
+        balances = {}
+        for user, amount in credits:
+            set_committed_value(user, 'balance', after[user.id])
+            balances[user.id] = (after[user.id] - amount, after[user.id])
+        return balances
+
+    def transfer(self, user, amount, entry_type, counterpart=None, transaction=None, bet_id=None):
+        """
+        Movimentar a carteira contra uma conta (crédito se amount > 0)
+
+        Returns:
+            (saldo antes, saldo depois)
+        """
+        counterpart = counterpart or COUNTERPARTS.get(entry_type, ADJUSTMENTS)
+        amount = to_money(amount)
+        balances = self.post(entry_type, [(user, amount), (counterpart, -amount)],
+                             transaction=transaction, bet_id=bet_id)
+        return balances[user.id]
+
+    def balance(self, account):
+        """Saldo da conta: último snapshot + lançamentos posteriores (requer app context)"""
+        return self.balances([account])[account]
+
+    def balances(self, accounts):
+        """Saldos de várias contas, em duas consultas"""
+        from src.models.ledger import LedgerEntry
+
+        accounts = list(accounts)
+        snapshots = self._latest_snapshots(accounts)
+
+        # Lançamentos depois do snapshot de cada conta
+        latest = self._latest_snapshot_ids(accounts).subquery()
+        tails = dict(db.session.query(LedgerEntry.account, db.func.sum(LedgerEntry.amount))
+                     .outerjoin(latest, LedgerEntry.account == latest.c.account)
+                     .filter(LedgerEntry.account.in_(accounts))
+                     .filter(LedgerEntry.id > db.func.coalesce(latest.c.entry_id, 0))
+                     .group_by(LedgerEntry.account).all())
+
+        return {
+            account: to_money(snapshots.get(account, Decimal('0.00')) + to_money(tails.get(account, 0)))
+            for account in accounts
+        }
+
+    def snapshot(self, now=None):
+        """
+        Gravar snapshots das contas movimentadas desde o último (com commit)
+
+        Só entram lançamentos com mais de SNAPSHOT_LAG: no PostgreSQL um id
+        menor ainda pode estar numa transação aberta quando o snapshot é
+        feito, e ficaria de fora para sempre.
+
+        Returns:
+            Número de contas com snapshot novo
+        """
+        from src.models.ledger import BalanceSnapshot, LedgerEntry
+
+        cutoff = (now or datetime.utcnow()) - SNAPSHOT_LAG
+        last = db.session.query(db.func.coalesce(db.func.max(BalanceSnapshot.entry_id), 0)).scalar()
+        upto = db.session.query(db.func.max(LedgerEntry.id))\
+                         .filter(LedgerEntry.id > last)\
+                         .filter(LedgerEntry.created_at <= cutoff).scalar()
+        if upto is None:
+            return 0
+
+        tails = db.session.query(LedgerEntry.account, db.func.sum(LedgerEntry.amount))\
+                          .filter(LedgerEntry.id > last, LedgerEntry.id <= upto)\
+                          .group_by(LedgerEntry.account).all()
+        previous = self._latest_snapshots([account for account, _ in tails])
+
+        db.session.add_all([
+            BalanceSnapshot(account=account,
+                            balance=previous.get(account, Decimal('0.00')) + to_money(total),
+                            entry_id=upto)
+            for account, total in tails
+        ])
+        db.session.commit()
+        return len(tails)
+
+    def _latest_snapshot_ids(self, accounts):
+        from src.models.ledger import BalanceSnapshot
+
+        return db.session.query(BalanceSnapshot.account,
+                                db.func.max(BalanceSnapshot.entry_id).label('entry_id'))\
+                         .filter(BalanceSnapshot.account.in_(accounts))\
+                         .group_by(BalanceSnapshot.account)
+
+    def _latest_snapshots(self, accounts):
+        """Saldo do último snapshot de cada conta"""
+        from src.models.ledger import BalanceSnapshot
+
+        if not accounts:
+            return {}
+        latest = self._latest_snapshot_ids(accounts).subquery()
+        rows = db.session.query(BalanceSnapshot.account, BalanceSnapshot.balance)\
+                         .join(latest, db.and_(BalanceSnapshot.account == latest.c.account,
+                                               BalanceSnapshot.entry_id == latest.c.entry_id)).all()
+        return {account: to_money(balance) for account, balance in rows}
+
+    def verify(self, user_ids=None):
+        """
+        Conferir o livro: lançamentos somam zero e cada carteira bate com o razão
+
+        Returns:
+            Lista de divergências (vazia se o livro está consistente)
+        """
+        from src.models.ledger import LedgerEntry
+        from src.models.user import User
+
+        problems = []
+        unbalanced = db.session.query(LedgerEntry.journal_id)\
+                               .group_by(LedgerEntry.journal_id)\
+                               .having(db.func.sum(LedgerEntry.amount) != 0).limit(10).all()
+        problems.extend(f'lançamento {journal_id} não soma zero' for (journal_id,) in unbalanced)
+
+        users = User.query.with_entities(User.id, User.balance)
+        if user_ids is not None:
+            users = users.filter(User.id.in_(user_ids))
+        users = users.all()
+
+        expected = self.balances(wallet(user_id) for user_id, _ in users)
+        for user_id, balance in users:
+            if to_money(balance) != expected[wallet(user_id)]:
+                problems.append(f'carteira {user_id}: saldo {to_money(balance)}, razão {expected[wallet(user_id)]}')
+        return problems
+
+    def run(self, app):
+        """Loop dos snapshots"""
+        while True:
+            time.sleep(self.snapshot_interval)
+            with app.app_context():
+                try:
+                    self.snapshot()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"⚠️ Erro no snapshot do livro-razão: {str(e)}")
+
+    def start(self, app):
+        """Iniciar os snapshots periódicos em uma thread de fundo"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, args=(app,), daemon=True)
+            self._thread.start()
+        return self._thread
+
+
+# Instância global do livro-razão
+ledger = Ledger()
+
+
+if __name__ == '__main__':
+    from src.main import app
+
+    with app.app_context():
+        accounts = ledger.snapshot()
+        problems = ledger.verify()
+    print(f"✅ Snapshot: {accounts} conta(s)")
+    for problem in problems:
+        print(f"⚠️ {problem}")
@@ -0,0 +1,191 @@
+"""
+Regras da partida de bola 8 (lado do servidor)
+
+`MatchState` guarda a mesa, de quem é a vez, os grupos (lisas/listradas),
+a bola na mão e o histórico compacto de tacadas. É usado tanto pela rota
+de tacada quanto pelo verificador de replays, para que as duas pontas
+apliquem exatamente as mesmas regras.
+"""
+
+import math
+from typing import Any, Dict, Optional
+
+from src.services.physics_engine import (
+    BALL_RADIUS, CUE_INDEX, MAX_X, MAX_Y, MIN_X, MIN_Y, TableState, simulate_shot
+)
+from src.services.table_codec import (
+    decode_table, encode_table, quantize_angle, quantize_position, quantize_power
+)
+
+SOLIDS = frozenset(range(1, 8))
+STRIPES = frozenset(range(9, 16))
+EIGHT_BALL = 8
+
+
+def quantize_table(state: TableState) -> TableState:
+    """Arredondar a mesa como ela é gravada (formato binário), para replays idênticos"""
+    return decode_table(encode_table(state))
+
+
+class MatchState:
+    """Estado da partida entre duas tacadas"""
+
+    def __init__(self, player1_id, player2_id, table=None, turn=None, groups=None,
+                 ball_in_hand=False, winner_id=None, shots=None):
+        self.player1_id = player1_id
+        self.player2_id = player2_id
+        self.table = table or TableState.initial()
+        self.turn = turn or player1_id
+        self.groups = groups or {}  # player_id -> 'solids' | 'stripes'
+        self.ball_in_hand = ball_in_hand
+        self.winner_id = winner_id
+        self.shots = shots or []  # [player_id, ângulo, força, cue_x, cue_y]
+
+    @classmethod
+    def from_game_data(cls, player1_id, player2_id, data: Optional[Dict[str, Any]],
+                       table: Optional[TableState] = None, shots=None):
+        """
+        Criar a partir de `Game.game_data_dict`
+
+        A mesa e o histórico vêm das colunas binárias do jogo quando
+        informados; senão, do formato JSON antigo em `data`.
+        """
+        data = data or {}
+        return cls(
+            player1_id,
+            player2_id,
+            table=table or TableState.from_dict(data.get('table')),
+            turn=data.get('turn'),
+            groups={int(k): v for k, v in (data.get('groups') or {}).items()},
+            ball_in_hand=data.get('ball_in_hand', False),
+            winner_id=data.get('winner_id'),
+            shots=shots if shots is not None else data.get('shots')
+        )
+
+    def rules_data(self):
+        """Campos de regras gravados em `Game.game_data`"""
+        return {
+            'turn': self.turn,
+            'groups': {str(k): v for k, v in self.groups.items()},
+            'ball_in_hand': self.ball_in_hand,
+            'winner_id': self.winner_id
+        }
+
+    def to_game_data(self):
+        """Visão JSON completa (depuração)"""
+        data = self.rules_data()
+        data['table'] = self.table.to_dict()
+        data['shots'] = self.shots
+        return data
+
+    def copy(self):
+        """Cópia independente (para testar tacadas sem alterar a partida)"""
+        return MatchState(self.player1_id, self.player2_id, self.table.copy(), self.turn,
+                          dict(self.groups), self.ball_in_hand, self.winner_id, list(self.shots))
+
+    def opponent_of(self, player_id):
+        return self.player2_id if player_id == self.player1_id else self.player1_id
+
+    def group_balls(self, player_id):
+        """Bolas do grupo do jogador (vazio se os grupos não foram definidos)"""
+        group = self.groups.get(player_id)
+        if group == 'solids':
+            return SOLIDS
+        if group == 'stripes':
+            return STRIPES
+        return frozenset()
+
+    def remaining_of(self, player_id):
+        """Bolas do grupo do jogador ainda na mesa"""
+        on_table = {n for n, p in zip(self.table.numbers, self.table.pocketed) if not p}
+        return self.group_balls(player_id) & on_table
+
+    def validate_shot(self, player_id, cue_position=None):
+        """Verificar se a tacada pode ser executada"""
+        if self.winner_id:
+            return False, "Partida já terminou"
+
+        if player_id != self.turn:
+            return False, "Não é sua vez"
+
+        if cue_position is None:
+            return True, "OK"
+
+        x, y = (quantize_position(c) for c in cue_position)
+        current_x, current_y = self.table.positions[CUE_INDEX]
+        if x == current_x and y == current_y:
+            return True, "OK"
+
+        if not self.ball_in_hand:
+            return False, "Branca só pode ser reposicionada com bola na mão"
+
+        if not (MIN_X <= x <= MAX_X and MIN_Y <= y <= MAX_Y):
+            return False, "Posição da branca fora da mesa"
+
+        for i, ((bx, by), pocketed) in enumerate(zip(self.table.positions, self.table.pocketed)):
+            if i != CUE_INDEX and not pocketed and math.hypot(bx - x, by - y) < 2 * BALL_RADIUS:
+                return False, "Branca sobreposta a outra bola"
+
+        return True, "OK"
+
+    def apply_shot(self, player_id, angle, power, cue_position=None):
+        """
+        Executar uma tacada já validada e aplicar as regras
+
+        Returns:
+            ShotResult da simulação
+        """
+        angle = quantize_angle(math.remainder(float(angle), 2 * math.pi))
+        power = quantize_power(power)
+
+        if cue_position is not None:
+            self.table.positions[CUE_INDEX] = [quantize_position(c) for c in cue_position]
+
+        cue_x, cue_y = (float(c) for c in self.table.positions[CUE_INDEX])
+        self.shots.append([player_id, angle, power, cue_x, cue_y])
+
+        return self.apply_result(player_id, simulate_shot(self.table, angle, power))
+
+    def apply_result(self, player_id, result):
+        """
+        Aplicar as regras a uma tacada já simulada sobre a mesa atual
+
+        Usado diretamente para pontuar tacadas simuladas em lote (o
+        histórico não é alterado).
+
+        Returns:
+            O próprio ShotResult
+        """
+        opponent_id = self.opponent_of(player_id)
+
+        # Falta: branca caiu, não tocou em nada ou tocou primeiro em bola do adversário
+        own = self.group_balls(player_id)
+        remaining = self.remaining_of(player_id)
+        foul = result.scratch
+        if own and result.first_hit is not None:
+            targets = remaining or {EIGHT_BALL}
+            foul = foul or result.first_hit not in targets
+
+        result.state.respot_cue_ball()
+        self.table = quantize_table(result.state)
+        self.ball_in_hand = foul
+
+        if EIGHT_BALL in result.pocketed:
+            cleared = bool(own) and not remaining
+            self.winner_id = player_id if cleared and not foul else opponent_id
+            return result
+
+        object_balls = [n for n in result.pocketed if n != 0]
+        if not self.groups and object_balls and not foul:
+            first_group = 'solids' if object_balls[0] in SOLIDS else 'stripes'
+            self.groups = {
+                player_id: first_group,
+                opponent_id: 'stripes' if first_group == 'solids' else 'solids'
+            }
+            own = self.group_balls(player_id)
+
+        scored = any(n in own for n in object_balls) if own else bool(object_balls)
+        if foul or not scored:
+            self.turn = opponent_id
+
+        return result
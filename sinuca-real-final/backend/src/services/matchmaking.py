@@ -0,0 +1,259 @@
+"""
+Fila de matchmaking por skill_rating
+
+Jogadores entram na fila por tipo de jogo, numa lista ordenada por
+(skill_rating, hora de entrada). Ao entrar, a busca faz bisect até o
+rating do jogador e anda para os dois lados, do rating mais próximo para
+o mais distante (no mesmo rating, o que espera há mais tempo), parando na
+borda da janela: o custo é O(log n) mais os candidatos visitados. A
+janela começa em BASE_WINDOW e cresce com o tempo de espera; os tickets
+também ficam em faixas de RATING_BUCKET pontos (FIFO), e uma varredura
+periódica tenta de novo o mais antigo de cada faixa com a janela ampliada.
+
+O `Game` só é criado quando o par é formado, já iniciado.
+"""
+
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+RATING_BUCKET = 50  # largura da faixa de skill_rating
+BASE_WINDOW = 50  # diferença de rating aceita ao entrar na fila
+WIDEN_PER_SECOND = 10  # quanto a janela cresce por segundo de espera
+MAX_WINDOW = 400
+MATCHED_TTL = 120  # segundos que o resultado fica disponível para consulta
+SWEEP_INTERVAL = 1.0
+
+
+class Ticket:
+    """Jogador na fila"""
+
+    def __init__(self, user_id, rating, game_type, time_limit, enqueued_at):
+        self.user_id = user_id
+        self.rating = rating
+        self.game_type = game_type
+        self.time_limit = time_limit
+        self.enqueued_at = enqueued_at
+        self.game_id = None
+        self.matched_at = None
+
+    @property
+    def bucket(self):
+        return self.rating // RATING_BUCKET
+
+    def window(self, now):
+        """Diferença de rating aceita após o tempo de espera"""
+        waited = now - self.enqueued_at
+        return min(MAX_WINDOW, BASE_WINDOW + int(waited * WIDEN_PER_SECOND))
+
+    def to_dict(self, now=None):
+        now = now or time.monotonic()
+        if self.game_id:
+            return {'status': 'matched', 'game_id': self.game_id}
+        return {
+            'status': 'waiting',
+            'game_type': self.game_type,
+            'skill_rating': self.rating,
+            'rating_window': self.window(now),
+            'waited_seconds': round(now - self.enqueued_at, 1)
+        }
+
+
+class Matchmaker:
+    """Fila em memória indexada por tipo de jogo e faixa de rating"""
+
+    def __init__(self):
+        self.queues = {}  # game_type -> [(rating, enqueued_at, user_id, Ticket)] ordenada
+        self.buckets = {}  # game_type -> {faixa: OrderedDict(user_id -> Ticket)}
+        self.tickets = {}  # user_id -> Ticket (esperando ou pareado)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @staticmethod
+    def _key(ticket):
+        return (ticket.rating, ticket.enqueued_at, ticket.user_id)
+
+    def _add(self, ticket):
+        insort(self.queues.setdefault(ticket.game_type, []), self._key(ticket) + (ticket,))
+        buckets = self.buckets.setdefault(ticket.game_type, {})
+        buckets.setdefault(ticket.bucket, OrderedDict())[ticket.user_id] = ticket
+
+    def _remove(self, ticket):
+        queue = self.queues.get(ticket.game_type, [])
+        index = bisect_left(queue, self._key(ticket))
+        if index < len(queue) and queue[index][3] is ticket:
+            del queue[index]
+
+        buckets = self.buckets.get(ticket.game_type, {})
+        bucket = buckets.get(ticket.bucket)
+        if bucket is not None:
+            bucket.pop(ticket.user_id, None)
+            if not bucket:
+                del buckets[ticket.bucket]
+
+    def _find_opponent(self, ticket, now):
+        """Oponente mais próximo em rating (e há mais tempo na fila) dentro da janela"""
+        queue = self.queues.get(ticket.game_type, [])
+        window = ticket.window(now)
+        start = bisect_left(queue, (ticket.rating,))
+
+        def below(index):
+            # Ratings decrescentes; no mesmo rating, do mais antigo para o mais novo
+            while index >= 0:
+                first = bisect_left(queue, (queue[index][0],), 0, index + 1)
+                yield from queue[first:index + 1]
+                index = first - 1
+
+        nearest = heapq.merge(below(start - 1), queue[start:],
+                              key=lambda entry: (abs(entry[0] - ticket.rating), entry[1]))
+        for rating, _, user_id, candidate in nearest:
+            if abs(rating - ticket.rating) > window:
+                break
+            if user_id != ticket.user_id:
+                return candidate
+        return None
+
+    def _pair(self, ticket, now):
+        """Tirar o par da fila (sob o lock); retorna o oponente ou None"""
+        opponent = self._find_opponent(ticket, now)
+        if opponent is None:
+            return None
+        self._remove(ticket)
+        self._remove(opponent)
+        return opponent
+
+    def enqueue(self, user, game_type='8ball', time_limit=300):
+        """
+        Colocar o jogador na fila (requer app context)
+
+        Já esperando no mesmo tipo de jogo, continua com o ticket que tem;
+        em outro tipo, o ticket é trocado.
+
+        Returns:
+            Ticket; `game_id` preenchido se o par foi formado na hora
+        """
+        now = time.monotonic()
+        with self._lock:
+            existing = self.tickets.get(user.id)
+            if existing and not existing.game_id:
+                if existing.game_type == game_type:
+                    return existing
+                # Pediu outro tipo de jogo: sai da fila antiga
+                self._remove(existing)
+
+            ticket = Ticket(user.id, user.skill_rating, game_type, time_limit, now)
+            self.tickets[user.id] = ticket
+            opponent = self._pair(ticket, now)
+            if opponent is None:
+                self._add(ticket)
+                return ticket
+
+        self._create_game(opponent, ticket)
+        return ticket
+
+    def cancel(self, user_id):
+        """Sair da fila; retorna False se o jogador não estava esperando"""
+        with self._lock:
+            ticket = self.tickets.get(user_id)
+            if ticket is None or ticket.game_id:
+                return False
+            self._remove(ticket)
+            del self.tickets[user_id]
+            return True
+
+    def status(self, user_id):
+        with self._lock:
+            return self.tickets.get(user_id)
+
+    def _create_game(self, first, second):
+        """Criar e iniciar o jogo do par; em caso de erro os dois voltam à fila"""
+        from src.models.database import db
+        from src.models.game import Game
+        from src.services.game_store import game_store
+
+        try:
+            game = Game(
+                player1_id=first.user_id,
+                player2_id=second.user_id,
+                game_type=first.game_type,
+                time_limit=first.time_limit
+            )
+            db.session.add(game)
+            game_store.start(game)
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                self._add(first)
+                self._add(second)
+            raise
+
+        now = time.monotonic()
+        for ticket in (first, second):
+            ticket.game_id = game.id
+            ticket.matched_at = now
+        return game
+
+    def sweep(self):
+        """
+        Tentar de novo o mais antigo de cada faixa com a janela ampliada
+        e descartar resultados antigos (requer app context)
+
+        Returns:
+            Número de jogos criados
+        """
+        now = time.monotonic()
+        pairs = []
+        with self._lock:
+            for buckets in self.buckets.values():
+                for index in list(buckets):
+                    bucket = buckets.get(index)
+                    if not bucket:
+                        continue
+                    oldest = next(iter(bucket.values()))
+                    opponent = self._pair(oldest, now)
+                    if opponent is not None:
+                        pairs.append((opponent, oldest))
+
+            expired = [
+                user_id for user_id, ticket in self.tickets.items()
+                if ticket.matched_at is not None and now - ticket.matched_at > MATCHED_TTL
+            ]
+            for user_id in expired:
+                del self.tickets[user_id]
+
+        created = 0
+        for first, second in pairs:
+            try:
+                self._create_game(first, second)
+                created += 1
+            except Exception as e:
+                print(f"⚠️ Erro ao criar jogo do matchmaking: {str(e)}")
+        return created
+
+    def stats(self):
+        """Jogadores esperando por tipo de jogo"""
+        with self._lock:
+            return {game_type: len(queue) for game_type, queue in self.queues.items()}
+
+    def run(self, app, interval=SWEEP_INTERVAL):
+        """Loop da varredura"""
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"⚠️ Erro no matchmaking: {str(e)}")
+
+    def start(self, app):
+        """Iniciar a varredura em uma thread de fundo"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, args=(app,), daemon=True)
+            self._thread.start()
+        return self._thread
+
+
+# Instância global da fila
+matchmaker = Matchmaker()
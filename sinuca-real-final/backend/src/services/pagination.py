@@ -0,0 +1,130 @@
+"""
+Paginação por cursor (keyset) das listagens
+
+Em vez de OFFSET, cada página continua depois da última linha da anterior:
+`WHERE (created_at, id) < (:created_at, :id) ORDER BY created_at DESC, id
+DESC LIMIT n`. Com um índice que termina nessas colunas, a página 1000
+custa o mesmo que a primeira.
+
+O cursor devolvido ao cliente (`next_cursor`) é opaco: base64 das chaves da
+última linha mais a posição, usada por listagens numeradas (ranking).
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from src.models.database import db
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+
+class InvalidCursor(ValueError):
+    """Cursor que não foi gerado por esta listagem"""
+
+
+class Page:
+    """Itens de uma página, o cursor da próxima e a posição do primeiro item"""
+
+    def __init__(self, items, next_cursor, offset):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.offset = offset
+
+
+class Keyset:
+    """Ordenação decrescente por colunas únicas em conjunto (a última é o id)"""
+
+    def __init__(self, *columns):
+        self.columns = columns
+
+    def encode(self, row, offset):
+        values = []
+        for column in self.columns:
+            value = getattr(row, column.key)
+            values.append(value.isoformat() if isinstance(value, datetime) else value)
+        payload = json.dumps([values, offset], separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode(self, token):
+        """
+        Returns:
+            (valores das chaves, posição) do cursor
+        """
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            values, offset = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if len(values) != len(self.columns) or not isinstance(offset, int):
+                raise InvalidCursor(token)
+            keys = []
+            for column, value in zip(self.columns, values):
+                if column.type.python_type is datetime:
+                    keys.append(datetime.fromisoformat(value))
+                else:
+                    keys.append(column.type.python_type(value))
+            return keys, offset
+        except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+            raise InvalidCursor(token)
+
+    def order(self, columns=None):
+        return [column.desc() for column in (columns or self.columns)]
+
+    def after(self, statement, keys, columns=None):
+        """Filtro das linhas depois do cursor (nada a filtrar na primeira página)"""
+        if keys is None:
+            return statement
+        return statement.filter(db.tuple_(*(columns or self.columns)) < db.tuple_(*keys))
+
+
+def page_args(request, keyset, default=DEFAULT_PAGE_SIZE):
+    """
+    Ler `limit` e `cursor` da query string
+
+    Returns:
+        (limite, chaves do cursor ou None, posição)
+    """
+    limit = request.args.get('limit', default, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return limit, None, 0
+    keys, offset = keyset.decode(cursor)
+    return limit, keys, offset
+
+
+def paginate(query, keyset, limit, keys=None, offset=0):
+    """Página de uma consulta ORM (uma linha a mais diz se há próxima)"""
+    rows = keyset.after(query, keys).order_by(*keyset.order()).limit(limit + 1).all()
+    return _page(rows, keyset, limit, offset)
+
+
+def paginate_union(query, model, keyset, branches, limit, keys=None, offset=0):
+    """
+    Página de uma consulta `a OR b` com um índice por ramo
+
+    `OR` entre colunas diferentes obriga o banco a juntar e ordenar todas
+    as linhas do usuário. Aqui cada ramo lê no máximo `limit + 1` linhas do
+    seu índice, já depois do cursor, e só os ids da junção vão para a
+    consulta principal (que mantém os eager loads): uma única consulta SQL.
+    """
+    parts = []
+    for condition in branches:
+        branch = db.select(*keyset.columns).where(condition)
+        branch = keyset.after(branch, keys).order_by(*keyset.order()).limit(limit + 1)
+        parts.append(branch.subquery().select())
+
+    merged = db.union_all(*parts).subquery()
+    merged_columns = [merged.c[column.key] for column in keyset.columns]
+    ids = db.select(merged.c.id).order_by(*keyset.order(merged_columns)).limit(limit + 1)
+
+    rows = query.filter(model.id.in_(ids)).order_by(*keyset.order()).all()
+    return _page(rows, keyset, limit, offset)
+
+
+def _page(rows, keyset, limit, offset):
+    items = rows[:limit]
+    next_cursor = keyset.encode(items[-1], offset + len(items)) if len(rows) > limit else None
+    return Page(items, next_cursor, offset)
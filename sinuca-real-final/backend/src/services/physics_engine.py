@@ -0,0 +1,592 @@
+"""
+Motor de física da mesa de sinuca (lado do servidor)
+
+Porta a física de `frontend/src/components/Game.jsx` para arrays NumPy:
+posições e velocidades de todas as bolas ficam em arrays (mesas, bolas, 2)
+e cada quadro aplica movimento, atrito, caçapas, tabelas e colisões entre
+bolas como operações vetorizadas, sem objetos por bola.
+
+Há dois resolvedores:
+- 'fixed': passo fixo por quadro, igual ao loop do frontend
+- 'event': orientado a eventos; calcula analiticamente o próximo contato
+  (bola-bola, tabela, caçapa ou parada) e avança direto até ele
+"""
+
+import math
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Dimensões da mesa (mesmas do canvas em Game.jsx)
+TABLE_WIDTH = 800
+TABLE_HEIGHT = 400
+CUSHION = 20
+BALL_RADIUS = 10
+POCKET_RADIUS = 15
+
+# Limites para o centro da bola
+MIN_X = CUSHION + BALL_RADIUS
+MAX_X = TABLE_WIDTH - CUSHION - BALL_RADIUS
+MIN_Y = CUSHION + BALL_RADIUS
+MAX_Y = TABLE_HEIGHT - CUSHION - BALL_RADIUS
+
+# Parâmetros físicos (por quadro)
+FRICTION = 0.98
+RESTITUTION = 0.8
+STOP_SPEED = 0.5
+CUE_POWER_SCALE = 0.3  # cueBall.shoot(power * 0.3, angle)
+MAX_POWER = 100
+MAX_FRAMES = 3000
+MAX_EVENTS = 1000
+
+# Atrito contínuo equivalente: v(t) = v0 * e^(-DECAY * t), t em quadros
+DECAY = -math.log(FRICTION)
+
+SOLVERS = ('event', 'fixed')
+DEFAULT_SOLVER = 'event'
+
+# Caçapas (mesmas coordenadas de render())
+POCKETS = np.array([
+    [25, 25], [400, 15], [775, 25],
+    [25, 375], [400, 385], [775, 375]
+], dtype=np.float64)
+
+# A bola cai quando o centro entra nesta distância da caçapa
+POCKET_CAPTURE = POCKET_RADIUS + BALL_RADIUS / 2
+
+# Ordem das bolas: branca (0) e depois a formação triangular de Game.jsx
+BALL_NUMBERS = (0, 8, 1, 2, 3, 4, 5, 6, 7, 9, 10, 11, 12, 13, 14, 15)
+CUE_INDEX = 0
+CUE_START = (200.0, 200.0)
+
+
+def rack_positions():
+    """Posições iniciais (branca + triângulo), como em initializeBalls()"""
+    positions = [CUE_START]
+    for row in range(5):
+        for col in range(row + 1):
+            positions.append((600.0 + row * 22, 200.0 + (col - row / 2) * 22))
+    return np.array(positions, dtype=np.float64)
+
+
+class TableState:
+    """Estado da mesa: posições, velocidades e bolas encaçapadas"""
+
+    def __init__(self, positions, velocities=None, pocketed=None, numbers=BALL_NUMBERS):
+        self.positions = np.array(positions, dtype=np.float64).reshape(-1, 2)
+        count = len(self.positions)
+        if velocities is None:
+            velocities = np.zeros((count, 2))
+        if pocketed is None:
+            pocketed = np.zeros(count, dtype=bool)
+        self.velocities = np.array(velocities, dtype=np.float64).reshape(-1, 2)
+        self.pocketed = np.array(pocketed, dtype=bool)
+        self.numbers = tuple(numbers)
+
+    @classmethod
+    def initial(cls):
+        """Mesa arrumada para a quebra"""
+        return cls(rack_positions())
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]):
+        """Criar a partir do formato salvo em `Game.game_data`"""
+        balls = (data or {}).get('balls')
+        if not balls:
+            return cls.initial()
+
+        balls = sorted(balls, key=lambda b: BALL_NUMBERS.index(int(b['number'])))
+        return cls(
+            positions=[(float(b['x']), float(b['y'])) for b in balls],
+            pocketed=[bool(b.get('pocketed', False)) for b in balls],
+            numbers=[int(b['number']) for b in balls]
+        )
+
+    def to_dict(self):
+        """Converter para o formato salvo em `Game.game_data`"""
+        return {
+            'balls': [
+                {
+                    'number': number,
+                    'x': round(float(x), 3),
+                    'y': round(float(y), 3),
+                    'pocketed': bool(pocketed)
+                }
+                for number, (x, y), pocketed in zip(self.numbers, self.positions, self.pocketed)
+            ]
+        }
+
+    def copy(self):
+        return TableState(self.positions.copy(), self.velocities.copy(),
+                          self.pocketed.copy(), self.numbers)
+
+    def respot_cue_ball(self):
+        """Recolocar a branca após falta"""
+        if self.pocketed[CUE_INDEX]:
+            self.pocketed[CUE_INDEX] = False
+            self.positions[CUE_INDEX] = CUE_START
+            self.velocities[CUE_INDEX] = 0.0
+
+
+class ShotResult:
+    """Resultado de uma tacada simulada"""
+
+    def __init__(self, state, pocketed, first_hit, frames, events=None):
+        self.state = state
+        self.pocketed = pocketed  # números das bolas, na ordem em que caíram
+        self.first_hit = first_hit  # número da primeira bola tocada pela branca
+        self.frames = frames
+        self.events = events  # eventos processados (só no resolvedor 'event')
+
+    @property
+    def scratch(self):
+        """A branca caiu ou não tocou em nenhuma bola"""
+        return 0 in self.pocketed or self.first_hit is None
+
+    def to_dict(self):
+        return {
+            'table': self.state.to_dict(),
+            'pocketed': list(self.pocketed),
+            'first_hit': self.first_hit,
+            'scratch': self.scratch,
+            'frames': self.frames,
+            'events': self.events
+        }
+
+
+def cue_velocity(angle, power):
+    """Velocidade inicial da branca para (ângulo em radianos, força 0-100)"""
+    speed = min(max(float(power), 0.0), MAX_POWER) * CUE_POWER_SCALE
+    return speed * math.cos(angle), speed * math.sin(angle)
+
+
+def step(positions, velocities, pocketed):
+    """
+    Avançar um quadro para um lote de mesas
+
+    Args:
+        positions: array (mesas, bolas, 2), alterado no lugar
+        velocities: array (mesas, bolas, 2), alterado no lugar
+        pocketed: array bool (mesas, bolas), alterado no lugar
+
+    Returns:
+        (contatos, recém-encaçapadas): máscara (mesas, bolas, bolas) dos pares
+        que colidiram neste quadro e máscara (mesas, bolas) das bolas que caíram
+    """
+    active = ~pocketed
+
+    # Movimento e atrito
+    positions += velocities
+    velocities *= FRICTION
+    speed_sq = np.einsum('...i,...i->...', velocities, velocities)
+    velocities[speed_sq < STOP_SPEED * STOP_SPEED] = 0.0
+
+    # Caçapas
+    to_pockets = positions[:, :, None, :] - POCKETS[None, None, :, :]
+    pocket_dist_sq = np.einsum('...i,...i->...', to_pockets, to_pockets)
+    dropped = active & (pocket_dist_sq < POCKET_CAPTURE * POCKET_CAPTURE).any(axis=2)
+    pocketed |= dropped
+    velocities[dropped] = 0.0
+    active &= ~dropped
+
+    # Tabelas
+    x = positions[..., 0]
+    y = positions[..., 1]
+    vx = velocities[..., 0]
+    vy = velocities[..., 1]
+    hit_x = active & ((x < MIN_X) | (x > MAX_X))
+    hit_y = active & ((y < MIN_Y) | (y > MAX_Y))
+    np.clip(x, MIN_X, MAX_X, out=x, where=active)
+    np.clip(y, MIN_Y, MAX_Y, out=y, where=active)
+    vx[hit_x] *= -RESTITUTION
+    vy[hit_y] *= -RESTITUTION
+
+    # Colisões entre bolas: todos os pares de uma vez
+    delta = positions[:, None, :, :] - positions[:, :, None, :]  # delta[b, i, j] = p_j - p_i
+    dist = np.sqrt(np.einsum('...i,...i->...', delta, delta))
+    count = positions.shape[1]
+    upper = np.triu(np.ones((count, count), dtype=bool), k=1)
+    contact = upper & active[:, :, None] & active[:, None, :] & (dist < 2 * BALL_RADIUS) & (dist > 0)
+    if not contact.any():
+        return contact, dropped
+
+    safe_dist = np.where(contact, dist, 1.0)
+    normal = delta / safe_dist[..., None]
+    relative = velocities[:, :, None, :] - velocities[:, None, :, :]  # v_i - v_j
+    approach = np.einsum('...i,...i->...', relative, normal)
+    contact &= approach > 0
+
+    # Resposta elástica (massas iguais) ao longo da normal
+    impulse = normal * np.where(contact, approach, 0.0)[..., None]
+    velocities -= impulse.sum(axis=2)
+    velocities += impulse.sum(axis=1)
+
+    # Separar bolas sobrepostas
+    overlap = np.where(contact, 2 * BALL_RADIUS - dist, 0.0)
+    separation = normal * (overlap * 0.5)[..., None]
+    positions -= separation.sum(axis=2)
+    positions += separation.sum(axis=1)
+
+    return contact, dropped
+
+
+def simulate_batch(positions, velocities, pocketed, max_frames=MAX_FRAMES):
+    """
+    Simular um lote de mesas até todas as bolas pararem
+
+    Returns:
+        dict com arrays finais e, por mesa, o quadro em que cada bola caiu
+        (-1 se não caiu), o índice da primeira bola tocada pela branca
+        (-1 se nenhuma) e o número de quadros simulados
+    """
+    positions = np.array(positions, dtype=np.float64)
+    velocities = np.array(velocities, dtype=np.float64)
+    pocketed = np.array(pocketed, dtype=bool)
+
+    tables, count = pocketed.shape
+    drop_frame = np.full((tables, count), -1, dtype=np.int64)
+    first_hit = np.full(tables, -1, dtype=np.int64)
+    frames = np.zeros(tables, dtype=np.int64)
+
+    for frame in range(max_frames):
+        moving = (velocities != 0.0).any(axis=(1, 2))
+        if not moving.any():
+            break
+        frames[moving] += 1
+
+        contact, dropped = step(positions, velocities, pocketed)
+        drop_frame[dropped] = frame
+
+        cue_contact = contact[:, CUE_INDEX, :]
+        new_hit = (first_hit < 0) & cue_contact.any(axis=1)
+        first_hit[new_hit] = cue_contact[new_hit].argmax(axis=1)
+
+    return {
+        'positions': positions,
+        'velocities': velocities,
+        'pocketed': pocketed,
+        'drop_frame': drop_frame,
+        'first_hit': first_hit,
+        'frames': frames
+    }
+
+
+def _pocket_order(drop_frame, numbers):
+    """Números das bolas encaçapadas, na ordem em que caíram"""
+    dropped = [i for i in range(len(numbers)) if drop_frame[i] >= 0]
+    dropped.sort(key=lambda i: (drop_frame[i], i))
+    return [numbers[i] for i in dropped]
+
+
+def _dot(a, b):
+    return np.einsum('...i,...i->...', a, b)
+
+
+def _first_root(a, b, c):
+    """
+    Menor s >= 0 com a*s² + b*s + c = 0 para objetos se aproximando (b < 0)
+
+    Retorna inf onde não há contato. Se já há sobreposição (c < 0), o
+    contato é imediato.
+    """
+    disc = b * b - 4 * a * c
+    valid = (a > 0) & (b < -1e-12) & (disc >= 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        root = (-b - np.sqrt(np.where(valid, disc, 0.0))) / (2 * np.where(valid, a, 1.0))
+    root = np.where(c < 0, 0.0, np.maximum(root, 0.0))
+    return np.where(valid, root, np.inf)
+
+
+def _scalar_root(a, b, c):
+    """Versão escalar de `_first_root`, usada nas atualizações incrementais"""
+    if a <= 0 or b >= -1e-12:
+        return math.inf
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return math.inf
+    if c < 0:
+        return 0.0
+    return max((-b - math.sqrt(disc)) / (2 * a), 0.0)
+
+
+_POCKET_LIST = POCKETS.tolist()
+
+
+@lru_cache(maxsize=None)
+def _pair_layout(count):
+    """Índices dos pares (i < j) e, por bola, a lista de (par, outra bola)"""
+    pair_i, pair_j = np.triu_indices(count, k=1)
+    pairs_of = [[] for _ in range(count)]
+    for pair, (i, j) in enumerate(zip(pair_i.tolist(), pair_j.tolist())):
+        pairs_of[i].append((pair, j))
+        pairs_of[j].append((pair, i))
+    return pair_i, pair_j, pairs_of
+
+
+class _EventTable:
+    """
+    Tempos (em s) de todos os eventos candidatos de uma mesa
+
+    Layout do array plano `times`: parada (N), tabela x (N), tabela y (N),
+    caçapa (N) e depois um tempo por par de bolas. Como todas as bolas usam
+    o mesmo s, avançar até um evento transforma todos os tempos de forma
+    uniforme; só as bolas envolvidas no evento precisam ser recalculadas.
+    """
+
+    STOP, WALL_X, WALL_Y, POCKET, PAIR = range(5)
+
+    def __init__(self, positions, velocities, pocketed):
+        self.positions = positions
+        self.velocities = velocities
+        self.pocketed = pocketed
+
+        count = len(positions)
+        self.count = count
+        self.pair_i, self.pair_j, self.pairs_of = _pair_layout(count)
+        self.times = np.concatenate(self._full_times())
+
+    def _full_times(self):
+        """Calcular todos os tempos de uma vez (início da tacada)"""
+        positions, velocities, pocketed = self.positions, self.velocities, self.pocketed
+        speed = np.sqrt(_dot(velocities, velocities))
+        moving = ~pocketed & (speed > 0)
+
+        # Parada: |v| * e^(-DECAY * t) = STOP_SPEED
+        s_stop = np.where(moving, (1 - STOP_SPEED / np.maximum(speed, STOP_SPEED)) / DECAY, np.inf)
+
+        # Tabelas
+        vx = velocities[:, 0]
+        vy = velocities[:, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s_x = np.where(vx > 0, (MAX_X - positions[:, 0]) / vx,
+                           np.where(vx < 0, (MIN_X - positions[:, 0]) / vx, np.inf))
+            s_y = np.where(vy > 0, (MAX_Y - positions[:, 1]) / vy,
+                           np.where(vy < 0, (MIN_Y - positions[:, 1]) / vy, np.inf))
+        s_x = np.where(moving, np.maximum(s_x, 0.0), np.inf)
+        s_y = np.where(moving, np.maximum(s_y, 0.0), np.inf)
+
+        # Caçapas: |p + v * s - P| = POCKET_CAPTURE
+        to_pockets = positions[:, None, :] - POCKETS[None, :, :]
+        s_pocket = _first_root(
+            _dot(velocities, velocities)[:, None],
+            2 * _dot(to_pockets, velocities[:, None, :]),
+            _dot(to_pockets, to_pockets) - POCKET_CAPTURE * POCKET_CAPTURE
+        )
+        s_pocket[~moving] = np.inf
+
+        # Pares de bolas: |d + w * s| = 2R
+        delta = positions[self.pair_j] - positions[self.pair_i]
+        relative = velocities[self.pair_j] - velocities[self.pair_i]
+        s_pair = _first_root(
+            _dot(relative, relative),
+            2 * _dot(delta, relative),
+            _dot(delta, delta) - 4 * BALL_RADIUS * BALL_RADIUS
+        )
+        s_pair[pocketed[self.pair_i] | pocketed[self.pair_j]] = np.inf
+
+        return s_stop, s_x, s_y, s_pocket.min(axis=1), s_pair
+
+    def next_event(self):
+        """(tipo, índice, s) do próximo evento; s é inf se nada se move"""
+        slot = int(self.times.argmin())
+        travel = float(self.times[slot])
+        kind = min(slot // self.count, self.PAIR)
+        index = slot - kind * self.count
+        return kind, index, travel
+
+    def advance(self, travel):
+        """Avançar todas as bolas e os tempos guardados em `travel`"""
+        scale = 1 - DECAY * travel
+        self.positions += self.velocities * travel
+        self.velocities *= scale
+        self.times -= travel
+        self.times /= scale
+
+    def refresh(self, ball):
+        """Recalcular os tempos de uma bola cuja velocidade mudou"""
+        count = self.count
+        times = self.times
+        positions = self.positions.tolist()
+        velocities = self.velocities.tolist()
+        pocketed = self.pocketed.tolist()
+        x, y = positions[ball]
+        vx, vy = velocities[ball]
+        speed_sq = vx * vx + vy * vy
+
+        if pocketed[ball] or speed_sq == 0.0:
+            times[ball] = times[count + ball] = times[2 * count + ball] = times[3 * count + ball] = math.inf
+        else:
+            speed = math.sqrt(speed_sq)
+            times[ball] = (1 - STOP_SPEED / max(speed, STOP_SPEED)) / DECAY
+            times[count + ball] = max(((MAX_X if vx > 0 else MIN_X) - x) / vx, 0.0) if vx else math.inf
+            times[2 * count + ball] = max(((MAX_Y if vy > 0 else MIN_Y) - y) / vy, 0.0) if vy else math.inf
+            capture_sq = POCKET_CAPTURE * POCKET_CAPTURE
+            times[3 * count + ball] = min(
+                _scalar_root(speed_sq, 2 * ((x - px) * vx + (y - py) * vy),
+                             (x - px) ** 2 + (y - py) ** 2 - capture_sq)
+                for px, py in _POCKET_LIST
+            )
+
+        contact_sq = 4 * BALL_RADIUS * BALL_RADIUS
+        base = 4 * count
+        for pair, other in self.pairs_of[ball]:
+            if pocketed[ball] or pocketed[other]:
+                times[base + pair] = math.inf
+                continue
+            # Sinal irrelevante: a equação é simétrica em (i, j)
+            ox, oy = positions[other]
+            ovx, ovy = velocities[other]
+            dx, dy = ox - x, oy - y
+            wx, wy = ovx - vx, ovy - vy
+            times[base + pair] = _scalar_root(wx * wx + wy * wy, 2 * (dx * wx + dy * wy),
+                                              dx * dx + dy * dy - contact_sq)
+
+
+def simulate_events(positions, velocities, pocketed, max_events=MAX_EVENTS):
+    """
+    Simular uma mesa pelo método orientado a eventos
+
+    Entre eventos toda bola em movimento percorre p + v * s, com o mesmo
+    deslocamento escalar s(t) = (1 - e^(-DECAY * t)) / DECAY para todas.
+    Assim os tempos de parada, tabela, caçapa e colisão entre pares são
+    raízes de equações lineares ou quadráticas em s, calculadas de uma vez
+    com NumPy no início da tacada; o menor deles é o próximo evento, e a
+    cada evento só as bolas envolvidas têm seus tempos recalculados.
+
+    Returns:
+        dict no mesmo formato de `simulate_batch` (sem a dimensão de mesas),
+        com 'drop_frame' em tempo contínuo e o total de 'events'
+    """
+    positions = np.array(positions, dtype=np.float64)
+    velocities = np.array(velocities, dtype=np.float64)
+    pocketed = np.array(pocketed, dtype=bool)
+
+    table = _EventTable(positions, velocities, pocketed)
+    drop_time = np.full(len(positions), -1.0)
+    first_hit = -1
+    elapsed = 0.0
+    events = 0
+
+    while events < max_events:
+        kind, index, travel = table.next_event()
+        if math.isinf(travel):
+            break
+
+        # Avançar todas as bolas até o evento
+        table.advance(travel)
+        elapsed += -math.log(1 - DECAY * travel) / DECAY
+        events += 1
+
+        if kind == table.STOP:
+            velocities[index] = 0.0
+        elif kind == table.WALL_X:
+            positions[index, 0] = min(max(positions[index, 0], MIN_X), MAX_X)
+            velocities[index, 0] *= -RESTITUTION
+        elif kind == table.WALL_Y:
+            positions[index, 1] = min(max(positions[index, 1], MIN_Y), MAX_Y)
+            velocities[index, 1] *= -RESTITUTION
+        elif kind == table.POCKET:
+            pocketed[index] = True
+            velocities[index] = 0.0
+            drop_time[index] = elapsed
+        else:
+            i, j = int(table.pair_i[index]), int(table.pair_j[index])
+            normal = positions[j] - positions[i]
+            normal /= math.hypot(normal[0], normal[1])
+            approach = float(np.dot(velocities[i] - velocities[j], normal))
+            if approach > 0:
+                velocities[i] -= normal * approach
+                velocities[j] += normal * approach
+            if i == CUE_INDEX and first_hit < 0:
+                first_hit = j
+            table.refresh(i)
+            index = j
+
+        table.refresh(index)
+
+    return {
+        'positions': positions,
+        'velocities': velocities,
+        'pocketed': pocketed,
+        'drop_frame': drop_time,
+        'first_hit': first_hit,
+        'frames': elapsed,
+        'events': events
+    }
+
+
+def simulate_shot(state: TableState, angle: float, power: float,
+                  mode: str = DEFAULT_SOLVER, max_frames: int = MAX_FRAMES) -> ShotResult:
+    """
+    Resolver uma tacada a partir apenas de (ângulo, força)
+
+    Args:
+        state: Estado da mesa antes da tacada (não é alterado)
+        angle: Ângulo da tacada em radianos
+        power: Força da tacada (0-100, como na barra do frontend)
+        mode: Resolvedor ('event' ou 'fixed')
+
+    Returns:
+        ShotResult com a mesa final e as bolas encaçapadas
+    """
+    velocities = state.velocities.copy()
+    velocities[CUE_INDEX] = cue_velocity(angle, power)
+
+    if mode == 'event':
+        result = simulate_events(state.positions, velocities, state.pocketed)
+        events = result['events']
+    elif mode == 'fixed':
+        batch = simulate_batch(state.positions[None], velocities[None],
+                               state.pocketed[None], max_frames)
+        result = {key: value[0] for key, value in batch.items()}
+        events = None
+    else:
+        raise ValueError(f'Resolvedor inválido: {mode}')
+
+    final = TableState(result['positions'], result['velocities'],
+                       result['pocketed'], state.numbers)
+    first = int(result['first_hit'])
+
+    return ShotResult(
+        state=final,
+        pocketed=_pocket_order(result['drop_frame'], state.numbers),
+        first_hit=state.numbers[first] if first >= 0 else None,
+        frames=int(math.ceil(result['frames'])),
+        events=events
+    )
+
+
+def simulate_shots(state: TableState, shots: Sequence[Tuple[float, float]],
+                   max_frames: int = MAX_FRAMES) -> List[ShotResult]:
+    """
+    Simular várias tacadas sobre a mesma mesa numa única chamada de
+    `simulate_batch` (passo fixo), uma mesa do lote por tacada
+
+    Returns:
+        Lista de ShotResult, na mesma ordem de `shots`
+    """
+    count = len(shots)
+    positions = np.repeat(state.positions[None], count, axis=0)
+    velocities = np.repeat(state.velocities[None], count, axis=0)
+    pocketed = np.repeat(state.pocketed[None], count, axis=0)
+    for table, (angle, power) in enumerate(shots):
+        velocities[table, CUE_INDEX] = cue_velocity(angle, power)
+
+    batch = simulate_batch(positions, velocities, pocketed, max_frames)
+    results = []
+    for table in range(count):
+        first = int(batch['first_hit'][table])
+        results.append(ShotResult(
+            state=TableState(batch['positions'][table], batch['velocities'][table],
+                             batch['pocketed'][table], state.numbers),
+            pocketed=_pocket_order(batch['drop_frame'][table], state.numbers),
+            first_hit=state.numbers[first] if first >= 0 else None,
+            frames=int(batch['frames'][table])
+        ))
+    return results
+
+
+def remaining_balls(state: TableState) -> List[int]:
+    """Números das bolas ainda na mesa (sem a branca)"""
+    return [n for n, p in zip(state.numbers, state.pocketed) if not p and n != 0]
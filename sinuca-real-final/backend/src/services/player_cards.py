@@ -0,0 +1,128 @@
+"""
+Cartões de jogador em cache (LRU)
+
+O cartão `{id, username, name, skill_rating, rank}` aparece em quase toda
+listagem de jogos e apostas. Em vez de carregar a linha inteira de `users`
+para cada página, os cartões ficam num LRU limitado em memória e as
+faltas de uma página inteira são buscadas numa única consulta que lê só
+essas colunas (`get_cards`).
+
+Escritas que mudam nome ou rating (fim de partida, edição de perfil,
+recálculo de ratings) invalidam as entradas depois do commit. Cada
+processo tem o seu cache; com vários workers, o TTL limita por quanto
+tempo um cartão alterado em outro processo pode aparecer desatualizado.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_SIZE = int(os.getenv('PLAYER_CARD_CACHE_SIZE', 10000))
+CACHE_TTL = float(os.getenv('PLAYER_CARD_CACHE_TTL', 60))  # segundos
+
+
+class PlayerCardService:
+    """LRU de cartões de jogador com busca em lote"""
+
+    def __init__(self, max_size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cards = OrderedDict()  # user_id -> (expira em, cartão), do menos ao mais recente
+        self.generation = 0  # muda a cada invalidação
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_card(self, user_id):
+        """Cartão de um jogador (None se não existe)"""
+        if user_id is None:
+            return None
+        return self.get_cards([user_id]).get(user_id)
+
+    def get_cards(self, user_ids):
+        """
+        Cartões de vários jogadores, no máximo uma consulta (requer app context)
+
+        Returns:
+            Dicionário id -> cartão (ids inexistentes ficam de fora)
+        """
+        wanted = {user_id for user_id in user_ids if user_id is not None}
+        found = {}
+        now = time.monotonic()
+
+        with self._lock:
+            for user_id in wanted:
+                cached = self.cards.get(user_id)
+                if cached and cached[0] > now:
+                    self.cards.move_to_end(user_id)
+                    found[user_id] = cached[1]
+            missing = wanted - found.keys()
+            self.hits += len(found)
+            self.misses += len(missing)
+            generation = self.generation
+
+        if not missing:
+            return found
+
+        loaded = self._load(missing)
+        found.update(loaded)
+
+        with self._lock:
+            # Invalidação durante a consulta: o que foi lido pode estar velho
+            if generation == self.generation:
+                expires = now + self.ttl
+                for user_id, card in loaded.items():
+                    self.cards[user_id] = (expires, card)
+                    self.cards.move_to_end(user_id)
+                while len(self.cards) > self.max_size:
+                    self.cards.popitem(last=False)
+
+        return found
+
+    def _load(self, user_ids):
+        """Ler só as colunas do cartão dos jogadores que faltam"""
+        from src.models.database import db
+        from src.models.user import User
+
+        rows = db.session.query(User.id, User.username, User.name, User.skill_rating)\
+                         .filter(User.id.in_(user_ids)).all()
+        return {
+            row.id: {
+                'id': row.id,
+                'username': row.username,
+                'name': row.name,
+                'skill_rating': row.skill_rating,
+                'rank': User.rank_for(row.skill_rating)
+            }
+            for row in rows
+        }
+
+    def invalidate(self, *user_ids):
+        """Descartar cartões alterados (chamar depois do commit)"""
+        with self._lock:
+            self.generation += 1
+            for user_id in user_ids:
+                self.cards.pop(user_id, None)
+
+    def clear(self):
+        """Descartar todos os cartões (ex.: recálculo de ratings)"""
+        with self._lock:
+            self.generation += 1
+            self.cards.clear()
+
+    def stats(self):
+        """Tamanho e taxa de acerto do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self.cards),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
+
+
+# Instância global dos cartões de jogador
+player_cards = PlayerCardService()
@@ -0,0 +1,94 @@
+"""
+Consultas e projeções das listagens de jogos e apostas
+
+As listagens carregam só as linhas da página (com a aposta de cada jogo
+no mesmo SELECT) e os cartões dos jogadores vêm do cache de cartões
+(`player_cards`), buscados de uma vez para a página inteira. Nenhuma
+linha completa de `users` é carregada para mostrar cinco campos, e uma
+página de 50 jogos custa no máximo duas consultas, não 50+.
+"""
+
+from sqlalchemy.orm import joinedload
+
+from src.models.game import Game
+from src.services.player_cards import player_cards
+
+
+def player_card(user):
+    """Dados públicos do jogador exibidos em jogos e apostas (de um User carregado)"""
+    if not user:
+        return None
+    return {
+        'id': user.id,
+        'username': user.username,
+        'name': user.name,
+        'skill_rating': user.skill_rating,
+        'rank': user.rank
+    }
+
+
+def games_with_bet():
+    """Consulta de jogos com a aposta carregada junto"""
+    return Game.query.options(joinedload(Game.bet))
+
+
+def cards_for_games(games):
+    """Cartões dos jogadores e dos criadores das apostas de uma página de jogos"""
+    ids = set()
+    for game in games:
+        ids.update((game.player1_id, game.player2_id))
+        if game.bet_id and game.bet:
+            ids.add(game.bet.creator_id)
+    return player_cards.get_cards(ids)
+
+
+def cards_for_bets(bets):
+    """Cartões de criadores e oponentes de uma página de apostas"""
+    ids = set()
+    for bet in bets:
+        ids.update((bet.creator_id, bet.opponent_id))
+    return player_cards.get_cards(ids)
+
+
+def game_detail(game, debug=False, cards=None):
+    """Jogo com os dois jogadores e a aposta"""
+    if cards is None:
+        cards = cards_for_games([game])
+    data = game.to_dict(debug=debug)
+    if game.player1_id:
+        data['player1'] = cards.get(game.player1_id)
+    if game.player2_id:
+        data['player2'] = cards.get(game.player2_id)
+    if game.bet_id and game.bet:
+        data['bet'] = game.bet.to_dict(cards)
+    return data
+
+
+def game_for_player(game, user_id, cards):
+    """Jogo do ponto de vista de um jogador: oponente e resultado"""
+    data = game.to_dict()
+
+    opponent_id = game.player2_id if game.player1_id == user_id else game.player1_id
+    if opponent_id and opponent_id in cards:
+        data['opponent'] = cards[opponent_id]
+
+    if game.winner_id:
+        data['result'] = 'won' if game.winner_id == user_id else 'lost'
+    return data
+
+
+def open_game(game, cards):
+    """Jogo aguardando adversário, com o criador"""
+    data = game.to_dict()
+    if game.player1_id in cards:
+        data['creator'] = cards[game.player1_id]
+    return data
+
+
+def bet_for_player(bet, user_id, cards):
+    """Aposta do ponto de vista de um jogador: papel e oponente"""
+    data = bet.to_dict(cards)
+    data['user_role'] = 'creator' if bet.creator_id == user_id else 'opponent'
+    if bet.opponent_id in cards:
+        data['opponent'] = cards[bet.opponent_id]
+    return data
@@ -0,0 +1,243 @@
+"""
+Motor de rating Glicko-2
+
+Cada jogador tem rating (`User.skill_rating`), desvio (`rating_deviation`)
+e volatilidade (`rating_volatility`). Cada partida é um período de rating
+de um jogo, aplicado na liquidação (`Game.settle_players`).
+
+O recálculo em lote refaz o rating de todos a partir do histórico de
+partidas finalizadas. As partidas são agrupadas em ondas (uma partida
+entra na primeira onda depois das ondas dos seus dois jogadores); dentro
+de uma onda ninguém se repete, então a onda inteira é atualizada numa
+única operação vetorizada e o resultado é o mesmo de aplicar as partidas
+uma a uma, na ordem.
+"""
+
+import math
+import time
+
+import numpy as np
+
+INITIAL_RATING = 1200
+INITIAL_DEVIATION = 350.0
+INITIAL_VOLATILITY = 0.06
+TAU = 0.5  # restringe a variação da volatilidade
+GLICKO2_SCALE = 173.7178
+CONVERGENCE = 1e-6
+MAX_ITERATIONS = 100
+
+
+def glicko2_update(rating, deviation, volatility, opponent_rating, opponent_deviation,
+                   score, tau=TAU):
+    """
+    Atualizar jogadores após um período de rating (vetorizado)
+
+    Args:
+        rating, deviation, volatility: arrays com o estado dos jogadores
+        opponent_rating, opponent_deviation: arrays com o estado dos oponentes;
+            com uma dimensão a mais, as várias partidas de cada jogador no período
+        score: 1 vitória, 0 derrota, 0.5 empate (mesma forma dos oponentes)
+
+    Returns:
+        (rating, deviation, volatility) novos
+    """
+    mu = (np.asarray(rating, dtype=float) - INITIAL_RATING) / GLICKO2_SCALE
+    phi = np.asarray(deviation, dtype=float) / GLICKO2_SCALE
+    sigma = np.asarray(volatility, dtype=float)
+    mu_j = (np.asarray(opponent_rating, dtype=float) - INITIAL_RATING) / GLICKO2_SCALE
+    phi_j = np.asarray(opponent_deviation, dtype=float) / GLICKO2_SCALE
+    score = np.asarray(score, dtype=float)
+    if mu_j.ndim == mu.ndim:
+        # Uma partida por jogador
+        mu_j, phi_j, score = mu_j[..., None], phi_j[..., None], score[..., None]
+
+    g = 1 / np.sqrt(1 + 3 * phi_j ** 2 / math.pi ** 2)
+    expected = 1 / (1 + np.exp(-g * (mu[..., None] - mu_j)))
+    v = 1 / (g ** 2 * expected * (1 - expected)).sum(axis=-1)
+    improvement = (g * (score - expected)).sum(axis=-1)
+    delta = v * improvement
+
+    # Nova volatilidade: raiz de f pelo método de Illinois
+    a = np.log(sigma ** 2)
+    phi2 = phi ** 2
+    delta2 = delta ** 2
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (delta2 - phi2 - v - ex) / (2 * (phi2 + v + ex) ** 2) - (x - a) / tau ** 2
+
+    big = delta2 > phi2 + v
+    B = np.where(big, np.log(np.where(big, delta2 - phi2 - v, 1)), a - tau)
+    k = np.ones_like(a)
+    pending = ~big & (f(B) < 0)
+    while pending.any():
+        k = np.where(pending, k + 1, k)
+        B = np.where(pending, a - k * tau, B)
+        pending = pending & (f(B) < 0)
+
+    A = a
+    fA, fB = f(A), f(B)
+    for _ in range(MAX_ITERATIONS):
+        active = np.abs(B - A) > CONVERGENCE
+        if not active.any():
+            break
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        swap = fC * fB <= 0
+        A = np.where(active & swap, B, A)
+        fA = np.where(active & swap, fB, np.where(active, fA / 2, fA))
+        B = np.where(active, C, B)
+        fB = np.where(active, fC, fB)
+
+    new_sigma = np.exp(A / 2)
+    phi_star = np.sqrt(phi2 + new_sigma ** 2)
+    new_phi = 1 / np.sqrt(1 / phi_star ** 2 + 1 / v)
+    new_mu = mu + new_phi ** 2 * improvement
+
+    new_deviation = np.minimum(new_phi * GLICKO2_SCALE, INITIAL_DEVIATION)
+    return new_mu * GLICKO2_SCALE + INITIAL_RATING, new_deviation, new_sigma
+
+
+def assign_waves(player1, player2):
+    """Onda de cada partida: 1 + a última onda de qualquer dos dois jogadores"""
+    last_wave = {}
+    waves = np.empty(len(player1), dtype=np.int64)
+    for index, (p1, p2) in enumerate(zip(player1.tolist(), player2.tolist())):
+        wave = max(last_wave.get(p1, -1), last_wave.get(p2, -1)) + 1
+        last_wave[p1] = last_wave[p2] = wave
+        waves[index] = wave
+    return waves
+
+
+def recompute(player1, player2, score1, tau=TAU):
+    """
+    Recalcular os ratings a partir do histórico completo (em ordem)
+
+    Args:
+        player1, player2: ids dos jogadores de cada partida
+        score1: resultado do jogador 1 em cada partida (1, 0 ou 0.5)
+
+    Returns:
+        (ids, rating, desvio, volatilidade) por jogador
+    """
+    player1 = np.asarray(player1, dtype=np.int64)
+    player2 = np.asarray(player2, dtype=np.int64)
+    score1 = np.asarray(score1, dtype=float)
+
+    ids, index = np.unique(np.concatenate([player1, player2]), return_inverse=True)
+    index1, index2 = index[:len(player1)], index[len(player1):]
+
+    rating = np.full(len(ids), float(INITIAL_RATING))
+    deviation = np.full(len(ids), INITIAL_DEVIATION)
+    volatility = np.full(len(ids), INITIAL_VOLATILITY)
+
+    waves = assign_waves(index1, index2)
+    order = np.argsort(waves, kind='stable')
+    bounds = np.flatnonzero(np.diff(waves[order])) + 1
+
+    for games in np.split(order, bounds):
+        # Os dois lados de todas as partidas da onda de uma vez
+        players = np.concatenate([index1[games], index2[games]])
+        opponents = np.concatenate([index2[games], index1[games]])
+        scores = np.concatenate([score1[games], 1 - score1[games]])
+
+        new = glicko2_update(rating[players], deviation[players], volatility[players],
+                             rating[opponents], deviation[opponents], scores, tau)
+        rating[players], deviation[players], volatility[players] = new
+
+    return ids, rating, deviation, volatility
+
+
+class RatingEngine:
+    """Aplicação do Glicko-2 na liquidação e recálculo em lote"""
+
+    def __init__(self, tau=TAU):
+        self.tau = tau
+
+    def apply_result(self, player1, player2, winner_id):
+        """Atualizar os dois jogadores (objetos User) após uma partida"""
+        score1 = 1.0 if winner_id == player1.id else 0.0 if winner_id == player2.id else 0.5
+        states = [
+            (p.skill_rating, p.rating_deviation or INITIAL_DEVIATION,
+             p.rating_volatility or INITIAL_VOLATILITY)
+            for p in (player1, player2)
+        ]
+        (r1, d1, v1), (r2, d2, v2) = states
+
+        rating, deviation, volatility = glicko2_update(
+            [r1, r2], [d1, d2], [v1, v2], [r2, r1], [d2, d1], [score1, 1 - score1], self.tau
+        )
+        for i, player in enumerate((player1, player2)):
+            player.skill_rating = int(round(rating[i]))
+            player.rating_deviation = float(deviation[i])
+            player.rating_volatility = float(volatility[i])
+
+    def recompute_all(self):
+        """
+        Recalcular o rating de todos os usuários pelo histórico de partidas
+        finalizadas (requer app context)
+
+        Returns:
+            (usuários atualizados, partidas processadas)
+        """
+        from src.models.database import db
+        from src.models.game import Game
+        from src.models.user import User
+
+        rows = db.session.query(Game.player1_id, Game.player2_id, Game.winner_id)\
+                         .filter(Game.status == 'finished')\
+                         .filter(Game.player2_id.isnot(None))\
+                         .order_by(Game.finished_at.asc(), Game.id.asc()).all()
+
+        updates = [
+            {'id': user_id, 'skill_rating': INITIAL_RATING,
+             'rating_deviation': INITIAL_DEVIATION, 'rating_volatility': INITIAL_VOLATILITY}
+            for (user_id,) in db.session.query(User.id).all()
+        ]
+
+        if rows:
+            player1, player2, winner = (np.array(column, dtype=np.int64)
+                                        for column in zip(*[(p1, p2, w or 0) for p1, p2, w in rows]))
+            score1 = np.where(winner == player1, 1.0, np.where(winner == player2, 0.0, 0.5))
+            ids, rating, deviation, volatility = recompute(player1, player2, score1, self.tau)
+
+            position = {user_id: i for i, user_id in enumerate(ids.tolist())}
+            for update in updates:
+                i = position.get(update['id'])
+                if i is not None:
+                    update['skill_rating'] = int(round(rating[i]))
+                    update['rating_deviation'] = float(deviation[i])
+                    update['rating_volatility'] = float(volatility[i])
+
+        if updates:
+            db.session.execute(db.update(User), updates)
+        db.session.commit()
+
+        from src.services.bet_book import bet_book
+        from src.services.player_cards import player_cards
+        player_cards.clear()
+        bet_book.clear()
+        return len(updates), len(rows)
+
+    def benchmark(self, games=1_000_000, players=50_000, seed=0):
+        """Medir o recálculo em lote sobre um histórico sintético"""
+        rng = np.random.default_rng(seed)
+        player1 = rng.integers(0, players, games)
+        player2 = (player1 + rng.integers(1, players, games)) % players
+        score1 = rng.integers(0, 2, games).astype(float)
+
+        started = time.perf_counter()
+        recompute(player1, player2, score1, self.tau)
+        return time.perf_counter() - started
+
+
+# Instância global do motor de rating
+rating_engine = RatingEngine()
+
+
+if __name__ == '__main__':
+    from src.main import app
+
+    with app.app_context():
+        users, games = rating_engine.recompute_all()
+    print(f"✅ Ratings recalculados: {users} usuários, {games} partidas")
@@ -0,0 +1,167 @@
+"""
+Verificador de replays de partidas
+
+Toda partida grava um histórico compacto de tacadas em `Game.shot_log`
+([player_id, ângulo, força, cue_x, cue_y] por tacada, ver table_codec). O
+verificador refaz a partida do zero com as mesmas regras e a mesma física
+do servidor e confirma o vencedor antes da liquidação da aposta.
+
+O replay é determinístico: a mesa inicial é fixa, não há sorteio, as
+entradas são gravadas já arredondadas e a mesa é arredondada após cada
+tacada exatamente como é salva.
+"""
+
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from src.services.match_rules import MatchState
+from src.services.shot_simulator import shot_simulator
+
+# Meta de vazão do replay (partidas por segundo por núcleo)
+REPLAY_TARGET_PER_SECOND = 20
+VERIFY_BATCH_SIZE = 200
+
+
+def replay(player1_id, player2_id, shots) -> Tuple[Optional[MatchState], str]:
+    """
+    Refazer uma partida a partir do histórico de tacadas
+
+    Returns:
+        (estado final, mensagem); estado é None se alguma tacada for inválida
+    """
+    match = MatchState(player1_id, player2_id)
+    for number, (player_id, angle, power, cue_x, cue_y) in enumerate(shots or [], 1):
+        valid, message = match.validate_shot(player_id, (cue_x, cue_y))
+        if not valid:
+            return None, f"Tacada {number} inválida: {message}"
+        match.apply_shot(player_id, angle, power, (cue_x, cue_y))
+    return match, "OK"
+
+
+def verify_result(player1_id, player2_id, shots, winner_id):
+    """Confirmar o vencedor informado contra o replay do histórico"""
+    match, message = replay(player1_id, player2_id, shots)
+    if match is None:
+        return False, message
+
+    if match.winner_id is None:
+        return False, "Histórico de tacadas não termina a partida"
+
+    if match.winner_id != winner_id:
+        return False, "Vencedor não confere com o histórico de tacadas"
+
+    return True, "Vencedor confirmado"
+
+
+def _verify_chunk(jobs):
+    """Executado no worker: verifica um bloco de partidas"""
+    return [
+        (game_id, *verify_result(player1_id, player2_id, shots, winner_id))
+        for game_id, player1_id, player2_id, shots, winner_id in jobs
+    ]
+
+
+class ReplayVerifier:
+    """Verificação de partidas, individual ou em lote"""
+
+    def verify_game(self, game, winner_id):
+        """Verificar uma partida antes de finalizá-la"""
+        return verify_result(game.player1_id, game.player2_id, game.load_shots(), winner_id)
+
+    def verify_many(self, jobs: Sequence[tuple]) -> List[tuple]:
+        """
+        Verificar várias partidas em paralelo
+
+        Args:
+            jobs: Lista de (game_id, player1_id, player2_id, shots, winner_id)
+
+        Returns:
+            Lista de (game_id, confirmado, mensagem), na mesma ordem
+        """
+        jobs = list(jobs)
+        workers = shot_simulator.workers
+        if workers == 1 or len(jobs) < 2:
+            return _verify_chunk(jobs)
+
+        chunk_size = -(-len(jobs) // workers)
+        futures = [
+            shot_simulator.executor.submit(_verify_chunk, jobs[i:i + chunk_size])
+            for i in range(0, len(jobs), chunk_size)
+        ]
+
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def verify_finished_games(self, after_id=0, limit=VERIFY_BATCH_SIZE):
+        """
+        Verificar em lote partidas finalizadas com aposta (requer app context)
+
+        Grava o resultado em game_data['verification'].
+
+        Returns:
+            (relatórios, último id processado) para continuar do ponto
+        """
+        from src.models.database import db
+        from src.models.game import Game
+
+        games = Game.query.filter(Game.status == 'finished')\
+                          .filter(Game.bet_id.isnot(None))\
+                          .filter(Game.id > after_id)\
+                          .order_by(Game.id.asc())\
+                          .limit(limit).all()
+        if not games:
+            return [], after_id
+
+        pending = {}
+        for game in games:
+            data = game.game_data_dict
+            if 'verification' not in data:
+                pending[game.id] = (game, data)
+
+        jobs = [
+            (game.id, game.player1_id, game.player2_id, game.load_shots(), game.winner_id)
+            for game, data in pending.values()
+        ]
+
+        reports = []
+        for game_id, verified, message in self.verify_many(jobs):
+            game, data = pending[game_id]
+            data['verification'] = {'verified': verified, 'message': message}
+            game.update_game_data(data)
+            reports.append({'game_id': game_id, 'verified': verified, 'message': message})
+
+        db.session.commit()
+        return reports, games[-1].id
+
+    def benchmark(self, shots, player1_id=1, player2_id=2, replays=20):
+        """Medir replays por segundo (um núcleo) para um histórico"""
+        started = time.perf_counter()
+        for _ in range(replays):
+            replay(player1_id, player2_id, shots)
+        elapsed = time.perf_counter() - started
+        return replays / elapsed if elapsed else float('inf')
+
+
+# Instância global do verificador
+replay_verifier = ReplayVerifier()
+
+
+def run_worker(app, interval=30):
+    """Loop do worker que verifica partidas finalizadas em lote"""
+    last_id = 0
+    while True:
+        previous_id = last_id
+        with app.app_context():
+            reports, last_id = replay_verifier.verify_finished_games(after_id=last_id)
+        for report in reports:
+            if not report['verified']:
+                print(f"⚠️ Partida {report['game_id']} não confere: {report['message']}")
+        if last_id == previous_id:
+            time.sleep(interval)
+
+
+if __name__ == '__main__':
+    from src.main import app
+    run_worker(app)
@@ -0,0 +1,248 @@
+"""
+Liquidação em lote dos jogos finalizados
+
+`Game.finish_game` grava só o resultado e uma linha `Settlement`
+pendente, no mesmo commit; a requisição volta sem esperar estatísticas,
+rating, conquistas e prêmio. Uma thread de fundo pega as pendentes em
+lotes de até BATCH_SIZE, em ordem de id, e liquida o lote numa única
+transação:
+
+- jogadores e apostas do lote são travados de uma vez (em ordem de id);
+- cada jogo é aplicado em memória, na ordem em que terminou;
+- os prêmios viram um único `ledger.post_many` (um UPDATE de créditos);
+- as estatísticas dos jogadores vão num UPDATE em lote por id;
+- as linhas do lote passam a `settled` com UPDATE condicional a
+  `pending`: se outro worker liquidou alguma antes, o lote é desfeito.
+
+Só apostas ainda `matched` são pagas, então refazer um jogo nunca paga
+duas vezes. Se o lote falha, cada jogo é refeito sozinho; o que falhar
+MAX_ATTEMPTS vezes fica `failed` com o erro, para análise manual.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.models.database import db, on_commit, unit_of_work
+
+BATCH_SIZE = 200  # jogos por transação
+INTERVAL = 5.0  # segundos entre verificações sem eventos
+MAX_ATTEMPTS = 5  # tentativas antes de marcar a liquidação como falha
+
+# Colunas do jogador alteradas na liquidação (UPDATE em lote)
+STAT_COLUMNS = ('games_played', 'games_won', 'experience', 'level', 'achievements',
+                'skill_rating', 'rating_deviation', 'rating_volatility', 'total_winnings')
+
+
+class StaleSettlement(RuntimeError):
+    """Linha do lote liquidada por outro worker"""
+
+
+class SettlementWorker:
+    """Fila durável de liquidações aplicada em lotes"""
+
+    def __init__(self, batch_size=BATCH_SIZE, interval=INTERVAL):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.batches = 0
+        self.settled = 0
+        self.last_batch_ms = 0.0
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def wake(self):
+        """Avisar que há liquidação nova (chamado depois do commit)"""
+        self._wakeup.set()
+
+    def settle_pending(self, limit=None):
+        """
+        Liquidar o próximo lote de jogos pendentes (requer app context)
+
+        Returns:
+            Número de jogos liquidados
+        """
+        from src.models.settlement import Settlement
+
+        limit = limit or self.batch_size
+        started = time.perf_counter()
+        pending = []
+        try:
+            with unit_of_work():
+                pending = Settlement.query.filter_by(status='pending')\
+                                          .order_by(Settlement.id)\
+                                          .limit(limit)\
+                                          .with_for_update(skip_locked=True)\
+                                          .all()
+                if not pending:
+                    return 0
+                self._settle(pending)
+        except Exception:
+            db.session.rollback()
+            if not pending:
+                raise
+            if len(pending) == 1:
+                self._record_failure(pending[0].id)
+                return 0
+            return sum(self._settle_alone(settlement_id)
+                       for settlement_id in [settlement.id for settlement in pending])
+
+        self.batches += 1
+        self.settled += len(pending)
+        self.last_batch_ms = (time.perf_counter() - started) * 1000
+        return len(pending)
+
+    def _settle_alone(self, settlement_id):
+        """Refazer um jogo do lote que falhou na sua própria transação"""
+        from src.models.settlement import Settlement
+
+        try:
+            with unit_of_work():
+                settlement = Settlement.query.filter_by(id=settlement_id, status='pending')\
+                                             .with_for_update()\
+                                             .first()
+                if not settlement:
+                    return 0
+                self._settle([settlement])
+        except Exception:
+            db.session.rollback()
+            self._record_failure(settlement_id)
+            return 0
+
+        self.settled += 1
+        return 1
+
+    def _record_failure(self, settlement_id):
+        """Contar a tentativa e guardar o erro (falha após MAX_ATTEMPTS)"""
+        import traceback
+        from src.models.settlement import Settlement
+
+        error = traceback.format_exc(limit=5)
+        with unit_of_work():
+            settlement = db.session.get(Settlement, settlement_id)
+            if settlement and settlement.status == 'pending':
+                settlement.attempts = (settlement.attempts or 0) + 1
+                settlement.last_error = error
+                if settlement.attempts >= MAX_ATTEMPTS:
+                    settlement.status = 'failed'
+        print(f"⚠️ Erro na liquidação {settlement_id}: {error.strip().splitlines()[-1]}")
+
+    def _settle(self, pending):
+        """Aplicar as liquidações na transação atual"""
+        from src.models.user import User
+        from src.models.game import Game, Bet
+        from src.models.settlement import Settlement
+        from src.services.ledger import ledger
+
+        games = {game.id: game for game in
+                 Game.query.filter(Game.id.in_([s.game_id for s in pending])).all()}
+
+        player_ids = {player_id for game in games.values()
+                      for player_id in (game.player1_id, game.player2_id) if player_id}
+        players = User.lock_many(player_ids)
+
+        bet_ids = [game.bet_id for game in games.values() if game.bet_id]
+        bets = {}
+        if bet_ids:
+            bets = {bet.id: bet for bet in
+                    Bet.query.filter(Bet.id.in_(bet_ids))
+                             .order_by(Bet.id)
+                             .with_for_update()
+                             .populate_existing()
+                             .all()}
+
+        entries = []
+        for settlement in pending:
+            game = games[settlement.game_id]
+            game.settle_players(players)
+
+            bet = bets.get(game.bet_id)
+            winner = players.get(game.winner_id)
+            if bet and winner and bet.status == 'matched':
+                entries.extend(bet.payout(winner))
+
+        # Estatísticas antes dos prêmios: o flush do livro-razão não as grava linha a linha
+        self._update_players(players.values())
+        if entries:
+            ledger.post_many(entries)
+
+        settled_at = datetime.utcnow()
+        ids = [settlement.id for settlement in pending]
+        statement = db.update(Settlement)\
+                      .where(Settlement.id.in_(ids))\
+                      .where(Settlement.status == 'pending')\
+                      .values(status='settled', settled_at=settled_at,
+                              attempts=db.func.coalesce(Settlement.attempts, 0) + 1)\
+                      .execution_options(synchronize_session=False)
+        if db.session.execute(statement).rowcount != len(ids):
+            raise StaleSettlement(ids)
+        for settlement in pending:
+            set_committed_value(settlement, 'status', 'settled')
+            set_committed_value(settlement, 'settled_at', settled_at)
+
+        from src.services.bet_book import bet_book
+        from src.services.player_cards import player_cards
+        from src.services.projections import player_card
+
+        # Rating novo nas apostas abertas dos jogadores (cartões montados antes do commit)
+        cards = {player.id: dict(player_card(player), level=player.level) for player in players.values()}
+        on_commit(lambda: player_cards.invalidate(*player_ids))
+        on_commit(lambda: bet_book.update_creators(cards))
+
+    def _update_players(self, players):
+        """Estatísticas dos jogadores num UPDATE em lote por id"""
+        from src.models.user import User
+
+        updates = []
+        for player in players:
+            update = {'id': player.id}
+            for column in STAT_COLUMNS:
+                update[column] = getattr(player, column)
+                set_committed_value(player, column, update[column])
+            updates.append(update)
+        if updates:
+            db.session.execute(db.update(User), updates)
+
+    def stats(self):
+        """Fila pendente, atraso da mais antiga e lotes aplicados (requer app context)"""
+        from src.models.settlement import Settlement
+
+        counts = dict(db.session.query(Settlement.status, db.func.count(Settlement.id))
+                                .group_by(Settlement.status).all())
+        oldest = db.session.query(db.func.min(Settlement.created_at))\
+                           .filter(Settlement.status == 'pending').scalar()
+        return {
+            'running': self._thread is not None,
+            'pending': counts.get('pending', 0),
+            'failed': counts.get('failed', 0),
+            'settled': counts.get('settled', 0),
+            'lag_seconds': round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else 0.0,
+            'batches': self.batches,
+            'last_batch_ms': round(self.last_batch_ms, 2)
+        }
+
+    def run(self, app):
+        """Loop do worker: lotes enquanto houver fila, depois espera"""
+        while True:
+            with app.app_context():
+                try:
+                    while self.settle_pending() >= self.batch_size:
+                        pass
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"⚠️ Erro no worker de liquidação: {str(e)}")
+
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def start(self, app):
+        """Iniciar o worker em uma thread de fundo (retoma as pendentes)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, args=(app,), daemon=True)
+            self._thread.start()
+        return self._thread
+
+
+# Instância global do worker de liquidação
+settlement_worker = SettlementWorker()
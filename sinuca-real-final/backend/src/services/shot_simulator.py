@@ -0,0 +1,112 @@
+"""
+Simulação em lote de tacadas candidatas
+
+Distribui centenas de (ângulo, força) sobre a mesma mesa entre processos,
+um bloco de tacadas por worker, para escalar com os núcleos da máquina em
+vez de rodar uma tacada por vez sob o GIL. Base para dicas de tacada e bots.
+
+Processos criados com fork depois que o app já tem threads (gravação em
+lote, matchmaking, liquidação...) herdariam locks travados por elas. Por
+isso o app chama `start()` no início, ainda com uma única thread, e os
+workers são criados ali mesmo com fork; se o pool for criado depois (sob
+demanda), usa forkserver (ou spawn), que não copia o processo atual.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from src.services.physics_engine import (
+    DEFAULT_SOLVER, ShotResult, TableState, simulate_shot, simulate_shots
+)
+
+MAX_SHOTS = 500
+MIN_PARALLEL_SHOTS = 32  # abaixo disso o custo de IPC não compensa
+
+
+def _simulate_chunk(positions, pocketed, numbers, shots, mode):
+    """Executado no worker: simula um bloco de tacadas sobre a mesma mesa"""
+    state = TableState(positions, pocketed=pocketed, numbers=numbers)
+    if mode == 'fixed':
+        # Passo fixo: o bloco inteiro numa única chamada vetorizada
+        return simulate_shots(state, shots)
+    return [simulate_shot(state, angle, power, mode=mode) for angle, power in shots]
+
+
+class ShotSimulator:
+    """Pool de processos para simulação de tacadas em paralelo"""
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or int(os.getenv('SIMULATION_WORKERS', 0)) or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _create(self):
+        """Pool com fork só enquanto o processo tem uma única thread"""
+        methods = multiprocessing.get_all_start_methods()
+        if threading.active_count() == 1 and 'fork' in methods:
+            method = 'fork'
+        else:
+            method = 'forkserver' if 'forkserver' in methods else 'spawn'
+        return ProcessPoolExecutor(max_workers=self.workers,
+                                   mp_context=multiprocessing.get_context(method))
+
+    def start(self):
+        """
+        Criar o pool e os processos agora (no início do app, antes de
+        qualquer thread); com fork todos os workers sobem na primeira tarefa
+        """
+        executor = self.executor
+        executor.submit(int).result()
+        return executor
+
+    @property
+    def executor(self):
+        """Pool de processos (criado sob demanda se `start()` não foi chamado)"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = self._create()
+        return self._executor
+
+    def simulate(self, state: TableState, shots: Sequence[Tuple[float, float]],
+                 mode: str = DEFAULT_SOLVER) -> List[ShotResult]:
+        """
+        Simular várias tacadas a partir do mesmo estado de mesa
+
+        Args:
+            state: Estado da mesa antes das tacadas
+            shots: Lista de (ângulo em radianos, força 0-100)
+            mode: Resolvedor de física ('event' ou 'fixed')
+
+        Returns:
+            Lista de ShotResult, na mesma ordem de `shots`
+        """
+        shots = [(float(angle), float(power)) for angle, power in shots]
+        if len(shots) < MIN_PARALLEL_SHOTS or self.workers == 1:
+            return _simulate_chunk(state.positions, state.pocketed, state.numbers, shots, mode)
+
+        chunk_size = -(-len(shots) // self.workers)
+        futures = [
+            self.executor.submit(_simulate_chunk, state.positions, state.pocketed,
+                                 state.numbers, shots[i:i + chunk_size], mode)
+            for i in range(0, len(shots), chunk_size)
+        ]
+
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def shutdown(self):
+        """Encerrar o pool de processos"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+# Instância global do simulador
+shot_simulator = ShotSimulator()
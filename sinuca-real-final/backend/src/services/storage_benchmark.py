@@ -0,0 +1,152 @@
+"""
+Benchmark de armazenamento do SQLite: modo padrão x modo produção
+
+Roda a mesma carga mista (listagem de apostas abertas, perfil e
+movimentações de saldo) em threads concorrentes contra um arquivo SQLite
+novo em cada modo e mede vazão, latência e erros de "database is locked".
+
+No modo padrão (journal de rollback) cada commit trava o arquivo inteiro e
+bloqueia os leitores; no modo produção (`init_database(production=True)`)
+o WAL deixa as leituras seguirem durante as gravações e o escritor único
+enfileira as gravações no pool em vez de disputar o lock.
+
+Uso: python -m src.services.storage_benchmark [threads] [segundos]
+"""
+
+import os
+import random
+import tempfile
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from src.models.database import db, init_database
+
+USERS = 200
+OPEN_BETS = 500
+WRITE_RATIO = 0.2
+
+
+def _create_app(path, production):
+    from src.models.user import User
+    from src.models.game import Bet
+    from src.models.tournament import Tournament  # registra a tabela da FK de games
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    init_database(app, production=production)
+
+    with app.app_context():
+        db.create_all()
+        users = [
+            User(email=f'bench{i}@exemplo.com', username=f'bench{i}', name=f'Bench {i}',
+                 password_hash='x', balance=1000)
+            for i in range(USERS)
+        ]
+        db.session.add_all(users)
+        db.session.flush()
+
+        fees = Bet.calculate_fees(10)
+        db.session.add_all([
+            Bet(creator_id=users[i % USERS].id, amount=fees['amount'], platform_fee=fees['platform_fee'],
+                total_prize=fees['total_prize'], status='open')
+            for i in range(OPEN_BETS)
+        ])
+        db.session.commit()
+    return app
+
+
+def _worker(app, deadline, seed, stats, lock):
+    from src.models.user import User
+    from sqlalchemy.orm import joinedload
+    from src.services.projections import player_card
+    from src.models.game import Bet
+
+    rng = random.Random(seed)
+    local = {'reads': 0, 'writes': 0, 'errors': 0, 'read_latency': [], 'write_latency': []}
+
+    while time.perf_counter() < deadline:
+        with app.app_context():
+            started = time.perf_counter()
+            try:
+                if rng.random() < WRITE_RATIO:
+                    user = db.session.get(User, rng.randint(1, USERS))
+                    user.update_balance(rng.choice((-1, 1)), 'benchmark')
+                    local['writes'] += 1
+                    local['write_latency'].append(time.perf_counter() - started)
+                else:
+                    # Leitura sempre no banco (sem o cache de cartões)
+                    bets = Bet.query.options(joinedload(Bet.creator))\
+                                    .filter(Bet.status == 'open')\
+                                    .order_by(Bet.created_at.desc()).limit(20).all()
+                    [player_card(bet.creator) for bet in bets]
+                    player_card(db.session.get(User, rng.randint(1, USERS)))
+                    local['reads'] += 1
+                    local['read_latency'].append(time.perf_counter() - started)
+            except OperationalError:
+                db.session.rollback()
+                local['errors'] += 1
+
+    with lock:
+        for key, value in local.items():
+            stats[key] += value
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_load(production, threads=8, seconds=5.0):
+    """Carga mista em `threads` threads por `seconds` segundos num banco novo"""
+    directory = tempfile.mkdtemp(prefix='sinuca_bench_')
+    app = _create_app(os.path.join(directory, 'bench.db'), production)
+
+    stats = {'reads': 0, 'writes': 0, 'errors': 0, 'read_latency': [], 'write_latency': []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    workers = [
+        threading.Thread(target=_worker, args=(app, deadline, seed, stats, lock))
+        for seed in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+    return {
+        'mode': 'produção' if production else 'padrão',
+        'ops_per_second': (stats['reads'] + stats['writes']) / seconds,
+        'reads': stats['reads'],
+        'writes': stats['writes'],
+        'errors': stats['errors'],
+        'read_p99_ms': _percentile(stats['read_latency'], 0.99) * 1000,
+        'write_p99_ms': _percentile(stats['write_latency'], 0.99) * 1000,
+    }
+
+
+def benchmark(threads=8, seconds=5.0):
+    """Mesma carga nos dois modos (antes e depois)"""
+    return [run_load(False, threads, seconds), run_load(True, threads, seconds)]
+
+
+if __name__ == '__main__':
+    import sys
+
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+
+    print(f"{'modo':<10} {'ops/s':>8} {'leituras':>9} {'gravações':>10} {'erros':>6} {'p99 leit.':>10} {'p99 grav.':>10}")
+    for result in benchmark(threads, seconds):
+        print(f"{result['mode']:<10} {result['ops_per_second']:>8.0f} {result['reads']:>9} "
+              f"{result['writes']:>10} {result['errors']:>6} "
+              f"{result['read_p99_ms']:>8.1f}ms {result['write_p99_ms']:>8.1f}ms")
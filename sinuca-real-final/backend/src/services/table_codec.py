@@ -0,0 +1,107 @@
+"""
+Codificação binária compacta da mesa e do histórico de tacadas
+
+Formato da mesa (versão 1, little-endian):
+    B   versão
+    B   número de bolas
+    H   bitmask das bolas encaçapadas (bit i = bola no índice i)
+    2H  por bola: x, y em ponto fixo (1/64 px)
+
+16 bolas ocupam 68 bytes (contra ~1 KB em JSON), e decodificar é um
+único `np.frombuffer`. As posições em 1/64 px são exatas em float64, então
+codificar e decodificar não introduz erro: é também a quantização usada
+pelas regras para manter os replays determinísticos.
+
+Formato do histórico de tacadas: 1 byte de versão seguido de registros
+fixos de 11 bytes (jogador 0/1, ângulo em µrad, força em centésimos,
+posição da branca em 1/64 px). Novas tacadas são apenas concatenadas.
+"""
+
+import struct
+
+import numpy as np
+
+from src.services.physics_engine import BALL_NUMBERS, TableState
+
+FORMAT_VERSION = 1
+POSITION_SCALE = 64
+ANGLE_SCALE = 1_000_000
+POWER_SCALE = 100
+
+_TABLE_HEADER = struct.Struct('<BBH')
+_SHOT = struct.Struct('<BiHHH')
+
+
+def quantize_position(value):
+    """Arredondar coordenada para a resolução do formato (1/64 px)"""
+    return round(float(value) * POSITION_SCALE) / POSITION_SCALE
+
+
+def quantize_angle(value):
+    return round(float(value) * ANGLE_SCALE) / ANGLE_SCALE
+
+
+def quantize_power(value):
+    return round(float(value) * POWER_SCALE) / POWER_SCALE
+
+
+def encode_table(state: TableState) -> bytes:
+    """Codificar o estado (em repouso) da mesa"""
+    if state.numbers != BALL_NUMBERS:
+        raise ValueError('Formato binário requer o conjunto padrão de bolas')
+
+    mask = 0
+    for index, pocketed in enumerate(state.pocketed.tolist()):
+        if pocketed:
+            mask |= 1 << index
+
+    header = _TABLE_HEADER.pack(FORMAT_VERSION, len(state.numbers), mask)
+    fixed = np.rint(state.positions * POSITION_SCALE).astype('<u2')
+    return header + fixed.tobytes()
+
+
+def decode_table(blob: bytes) -> TableState:
+    """Decodificar a mesa gravada por `encode_table`"""
+    version, count, mask = _TABLE_HEADER.unpack_from(blob)
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Versão de formato desconhecida: {version}')
+
+    fixed = np.frombuffer(blob, dtype='<u2', count=count * 2, offset=_TABLE_HEADER.size)
+    positions = fixed.reshape(count, 2) / POSITION_SCALE
+    pocketed = [(mask >> index) & 1 == 1 for index in range(count)]
+    return TableState(positions, pocketed=pocketed)
+
+
+def encode_shot(shot, player1_id, player2_id) -> bytes:
+    """Codificar uma tacada [player_id, ângulo, força, cue_x, cue_y]"""
+    player_id, angle, power, cue_x, cue_y = shot
+    if player_id not in (player1_id, player2_id):
+        raise ValueError('Jogador não pertence à partida')
+
+    return _SHOT.pack(
+        0 if player_id == player1_id else 1,
+        round(angle * ANGLE_SCALE),
+        round(power * POWER_SCALE),
+        round(cue_x * POSITION_SCALE),
+        round(cue_y * POSITION_SCALE)
+    )
+
+
+def append_shot(log: bytes, shot, player1_id, player2_id) -> bytes:
+    """Acrescentar uma tacada ao histórico (cria o cabeçalho se vazio)"""
+    return (log or bytes([FORMAT_VERSION])) + encode_shot(shot, player1_id, player2_id)
+
+
+def decode_shots(log: bytes, player1_id, player2_id):
+    """Decodificar o histórico em [player_id, ângulo, força, cue_x, cue_y]"""
+    if not log:
+        return []
+    if log[0] != FORMAT_VERSION:
+        raise ValueError(f'Versão de formato desconhecida: {log[0]}')
+
+    players = (player1_id, player2_id)
+    return [
+        [players[slot], angle / ANGLE_SCALE, power / POWER_SCALE,
+         cue_x / POSITION_SCALE, cue_y / POSITION_SCALE]
+        for slot, angle, power, cue_x, cue_y in _SHOT.iter_unpack(log[1:])
+    ]
@@ -0,0 +1,398 @@
+"""
+Motor de chaves de torneio (eliminação simples e dupla)
+
+No início do torneio os inscritos são semeados por skill_rating e a chave
+inteira é criada de uma vez: cada `TournamentMatch` sabe para onde vão o
+vencedor e (na eliminação dupla) o perdedor. Um resultado toca só o nó do
+jogo e os nós para onde os jogadores seguem; quando um nó fica com as duas
+vagas definidas, o jogo da próxima fase é criado e iniciado.
+
+Os resultados chegam por `report_result` (chamado em `Game.finish_game`)
+e são processados em lote por uma thread de fundo, que também inicia os
+torneios no horário marcado. O banco é a fonte da verdade: ao iniciar, e
+após uma falha, os nós com jogo já finalizado são reprocessados.
+"""
+
+import heapq
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+MIN_PLAYERS = 2
+BRACKET_SIZES = (4, 8, 16, 32, 64, 128)
+MAX_BATCH = 500  # resultados processados por commit
+IDLE_WAIT = 5.0  # segundos entre verificações sem eventos
+
+
+def seed_order(size):
+    """Posições das sementes na primeira fase: 1 x size, depois os cruzamentos padrão"""
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [seed for s in order for seed in (s, total - s)]
+    return order
+
+
+def bracket_size(players):
+    """Menor potência de 2 (no mínimo 4) que comporta os jogadores"""
+    size = 4
+    while size < players:
+        size *= 2
+    return size
+
+
+def naive_utc(value):
+    """Data em UTC sem fuso, como o banco e o agendador comparam (com fuso é convertida)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class Batch:
+    """Alterações acumuladas num lote: jogos a iniciar e jogadores eliminados"""
+
+    def __init__(self):
+        self.games = []
+        self.eliminated = []  # (tournament_id, user_id)
+
+
+class TournamentEngine:
+    """Chaves de torneio avançadas por eventos"""
+
+    def __init__(self):
+        self.results = queue.Queue()  # (game_id, winner_id)
+        self.schedule = []  # heap de (starts_at, tournament_id)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._needs_recovery = True
+        self._thread = None
+
+    # Agenda
+
+    def schedule_start(self, tournament):
+        """Agendar o início automático do torneio"""
+        with self._lock:
+            heapq.heappush(self.schedule, (naive_utc(tournament.starts_at), tournament.id))
+        self._wakeup.set()
+
+    def load_schedule(self):
+        """Carregar os torneios com inscrições abertas (requer app context)"""
+        from src.models.tournament import Tournament
+
+        pending = Tournament.query.filter_by(status='registration').all()
+        with self._lock:
+            self.schedule = [(t.starts_at, t.id) for t in pending]
+            heapq.heapify(self.schedule)
+
+    def _due(self, now):
+        due = []
+        with self._lock:
+            while self.schedule and self.schedule[0][0] <= now:
+                due.append(heapq.heappop(self.schedule)[1])
+        return due
+
+    def _next_timeout(self):
+        with self._lock:
+            if not self.schedule:
+                return IDLE_WAIT
+            wait = (self.schedule[0][0] - datetime.utcnow()).total_seconds()
+        return min(IDLE_WAIT, max(0.0, wait))
+
+    # Chave
+
+    def start_tournament(self, tournament):
+        """
+        Semear os inscritos e criar a chave (requer app context)
+
+        Returns:
+            (sucesso, mensagem)
+        """
+        from src.models.database import db
+        from src.models.tournament import TournamentEntry
+        from src.models.user import User
+
+        # Travar antes de conferir: agendador e criador podem iniciar ao mesmo tempo,
+        # e inscrições (que também travam) não entram depois da leitura dos inscritos
+        tournament.lock()
+        if tournament.status != 'registration':
+            return False, "Torneio já começou"
+
+        entries = db.session.query(TournamentEntry)\
+                            .join(User, User.id == TournamentEntry.user_id)\
+                            .filter(TournamentEntry.tournament_id == tournament.id)\
+                            .order_by(User.skill_rating.desc(), TournamentEntry.created_at.asc()).all()
+
+        if len(entries) < MIN_PLAYERS:
+            tournament.cancel()
+            return False, "Inscritos insuficientes, torneio cancelado"
+
+        for seed, entry in enumerate(entries, start=1):
+            entry.seed = seed
+            entry.status = 'playing'
+
+        tournament.status = 'running'
+        tournament.started_at = datetime.utcnow()
+
+        first_round = self._build_bracket(tournament, [entry.user_id for entry in entries])
+
+        batch = Batch()
+        for match in first_round:
+            self._resolve(match, tournament, batch)
+        self._commit(batch)
+
+        return True, "Torneio iniciado"
+
+    def _build_bracket(self, tournament, players):
+        """Criar todos os nós da chave; retorna os da primeira fase"""
+        from src.models.database import db
+        from src.models.tournament import TournamentMatch
+
+        size = bracket_size(len(players))
+        rounds = size.bit_length() - 1
+
+        def node(bracket, round_number, position):
+            return TournamentMatch(tournament_id=tournament.id, bracket=bracket,
+                                   round=round_number, position=position, pending_slots=2)
+
+        winners = [[node('winners', r, p) for p in range(size >> r)] for r in range(1, rounds + 1)]
+
+        # Primeira fase: sementes nos cruzamentos padrão (vaga sem semente fica vazia)
+        order = seed_order(size)
+        for position, match in enumerate(winners[0]):
+            seed1, seed2 = order[2 * position], order[2 * position + 1]
+            match.player1_id = players[seed1 - 1] if seed1 <= len(players) else None
+            match.player2_id = players[seed2 - 1] if seed2 <= len(players) else None
+            match.pending_slots = 0
+
+        losers, final = [], None
+        if tournament.format == 'double':
+            # Fases ímpares juntam sobreviventes; pares recebem quem cai da chave de vencedores
+            for r in range(1, 2 * (rounds - 1) + 1):
+                count = size >> (r // 2 + 1 + r % 2)
+                losers.append([node('losers', r, p) for p in range(count)])
+            final = node('final', 1, 0)
+
+        nodes = [m for fase in winners + losers for m in fase] + ([final] if final else [])
+        db.session.add_all(nodes)
+        db.session.flush()
+
+        def link(source, target, slot, loser=False):
+            if loser:
+                source.loser_match_id, source.loser_slot = target.id, slot
+            else:
+                source.next_match_id, source.next_slot = target.id, slot
+
+        for r in range(rounds - 1):
+            for position, match in enumerate(winners[r]):
+                link(match, winners[r + 1][position // 2], position % 2 + 1)
+
+        if final:
+            link(winners[-1][0], final, 1)
+            link(losers[-1][0], final, 2)
+
+            # Perdedores da primeira fase se enfrentam na fase 1 da chave de perdedores
+            for position, match in enumerate(winners[0]):
+                link(match, losers[0][position // 2], position % 2 + 1, loser=True)
+
+            for index, fase in enumerate(losers):
+                r = index + 1
+                if r % 2 == 0:
+                    # Quem cai da fase r/2 + 1 dos vencedores entra em ordem invertida
+                    dropping = winners[r // 2]
+                    for position, match in enumerate(dropping):
+                        link(match, fase[len(fase) - 1 - position], 2, loser=True)
+                    if index + 1 < len(losers):
+                        for position, match in enumerate(fase):
+                            link(match, losers[index + 1][position // 2], position % 2 + 1)
+                else:
+                    for position, match in enumerate(fase):
+                        link(match, losers[index + 1][position], 1)
+
+        return winners[0]
+
+    def _resolve(self, match, tournament, batch):
+        """Nó com as duas vagas definidas: jogo, bye ou nó vazio"""
+        from src.models.game import Game
+
+        players = [p for p in (match.player1_id, match.player2_id) if p]
+
+        if len(players) == 2:
+            game = Game(
+                player1_id=match.player1_id,
+                player2_id=match.player2_id,
+                game_type=tournament.game_type,
+                tournament_id=tournament.id
+            )
+            match.game = game
+            match.status = 'playing'
+            batch.games.append(game)
+            return
+
+        # Sem oponente: quem estiver na vaga avança, ninguém cai para a chave de perdedores
+        match.status = 'bye' if players else 'empty'
+        match.winner_id = players[0] if players else None
+        self._advance(match, tournament, match.winner_id, None, batch)
+
+    def _advance(self, match, tournament, winner_id, loser_id, batch):
+        """Levar vencedor e perdedor aos próximos nós"""
+        from src.models.database import db
+        from src.models.tournament import TournamentMatch
+
+        targets = [(match.next_match_id, match.next_slot, winner_id)]
+        if match.loser_match_id:
+            targets.append((match.loser_match_id, match.loser_slot, loser_id))
+        elif loser_id:
+            batch.eliminated.append((tournament.id, loser_id))
+
+        if match.next_match_id is None:
+            if winner_id:
+                tournament.finish(winner_id)
+            else:
+                tournament.status = 'finished'
+                tournament.finished_at = datetime.utcnow()
+            return
+
+        for target_id, slot, player_id in targets:
+            target = db.session.get(TournamentMatch, target_id)
+            target.set_player(slot, player_id)
+            if target.pending_slots == 0:
+                self._resolve(target, tournament, batch)
+
+    def _commit(self, batch):
+        """Gravar os nós alterados e iniciar os jogos criados num único commit"""
+        from src.models.database import db
+        from src.models.tournament import TournamentEntry
+        from src.services.game_store import game_store
+
+        if batch.eliminated:
+            db.session.query(TournamentEntry)\
+                      .filter(db.tuple_(TournamentEntry.tournament_id, TournamentEntry.user_id).in_(batch.eliminated))\
+                      .update({'status': 'eliminated'}, synchronize_session=False)
+
+        if batch.games:
+            game_store.start_many(batch.games)
+        else:
+            db.session.commit()
+
+    # Resultados
+
+    def report_result(self, game_id, winner_id):
+        """Registrar resultado de jogo de torneio (processado pela thread de fundo)"""
+        self.results.put((game_id, winner_id))
+        self._wakeup.set()
+
+    def process(self, results):
+        """
+        Avançar as chaves com um lote de resultados (requer app context)
+
+        Returns:
+            Número de nós finalizados
+        """
+        from src.models.database import db
+        from src.models.tournament import Tournament, TournamentMatch
+
+        winners = dict(results)
+        if not winners:
+            return 0
+
+        matches = TournamentMatch.query.filter(TournamentMatch.game_id.in_(list(winners)))\
+                                       .filter(TournamentMatch.status == 'playing').all()
+        if not matches:
+            return 0
+
+        # Só os nós afetados: os torneios e os nós para onde os jogadores seguem,
+        # carregados de uma vez (as referências mantêm os objetos na sessão)
+        targets = {m.next_match_id for m in matches} | {m.loser_match_id for m in matches}
+        targets.discard(None)
+        loaded = TournamentMatch.query.filter(TournamentMatch.id.in_(list(targets))).all()
+        loaded += Tournament.query.filter(Tournament.id.in_({m.tournament_id for m in matches})).all()
+
+        batch = Batch()
+        for match in matches:
+            winner_id = winners[match.game_id]
+            if winner_id not in (match.player1_id, match.player2_id):
+                continue
+
+            tournament = db.session.get(Tournament, match.tournament_id)
+            match.status = 'finished'
+            match.winner_id = winner_id
+            match.loser_id = match.player2_id if winner_id == match.player1_id else match.player1_id
+            self._advance(match, tournament, winner_id, match.loser_id, batch)
+
+        self._commit(batch)
+        return len(matches)
+
+    def process_pending(self):
+        """Processar os resultados na fila (requer app context)"""
+        results = []
+        while len(results) < MAX_BATCH:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        return self.process(results)
+
+    def recover(self):
+        """Reprocessar nós cujo jogo terminou mas a chave não avançou (requer app context)"""
+        from src.models.database import db
+        from src.models.game import Game
+        from src.models.tournament import TournamentMatch
+
+        rows = db.session.query(Game.id, Game.winner_id)\
+                         .join(TournamentMatch, TournamentMatch.game_id == Game.id)\
+                         .filter(TournamentMatch.status == 'playing')\
+                         .filter(Game.status == 'finished').all()
+        return self.process([(game_id, winner_id) for game_id, winner_id in rows])
+
+    def start_due(self):
+        """Iniciar os torneios cujo horário chegou (requer app context)"""
+        from src.models.database import db
+        from src.models.tournament import Tournament
+
+        started = 0
+        for tournament_id in self._due(datetime.utcnow()):
+            tournament = db.session.get(Tournament, tournament_id)
+            if tournament and tournament.status == 'registration':
+                success, _ = self.start_tournament(tournament)
+                started += int(success)
+        return started
+
+    def run(self, app):
+        """Loop do agendador: resultados em lote e inícios agendados"""
+        from src.models.database import db
+
+        with app.app_context():
+            self.load_schedule()
+
+        timeout = IDLE_WAIT
+        while True:
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            timeout = IDLE_WAIT
+
+            with app.app_context():
+                try:
+                    if self._needs_recovery:
+                        self.recover()
+                        self._needs_recovery = False
+                    while not self.results.empty():
+                        self.process_pending()
+                    self.start_due()
+                    timeout = self._next_timeout()
+                except Exception as e:
+                    db.session.rollback()
+                    self._needs_recovery = True
+                    print(f"⚠️ Erro no motor de torneios: {str(e)}")
+                    time.sleep(IDLE_WAIT)
+
+    def start(self, app):
+        """Iniciar o agendador em uma thread de fundo"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, args=(app,), daemon=True)
+            self._thread.start()
+        return self._thread
+
+
+# Instância global do motor de torneios
+tournament_engine = TournamentEngine()
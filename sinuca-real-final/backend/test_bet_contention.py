@@ -0,0 +1,113 @@
+"""
+Teste de carga do aceite otimista: centenas de aceites na mesma aposta
+
+Cada interessado faz POST /api/betting/bets/<id>/accept ao mesmo tempo
+contra a mesma aposta aberta. O UPDATE condicional pela versão deixa uma
+única requisição vencer (200) e as outras recebem 409 sem tocar nos
+saldos: um jogo, um escrow por jogador, livro-razão consistente e p99 de
+latência limitado.
+
+Variáveis: ACCEPT_STORM (interessados, padrão 200) e ACCEPT_P99_LIMIT
+(segundos, padrão 5)
+"""
+
+import os
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from src.models.database import db
+from src.models.user import User
+from src.models.game import Game, Bet
+from src.models.ledger import LedgerEntry
+from src.routes.betting import betting_bp
+from src.services.ledger import ledger
+
+CONTENDERS = int(os.getenv('ACCEPT_STORM', 200))
+P99_LIMIT = float(os.getenv('ACCEPT_P99_LIMIT', 5.0))  # segundos
+BET_AMOUNT = Decimal('10.00')
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    return make_app((betting_bp, '/api/betting'), production=True)
+
+@pytest.fixture(scope='module')
+def ids(app, create_users, open_bet):
+    """Um criador, uma aposta aberta e CONTENDERS interessados com token"""
+    with app.app_context():
+        users = create_users(CONTENDERS + 1)
+        return {
+            'creator': users[0].id,
+            'contenders': [user.id for user in users[1:]],
+            'bet': open_bet(users[0].id, BET_AMOUNT).id,
+            'tokens': {user.id: create_access_token(identity=user.id) for user in users[1:]}
+        }
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run_storm(app, ids):
+    """Todos os interessados aceitam a aposta ao mesmo tempo"""
+    results = []
+    barrier = threading.Barrier(CONTENDERS)
+
+    def accept(user_id):
+        client = app.test_client()
+        headers = {'Authorization': f"Bearer {ids['tokens'][user_id]}"}
+        barrier.wait()
+        started = time.perf_counter()
+        response = client.post(f"/api/betting/bets/{ids['bet']}/accept", headers=headers)
+        results.append((response.status_code, time.perf_counter() - started))
+
+    threads = [threading.Thread(target=accept, args=(user_id,)) for user_id in ids['contenders']]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_accept_storm(app, ids):
+    """Uma aceitação vence, o resto recebe 409 rápido, sem escrow duplicado"""
+    results = run_storm(app, ids)
+
+    statuses = [status for status, _ in results]
+    latencies = [latency for _, latency in results]
+    p99 = _percentile(latencies, 0.99)
+
+    assert statuses.count(200) == 1, statuses
+    assert statuses.count(409) == CONTENDERS - 1, statuses
+    assert p99 < P99_LIMIT, f'p99 {p99:.3f}s'
+
+    with app.app_context():
+        bet = db.session.get(Bet, ids['bet'])
+        assert bet.status == 'matched' and bet.version == 1
+        assert Game.query.filter_by(bet_id=bet.id).count() == 1
+        assert LedgerEntry.query.filter_by(bet_id=bet.id, type='bet_escrow').count() == 4
+        assert ledger.balance(bet.escrow_account) == BET_AMOUNT * 2
+
+        balances = dict(User.query.with_entities(User.id, User.balance).all())
+        assert balances[ids['creator']] == Decimal('90.00')
+        assert balances[bet.opponent_id] == Decimal('90.00')
+        assert sum(balances.values()) == Decimal('100.00') * (CONTENDERS + 1) - BET_AMOUNT * 2
+        assert ledger.verify() == []
+
+def test_stale_version_conflicts(app, ids, open_bet):
+    """Aposta lida antes de outra mudança (versão velha) não é aceita"""
+    with app.app_context():
+        bet = open_bet(ids['creator'], BET_AMOUNT)
+
+        # Outra requisição muda a aposta depois desta ter lido a versão
+        db.session.execute(db.update(Bet).where(Bet.id == bet.id)
+                           .values(version=Bet.version + 1)
+                           .execution_options(synchronize_session=False))
+        assert bet.version == 0
+
+        balance = db.session.get(User, ids['contenders'][-1]).balance
+        assert bet.claim(ids['contenders'][-1]) is False
+        db.session.rollback()
+        assert db.session.get(Bet, bet.id).status == 'open'
+        assert db.session.get(User, ids['contenders'][-1]).balance == balance
@@ -0,0 +1,124 @@
+"""
+Teste do motor de apostas (fila única e escritor em lotes)
+
+Centenas de aceites simultâneos na mesma aposta passam pela fila: um
+vence, os outros recebem 409, e os comandos são aplicados em lotes. Um
+lote misto (criar, aceitar, cancelar) faz um único commit, e um comando
+com erro não derruba os outros. Um aceite pelo livro (`accept-best`)
+que falha devolve a aposta reservada ao livro.
+"""
+
+import threading
+from decimal import Decimal
+
+import pytest
+
+from src.models.database import db
+from src.models.game import Game, Bet
+from src.services.bet_engine import BetEngine, Command
+from src.services.ledger import ledger
+
+CONTENDERS = 200
+BET_AMOUNT = Decimal('10.00')
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    return make_app(production=True)
+
+@pytest.fixture(scope='module')
+def ids(app, create_users):
+    """Um criador e CONTENDERS interessados"""
+    with app.app_context():
+        users = create_users(CONTENDERS + 1)
+        return {'creator': users[0].id, 'contenders': [user.id for user in users[1:]]}
+
+def test_accept_storm_through_queue(app, ids, open_bet):
+    """Aceites simultâneos pela fila: um vence, lotes com vários comandos"""
+    with app.app_context():
+        bet_id = open_bet(ids['creator'], BET_AMOUNT).id
+
+    engine = BetEngine()
+    engine.start(app)
+
+    results = []
+    barrier = threading.Barrier(CONTENDERS)
+
+    def accept(user_id):
+        barrier.wait()
+        status, _ = engine.execute('accept', bet_id=bet_id, user_id=user_id)
+        results.append(status)
+
+    threads = [threading.Thread(target=accept, args=(user_id,)) for user_id in ids['contenders']]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(200) == 1, results
+    assert results.count(409) == CONTENDERS - 1, results
+    stats = engine.stats()
+    assert stats['applied'] == CONTENDERS and stats['avg_batch'] > 1, stats
+
+    with app.app_context():
+        bet = db.session.get(Bet, bet_id)
+        assert bet.status == 'matched'
+        assert Game.query.filter_by(bet_id=bet_id).count() == 1
+        assert ledger.balance(bet.escrow_account) == BET_AMOUNT * 2
+        assert ledger.verify() == []
+
+def test_mixed_batch_single_commit(app, ids, open_bet, count_commits):
+    """Criar, aceitar e cancelar no mesmo lote: um commit; erro isolado"""
+    engine = BetEngine()  # sem thread: lote aplicado aqui
+    creator_id, first, second = ids['creator'], ids['contenders'][-1], ids['contenders'][-2]
+
+    with app.app_context():
+        accepted, cancelled = open_bet(creator_id, BET_AMOUNT).id, open_bet(creator_id, BET_AMOUNT).id
+        batch = [
+            Command('accept', {'bet_id': accepted, 'user_id': first}),
+            Command('accept', {'bet_id': accepted, 'user_id': second}),
+            Command('cancel', {'bet_id': cancelled, 'user_id': creator_id}),
+            Command('create', {'user_id': second, 'amount': 20}),
+        ]
+        with count_commits(app) as commits:
+            engine.apply_batch(batch)
+
+        assert [command.future.result()[0] for command in batch] == [200, 409, 200, 201]
+        assert len(commits) == 1, f'{len(commits)} commits'
+
+        # Comando com erro: o lote é refeito comando a comando
+        failing = Command('create', {'user_id': second, 'amount': 'x'})
+        fine = Command('create', {'user_id': first, 'amount': 15})
+        engine.apply_batch([failing, fine])
+        assert fine.future.result()[0] == 201
+        assert isinstance(failing.future.exception(), Exception)
+
+        assert db.session.get(Bet, cancelled).status == 'cancelled'
+        assert Bet.query.filter_by(creator_id=second, status='open').count() == 1
+        assert Bet.query.filter_by(creator_id=first, status='open').count() == 1
+        assert ledger.verify() == []
+
+def test_accept_best_error_returns_bet_to_book(make_app, create_users, open_bet, monkeypatch):
+    """Aceite que estoura (tempo esgotado): 500 e a aposta reservada volta ao livro"""
+    from flask_jwt_extended import create_access_token
+    from src.routes.betting import betting_bp
+    from src.services.bet_book import bet_book
+    from src.services.bet_engine import bet_engine
+
+    app = make_app((betting_bp, '/api/betting'))
+    with app.app_context():
+        creator, opponent = create_users(2)
+        bet_id = open_bet(creator.id, BET_AMOUNT).id
+        bet_book.clear()
+        headers = {'Authorization': f"Bearer {create_access_token(identity=opponent.id)}"}
+
+        def timeout(*args, **kwargs):
+            raise TimeoutError('fila do motor de apostas')
+
+        monkeypatch.setattr(bet_engine, 'execute', timeout)
+        response = app.test_client().post('/api/betting/bets/accept-best', json={}, headers=headers)
+        assert response.status_code == 500
+        assert db.session.get(Bet, bet_id).status == 'open'
+
+        monkeypatch.undo()
+        assert bet_book.best_match(opponent.id, opponent.skill_rating) == bet_id
+        bet_book.clear()
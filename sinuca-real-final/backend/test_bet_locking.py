@@ -0,0 +1,99 @@
+"""
+Teste de concorrência da carteira: aceitação e liquidação de apostas
+
+Vários jogadores aceitam a mesma aposta ao mesmo tempo. Com a aposta e os
+saldos travados (SELECT ... FOR UPDATE no PostgreSQL; escritor único com
+BEGIN IMMEDIATE no SQLite em modo produção), só uma aceitação vence: um
+jogo, um escrow por jogador e saldos exatos em Decimal.
+"""
+
+import threading
+from decimal import Decimal
+
+import pytest
+
+from src.models.database import db
+from src.models.user import User
+from src.models.game import Game, Bet
+from src.models.transaction import Transaction
+
+CONTENDERS = 20
+BET_AMOUNT = Decimal('10.10')
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    return make_app(production=True)
+
+@pytest.fixture(scope='module')
+def ids(app, create_users, open_bet):
+    """Um criador, uma aposta aberta e vários interessados"""
+    with app.app_context():
+        users = create_users(CONTENDERS + 1)
+        return {
+            'creator': users[0].id,
+            'contenders': [user.id for user in users[1:]],
+            'bet': open_bet(users[0].id, BET_AMOUNT).id
+        }
+
+def test_fees_are_exact_decimals():
+    """Taxas calculadas em centavos, sem erro de ponto flutuante"""
+    fees = Bet.calculate_fees(BET_AMOUNT)
+    assert fees['total_pot'] == Decimal('20.20')
+    assert fees['platform_fee'] == Decimal('1.01')
+    assert fees['total_prize'] == Decimal('19.19')
+    assert all(isinstance(value, Decimal) for value in fees.values())
+
+def test_concurrent_accept(app, ids):
+    """Só uma das aceitações simultâneas vence"""
+    results = []
+    barrier = threading.Barrier(CONTENDERS)
+
+    def accept(opponent_id):
+        with app.app_context():
+            bet = db.session.get(Bet, ids['bet'])
+            barrier.wait()
+            try:
+                success, _ = bet.accept_bet(opponent_id)
+            except Exception as e:
+                db.session.rollback()
+                success = f'erro: {e}'
+            results.append(success)
+
+    threads = [threading.Thread(target=accept, args=(opponent_id,)) for opponent_id in ids['contenders']]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 1, results
+    assert all(result is False for result in results if result is not True), results
+
+    with app.app_context():
+        bet = db.session.get(Bet, ids['bet'])
+        assert bet.status == 'matched'
+        assert Game.query.filter_by(bet_id=bet.id).count() == 1
+        assert Transaction.query.filter_by(type='bet_escrow').count() == 2
+
+        creator = db.session.get(User, ids['creator'])
+        opponent = db.session.get(User, bet.opponent_id)
+        assert creator.balance == Decimal('89.90'), creator.balance
+        assert opponent.balance == Decimal('89.90'), opponent.balance
+        assert isinstance(creator.balance, Decimal)
+
+        untouched = User.query.filter(User.id.in_(ids['contenders']), User.id != bet.opponent_id).all()
+        assert all(user.balance == Decimal('100.00') for user in untouched)
+
+def test_complete_bet_pays_once(app, ids):
+    """Liquidação paga o prêmio exato uma única vez"""
+    with app.app_context():
+        bet = db.session.get(Bet, ids['bet'])
+        if bet.status == 'open':
+            bet.accept_bet(ids['contenders'][0])
+        winner_id = bet.opponent_id
+
+        assert bet.complete_bet(winner_id) == (True, "Aposta completada")
+        assert bet.complete_bet(winner_id)[0] is False
+
+        winner = db.session.get(User, winner_id)
+        assert winner.balance == Decimal('89.90') + Decimal('19.19'), winner.balance
+        assert winner.total_winnings == Decimal('19.19')
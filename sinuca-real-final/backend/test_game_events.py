@@ -0,0 +1,88 @@
+"""
+Teste dos canais de eventos ao vivo (SSE)
+
+Confere a entrega e a retomada dos eventos, que o limite de espectadores
+vale com muitas conexões ao mesmo tempo, que fechar a resposta antes do
+primeiro frame libera o lugar, e que o descarte de canais poupa os que
+têm clientes (e, quando não há outro jeito, manda `reset` a eles).
+"""
+
+import threading
+
+import pytest
+
+from src.services.game_events import ChannelFull, GameEvents
+
+GAME_ID = 1
+
+def test_events_delivered_and_resumed():
+    events = GameEvents()
+    events.publish(GAME_ID, 'move', {'sequence': 1})
+
+    stream = iter(events.stream(GAME_ID))
+    assert next(stream).startswith('retry:')
+    assert 'id: 1\nevent: move' in next(stream)
+
+    # Evento publicado por outra thread acorda o cliente que espera
+    timer = threading.Timer(0.05, events.publish, (GAME_ID, 'shot', {'power': 50}))
+    timer.start()
+    assert 'id: 2\nevent: shot' in next(stream)
+    timer.join()
+
+    events.publish(GAME_ID, 'finish', {'winner_id': 7}, close=True)
+    assert 'event: finish' in next(stream)
+    with pytest.raises(StopIteration):
+        next(stream)
+    assert events.metrics(GAME_ID)['subscribers'] == 0
+
+    # Retomada pelo Last-Event-ID
+    resumed = list(events.stream(GAME_ID, last_id=1))
+    assert 'id: 2' in resumed[1] and 'id: 3' in resumed[1] and 'id: 1\n' not in resumed[1]
+
+def test_spectator_limit_under_concurrency():
+    """Conexões simultâneas: exatamente max_spectators entram"""
+    events = GameEvents(max_spectators=10)
+    barrier = threading.Barrier(50)
+    accepted, refused = [], []
+
+    def watch():
+        barrier.wait()
+        try:
+            accepted.append(events.stream(GAME_ID, spectator=True))
+        except ChannelFull:
+            refused.append(True)
+
+    threads = [threading.Thread(target=watch) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(accepted) == 10 and len(refused) == 40
+    assert events.metrics(GAME_ID)['spectators'] == 10
+
+    # Resposta fechada sem ter enviado nada libera o lugar
+    for stream in accepted:
+        stream.close()
+    assert events.metrics(GAME_ID)['spectators'] == 0
+
+def test_eviction_spares_channels_with_subscribers():
+    events = GameEvents(max_channels=2)
+    stream = events.stream(1)
+    events.publish(2, 'start', {})
+    events.publish(3, 'start', {})
+
+    assert events.has_channel(1) and not events.has_channel(2) and events.has_channel(3)
+    stream.close()
+
+def test_busy_channel_evicted_sends_reset():
+    """Todos os canais com clientes: o mais antigo sai e o cliente recebe `reset`"""
+    events = GameEvents(max_channels=1)
+    stream = iter(events.stream(1))
+    next(stream)
+
+    events.publish(2, 'start', {})
+    assert not events.has_channel(1)
+    assert 'event: reset' in next(stream)
+    with pytest.raises(StopIteration):
+        next(stream)
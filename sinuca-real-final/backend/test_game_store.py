@@ -0,0 +1,159 @@
+"""
+Teste do estado dos jogos em andamento (rota /update)
+
+O cliente envia patches e snapshots do seu estado; vez, grupos, bola na
+mão, vencedor, última tacada e sequência são do servidor. Confere que
+patches e snapshots com esses campos voltam 400 sem alterar nada, que o
+estado do cliente não muda as regras da tacada seguinte e que os dois
+continuam juntos no snapshot gravado. Também confere a gravação: um
+flush atrasado não grava por cima do snapshot de `close`, e um `close`
+que falha devolve o jogo (com as jogadas) à memória.
+"""
+
+import json
+import threading
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from src.models.database import db
+from src.models.game import Game, GameMove
+from src.routes.game import game_bp
+from src.services.game_store import RULE_FIELDS, game_store
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    return make_app((game_bp, '/api/games'))
+
+@pytest.fixture
+def live(app, create_users):
+    """Jogo em andamento servido da memória, com os tokens dos dois jogadores"""
+    with app.app_context():
+        player1, player2 = create_users(2)
+        game = Game(player1_id=player1.id, player2_id=player2.id)
+        db.session.add(game)
+        db.session.commit()
+        game_store.start(game)
+
+        live = game_store.get(game.id)
+        live.headers = {
+            player_id: {'Authorization': f"Bearer {create_access_token(identity=player_id)}"}
+            for player_id in (player1.id, player2.id)
+        }
+        yield live
+        game_store.close(live.id)
+
+def update(app, live, player_id, body):
+    return app.test_client().post(f'/api/games/{live.id}/update', json=body,
+                                  headers=live.headers[player_id])
+
+@pytest.mark.parametrize('field', sorted(RULE_FIELDS))
+def test_patch_with_rule_field_rejected(app, live, field):
+    """Patch que toca campo de regras: 400, sequência e regras intactas"""
+    rules = live.match_state().rules_data()
+    response = update(app, live, live.player1_id,
+                      {'sequence': 1, 'patch': {field: live.player2_id, 'cue_aim': 0.5}})
+
+    assert response.status_code == 400
+    assert response.get_json()['fields'] == [field]
+    assert live.sequence == 0 and live.current_state().get('cue_aim') is None
+    assert live.match_state().rules_data() == rules
+
+def test_snapshot_with_rule_fields_rejected(app, live):
+    """Snapshot completo com vez e vencedor: 400, estado intacto"""
+    response = update(app, live, live.player2_id, {'game_state': {
+        'turn': live.player2_id, 'winner_id': live.player2_id, 'cue_aim': 1.0
+    }})
+
+    assert response.status_code == 400
+    assert response.get_json()['fields'] == ['turn', 'winner_id']
+    match = live.match_state()
+    assert match.turn == live.player1_id and match.winner_id is None
+    assert 'cue_aim' not in live.current_state()
+
+def test_client_state_kept_apart_from_rules(app, live):
+    """Patches e snapshots válidos não mudam a vez; o snapshot gravado tem os dois"""
+    response = update(app, live, live.player2_id, {'sequence': 1, 'patch': {'cue_aim': 0.25}})
+    assert response.status_code == 200 and response.get_json()['next_sequence'] == 2
+
+    response = update(app, live, live.player2_id, {'game_state': {'cue_aim': 0.75, 'chat': ['oi']}})
+    assert response.status_code == 200
+    assert response.get_json()['game_data']['sequence'] == 1
+
+    # A vez continua do jogador 1
+    success, message, _ = live.play_shot(live.player2_id, 0.0, 50)
+    assert (success, message) == (False, "Não é sua vez")
+    success, _, _ = live.play_shot(live.player1_id, 0.0, 50)
+    assert success
+
+    state = live.current_state()
+    assert state['cue_aim'] == 0.75 and state['chat'] == ['oi']
+    assert state['last_shot']['player_id'] == live.player1_id
+    assert state['turn'] == live.match_state().turn and state['sequence'] == 1
+
+    game_data, _, _, _ = live.take_snapshot()
+    assert json.loads(game_data) == state
+
+def test_late_flush_does_not_overwrite_close(make_app, create_users, monkeypatch):
+    """Flush com snapshot antigo ainda gravando: `close` espera e grava por último"""
+    app = make_app(production=True)
+    with app.app_context():
+        player1, player2 = create_users(2)
+        game = Game(player1_id=player1.id, player2_id=player2.id)
+        db.session.add(game)
+        db.session.commit()
+        game_store.start(game)
+        live = game_store.get(game.id)
+        live.apply_move(player1.id, 1, {'cue_aim': 0.1})
+
+    snapshot_taken, release = threading.Event(), threading.Event()
+    commit = game_store._commit
+
+    def slow_commit(batch):
+        if threading.current_thread() is flusher:
+            snapshot_taken.set()
+            release.wait()
+        return commit(batch)
+
+    def run(target):
+        with app.app_context():
+            target()
+
+    monkeypatch.setattr(game_store, '_commit', slow_commit)
+    flusher = threading.Thread(target=run, args=(game_store.flush,))
+    flusher.start()
+    assert snapshot_taken.wait(5)
+
+    live.apply_move(player1.id, 2, {'cue_aim': 0.2})
+    closer = threading.Thread(target=run, args=(lambda: game_store.close(live.id),))
+    closer.start()
+    closer.join(0.2)
+    assert closer.is_alive()  # esperando o flush terminar
+
+    release.set()
+    flusher.join()
+    closer.join()
+
+    with app.app_context():
+        game = db.session.get(Game, live.id)
+        assert json.loads(game.game_data)['sequence'] == 2
+        assert json.loads(game.game_data)['cue_aim'] == 0.2
+        assert GameMove.query.filter_by(game_id=live.id).count() == 2
+
+def test_failed_close_keeps_game_in_memory(app, live, monkeypatch):
+    """Gravação do `close` falhou: o jogo volta ao armazenamento com as jogadas"""
+    live.apply_move(live.player1_id, 1, {'cue_aim': 0.5})
+
+    def fail():
+        raise RuntimeError('banco fora do ar')
+
+    monkeypatch.setattr(db.session, 'commit', fail)
+    with pytest.raises(RuntimeError):
+        game_store.close(live.id)
+    monkeypatch.undo()
+
+    assert game_store.get(live.id) is live and not live.closed
+    assert [sequence for sequence, _, _ in live.moves] == [1]
+
+    game_store.close(live.id)
+    assert GameMove.query.filter_by(game_id=live.id).count() == 1
@@ -0,0 +1,128 @@
+"""
+Teste do livro-razão da carteira
+
+Créditos e débitos simultâneos no mesmo jogador (sem travar a linha) não
+perdem atualizações, nenhum débito deixa o saldo negativo, os lançamentos
+somam zero e o saldo recalculado por snapshot + lançamentos posteriores
+bate com `users.balance`.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from src.models.database import db
+from src.models.user import User
+from src.models.ledger import BalanceSnapshot, LedgerEntry
+from src.services.ledger import ledger, InsufficientFunds, PLATFORM_FEE, wallet
+
+WORKERS = 20
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    return make_app(production=True)
+
+@pytest.fixture(scope='module')
+def user_ids(app, create_users):
+    """Dois jogadores"""
+    with app.app_context():
+        return [user.id for user in create_users(2)]
+
+def run_concurrently(app, task):
+    """Executar `task(i)` em WORKERS threads ao mesmo tempo"""
+    results = []
+    barrier = threading.Barrier(WORKERS)
+
+    def worker(i):
+        with app.app_context():
+            barrier.wait()
+            try:
+                task(i)
+                results.append(True)
+            except InsufficientFunds:
+                db.session.rollback()
+                results.append(False)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_opening_balance(app, user_ids):
+    """Saldo inicial da carteira vira lançamento"""
+    with app.app_context():
+        assert ledger.balance(wallet(user_ids[0])) == Decimal('100.00')
+        assert ledger.verify() == []
+
+def test_concurrent_credits_and_debits(app, user_ids):
+    """Depósitos e apostas simultâneos não perdem atualizações"""
+    user_id = user_ids[0]
+
+    def task(i):
+        user = db.session.get(User, user_id)  # sem FOR UPDATE: só o UPDATE atômico
+        amount = Decimal('7.35') if i % 2 else Decimal('-2.10')
+        user.update_balance(amount, 'deposit' if i % 2 else 'adjustment')
+
+    results = run_concurrently(app, task)
+    assert all(results), results
+
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        expected = Decimal('100.00') + 10 * Decimal('7.35') - 10 * Decimal('2.10')
+        assert user.balance == expected, user.balance
+        assert ledger.verify() == []
+
+def test_debits_never_overdraw(app, user_ids):
+    """Débitos simultâneos acima do saldo: os excedentes falham"""
+    user_id = user_ids[1]
+
+    def task(i):
+        db.session.get(User, user_id).update_balance(Decimal('-30.00'), 'withdrawal')
+
+    results = run_concurrently(app, task)
+    assert results.count(True) == 3, results
+
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        assert user.balance == Decimal('10.00'), user.balance
+        assert ledger.verify([user_id]) == []
+
+def test_bet_escrow_settles_to_zero(app, user_ids, open_bet):
+    """Escrow da aposta zera na liquidação; taxa vai para a plataforma"""
+    with app.app_context():
+        creator_id, opponent_id = user_ids
+        bet = open_bet(creator_id, Decimal('5.00'))
+
+        fee_before = ledger.balance(PLATFORM_FEE)
+        assert bet.accept_bet(opponent_id)[0]
+        db.session.commit()
+        assert ledger.balance(bet.escrow_account) == Decimal('10.00')
+
+        assert bet.complete_bet(creator_id)[0]
+        db.session.commit()
+        assert ledger.balance(bet.escrow_account) == Decimal('0.00')
+        assert ledger.balance(PLATFORM_FEE) == fee_before + Decimal('0.50')
+        assert LedgerEntry.query.filter_by(bet_id=bet.id).count() == 8
+        assert ledger.verify() == []
+
+def test_snapshot_plus_tail(app, user_ids):
+    """Saldo por snapshot + lançamentos posteriores bate com a carteira"""
+    with app.app_context():
+        user_id = user_ids[0]
+        assert ledger.snapshot(now=datetime.utcnow() + timedelta(hours=1)) > 0
+        assert ledger.snapshot(now=datetime.utcnow() + timedelta(hours=1)) == 0  # nada novo
+
+        user = db.session.get(User, user_id)
+        user.update_balance(Decimal('12.34'), 'deposit')
+
+        snapshot = BalanceSnapshot.query.filter_by(account=wallet(user_id))\
+                                        .order_by(BalanceSnapshot.entry_id.desc()).first()
+        tail = LedgerEntry.query.filter(LedgerEntry.account == wallet(user_id),
+                                        LedgerEntry.id > snapshot.entry_id).count()
+        assert tail == 1
+        assert ledger.balance(wallet(user_id)) == db.session.get(User, user_id).balance
+        assert ledger.verify() == []
@@ -0,0 +1,69 @@
+"""
+Teste da busca de oponente na fila de matchmaking
+
+A fila de cada tipo de jogo é ordenada por (rating, hora de entrada): a
+busca vai ao rating mais próximo dos dois lados, desempata pelo que
+espera há mais tempo e não passa da janela do jogador. Entrar de novo
+pedindo outro tipo de jogo troca o ticket de fila.
+"""
+
+from types import SimpleNamespace
+
+from src.services.matchmaking import BASE_WINDOW, Matchmaker, Ticket
+
+NOW = 1000.0
+
+def queue_of(*entries):
+    """Fila com tickets (user_id, rating, entrou há quantos segundos)"""
+    matchmaker = Matchmaker()
+    for user_id, rating, waited in entries:
+        matchmaker._add(Ticket(user_id, rating, '8ball', 300, NOW - waited))
+    return matchmaker
+
+def opponent(matchmaker, rating, user_id=99):
+    ticket = Ticket(user_id, rating, '8ball', 300, NOW)
+    found = matchmaker._find_opponent(ticket, NOW)
+    return found.user_id if found else None
+
+def test_nearest_rating_on_either_side():
+    matchmaker = queue_of((1, 1180, 0), (2, 1215, 0), (3, 1190, 0), (4, 1240, 0))
+    assert opponent(matchmaker, 1200) == 3
+    assert opponent(matchmaker, 1210) == 2
+    assert opponent(matchmaker, 1230) == 4
+
+def test_same_distance_prefers_longest_waiting():
+    """Mesma distância (dos dois lados ou no mesmo rating): o mais antigo na fila"""
+    matchmaker = queue_of((1, 1190, 5), (2, 1190, 30), (3, 1210, 10), (4, 1210, 20))
+    assert opponent(matchmaker, 1200) == 2
+
+    matchmaker = queue_of((1, 1190, 5), (3, 1210, 10), (4, 1210, 20))
+    assert opponent(matchmaker, 1200) == 4
+
+def test_window_limits_the_search():
+    matchmaker = queue_of((1, 1200 - BASE_WINDOW - 1, 0), (2, 1200 + BASE_WINDOW + 1, 0))
+    assert opponent(matchmaker, 1200) is None
+    assert opponent(matchmaker, 1200 + 2) == 2
+
+def test_removed_and_own_tickets_are_skipped():
+    matchmaker = queue_of((1, 1200, 0), (2, 1205, 0), (3, 1220, 0))
+    matchmaker._remove(matchmaker.queues['8ball'][1][3])
+    assert opponent(matchmaker, 1204) == 1
+    assert opponent(matchmaker, 1200, user_id=1) == 3
+    assert matchmaker.stats() == {'8ball': 2}
+
+def test_enqueue_other_game_type_replaces_ticket():
+    """Já na fila e pede outro tipo de jogo: troca de fila; mesmo tipo: mesmo ticket"""
+    matchmaker = Matchmaker()
+    user = SimpleNamespace(id=1, skill_rating=1200)
+
+    first = matchmaker.enqueue(user, '8ball')
+    assert matchmaker.enqueue(user, '8ball') is first
+
+    second = matchmaker.enqueue(user, '9ball')
+    assert second is not first and second.game_type == '9ball'
+    assert matchmaker.status(user.id) is second
+    assert matchmaker.stats().get('8ball', 0) == 0 and matchmaker.stats()['9ball'] == 1
+
+    # Quem espera no 8ball não é pareado com ele
+    other = matchmaker.enqueue(SimpleNamespace(id=2, skill_rating=1200), '8ball')
+    assert other.game_id is None
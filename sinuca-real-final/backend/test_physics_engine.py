@@ -0,0 +1,112 @@
+"""
+Teste do motor de física (resolvedores por evento e de passo fixo)
+
+A verificação do replay e o pagamento das apostas dependem da física ser
+determinística: a mesma tacada sobre a mesma mesa dá sempre a mesma mesa
+final. Confere também que nenhuma bola termina fora da mesa ou sobreposta
+a outra depois de uma quebra, e que os dois resolvedores concordam (dentro
+da tolerância) em tacadas simples.
+"""
+
+import numpy as np
+import pytest
+
+from src.services.physics_engine import (
+    BALL_RADIUS, CUE_INDEX, MAX_X, MAX_Y, MIN_X, MIN_Y, SOLVERS,
+    TableState, cue_velocity, simulate_batch, simulate_shot, simulate_shots
+)
+
+SEED = 2024
+BREAKS = 40
+
+# O passo fixo só separa bolas no quadro seguinte ao contato
+OVERLAP_TOLERANCE = {'event': 1e-6, 'fixed': 0.5}
+# Diferença máxima entre os resolvedores na posição final (px)
+SOLVER_TOLERANCE = 2 * BALL_RADIUS
+
+def random_shots(seed, count):
+    """Tacadas de quebra (ângulo, força) sorteadas com a semente, todas no triângulo"""
+    rng = np.random.default_rng(seed)
+    return list(zip(rng.uniform(-0.1, 0.1, count), rng.uniform(30, 100, count)))
+
+def assert_valid_table(state, mode):
+    """Bolas na mesa dentro das tabelas e sem sobreposição"""
+    positions = state.positions[~state.pocketed]
+    assert (positions[:, 0] >= MIN_X - 1e-6).all() and (positions[:, 0] <= MAX_X + 1e-6).all()
+    assert (positions[:, 1] >= MIN_Y - 1e-6).all() and (positions[:, 1] <= MAX_Y + 1e-6).all()
+
+    delta = positions[:, None, :] - positions[None, :, :]
+    dist = np.sqrt((delta ** 2).sum(axis=-1))
+    np.fill_diagonal(dist, np.inf)
+    assert dist.min() >= 2 * BALL_RADIUS - OVERLAP_TOLERANCE[mode], dist.min()
+
+@pytest.mark.parametrize('mode', SOLVERS)
+def test_same_seed_same_final_state(mode):
+    """Mesma semente, mesmas tacadas: mesmas mesas finais, bit a bit"""
+    first = [simulate_shot(TableState.initial(), angle, power, mode) for angle, power in random_shots(SEED, 10)]
+    second = [simulate_shot(TableState.initial(), angle, power, mode) for angle, power in random_shots(SEED, 10)]
+
+    for a, b in zip(first, second):
+        assert np.array_equal(a.state.positions, b.state.positions)
+        assert np.array_equal(a.state.pocketed, b.state.pocketed)
+        assert a.pocketed == b.pocketed and a.first_hit == b.first_hit and a.frames == b.frames
+
+@pytest.mark.parametrize('mode', SOLVERS)
+def test_break_ends_on_a_valid_table(mode):
+    """Quebras sorteadas: bolas paradas, dentro da mesa e sem sobreposição"""
+    for angle, power in random_shots(SEED, BREAKS):
+        result = simulate_shot(TableState.initial(), angle, power, mode)
+        assert not result.state.velocities.any()
+        assert result.first_hit is not None
+        assert_valid_table(result.state, mode)
+
+def test_batch_matches_single_tables():
+    """Mesas simuladas em lote dão o mesmo resultado que uma a uma"""
+    shots = random_shots(SEED, 8)
+    initial = TableState.initial()
+    positions = np.repeat(initial.positions[None], len(shots), axis=0)
+    velocities = np.zeros_like(positions)
+    for table, (angle, power) in enumerate(shots):
+        velocities[table, CUE_INDEX] = cue_velocity(angle, power)
+    pocketed = np.zeros(positions.shape[:2], dtype=bool)
+
+    batch = simulate_batch(positions, velocities, pocketed)
+    for table, (angle, power) in enumerate(shots):
+        single = simulate_shot(initial, angle, power, 'fixed')
+        assert np.array_equal(batch['positions'][table], single.state.positions)
+        assert np.array_equal(batch['pocketed'][table], single.state.pocketed)
+
+def test_simulate_shots_matches_single_shots():
+    """Várias tacadas sobre a mesma mesa num lote: mesmos resultados que uma a uma"""
+    state = simulate_shot(TableState.initial(), 0.0, 80).state
+    state.respot_cue_ball()
+    shots = [(angle, 60.0) for angle in np.linspace(-3, 3, 12)]
+
+    for batched, (angle, power) in zip(simulate_shots(state, shots), shots):
+        single = simulate_shot(state, angle, power, 'fixed')
+        assert np.array_equal(batched.state.positions, single.state.positions)
+        assert batched.pocketed == single.pocketed
+        assert batched.first_hit == single.first_hit and batched.frames == single.frames
+
+@pytest.mark.parametrize('power', [20, 50, 80])
+def test_solvers_agree_on_head_on_hit(power):
+    """Branca contra uma bola: mesma bola tocada e posições próximas"""
+    state = TableState([(200.0, 200.0), (400.0, 200.0)], numbers=(0, 8))
+    event = simulate_shot(state, 0.0, power, 'event')
+    fixed = simulate_shot(state, 0.0, power, 'fixed')
+
+    assert event.first_hit == fixed.first_hit == 8
+    assert event.pocketed == fixed.pocketed
+    assert np.abs(event.state.positions - fixed.state.positions).max() < SOLVER_TOLERANCE
+
+@pytest.mark.parametrize('angle', [0.3, 1.0, 2.5])
+def test_solvers_agree_on_cushion_bounces(angle):
+    """Branca sozinha batendo nas tabelas: paradas próximas"""
+    state = TableState([(200.0, 150.0)], numbers=(0,))
+    event = simulate_shot(state, angle, 60, 'event')
+    fixed = simulate_shot(state, angle, 60, 'fixed')
+
+    assert event.pocketed == fixed.pocketed
+    assert np.abs(event.state.positions - fixed.state.positions).max() < SOLVER_TOLERANCE
+    assert_valid_table(event.state, 'event')
+    assert_valid_table(fixed.state, 'fixed')
@@ -0,0 +1,163 @@
+"""
+Teste do número de consultas das listagens de jogos e apostas
+
+Monta a API num banco SQLite em memória com páginas cheias e conta as
+consultas SQL de cada endpoint. O número não pode crescer com o tamanho
+da página (N+1). Os orçamentos contam o cache de cartões de jogador
+vazio (uma consulta a mais para os cartões da página).
+"""
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from src.models.database import db
+from src.models.user import User
+from src.models.game import Game, Bet
+from src.routes.game import game_bp
+from src.routes.betting import betting_bp
+from src.services.player_cards import PlayerCardService, player_cards
+
+# Consultas máximas por requisição
+QUERY_BUDGET = {
+    'GET /api/games/my-games': 2,
+    'GET /api/games/active': 2,
+    'GET /api/games/<id>': 4,  # jogo + cartões + jogadas do log (+ checagem de jogo em andamento)
+    'GET /api/betting/my-bets': 2,
+}
+
+PAGE_SIZE = 50
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    """API de jogos e apostas com banco em memória"""
+    return make_app((game_bp, '/api/games'), (betting_bp, '/api/betting'))
+
+@pytest.fixture(scope='module')
+def seed(app, create_users):
+    """Páginas cheias de jogos e apostas do primeiro jogador"""
+    with app.app_context():
+        users = create_users(PAGE_SIZE + 1, balance=100)
+        for i, user in enumerate(users):
+            user.skill_rating = 1000 + i * 10
+        me, others = users[0], users[1:]
+
+        for i, other in enumerate(others):
+            fees = Bet.calculate_fees(10)
+            bet = Bet(creator_id=me.id if i % 2 else other.id, opponent_id=other.id if i % 2 else me.id,
+                      amount=fees['amount'], platform_fee=fees['platform_fee'],
+                      total_prize=fees['total_prize'], status='completed')
+            db.session.add(bet)
+            db.session.flush()
+
+            db.session.add(Game(player1_id=me.id, player2_id=other.id, status='finished',
+                                winner_id=me.id if i % 3 else other.id, bet_id=bet.id))
+            db.session.add(Game(player1_id=other.id, status='waiting'))
+        db.session.commit()
+
+        return {
+            'headers': {'Authorization': f"Bearer {create_access_token(identity=me.id)}"},
+            'game_id': Game.query.filter_by(player1_id=me.id).first().id
+        }
+
+@pytest.fixture(scope='module')
+def request_with_budget(app, seed, capture_sql):
+    """Fazer a requisição e verificar o número de consultas"""
+    def request(name, path, expected_items=None):
+        client = app.test_client()
+        with capture_sql(app) as queries:
+            response = client.get(path, headers=seed['headers'])
+
+        assert response.status_code == 200, response.get_data(as_text=True)
+        if expected_items is not None:
+            items = next(iter(response.get_json().values()))
+            assert len(items) == expected_items, f"{name}: {len(items)} itens"
+
+        budget = QUERY_BUDGET[name]
+        assert len(queries) <= budget, f"{name}: {len(queries)} consultas (máximo {budget})"
+        return response.get_json()
+
+    return request
+
+def test_my_games(request_with_budget):
+    """Página cheia de jogos com oponentes"""
+    data = request_with_budget('GET /api/games/my-games', f'/api/games/my-games?limit={PAGE_SIZE}', PAGE_SIZE)
+    assert all('opponent' in game for game in data['games'])
+
+def test_active_games(request_with_budget):
+    """Jogos aguardando adversário com o criador"""
+    data = request_with_budget('GET /api/games/active', '/api/games/active?limit=20', 20)
+    assert all('creator' in game for game in data['games'])
+
+def test_get_game(request_with_budget, seed):
+    """Jogo finalizado com jogadores e aposta"""
+    data = request_with_budget('GET /api/games/<id>', f"/api/games/{seed['game_id']}")
+    assert data['game']['player1'] and data['game']['player2'] and data['game']['bet']
+
+def test_my_bets(request_with_budget):
+    """Todas as apostas do usuário com oponentes"""
+    data = request_with_budget('GET /api/betting/my-bets', f'/api/betting/my-bets?limit={PAGE_SIZE}', PAGE_SIZE)
+    assert all('opponent' in bet for bet in data['bets'])
+
+def test_cursor_walk(app, seed, capture_sql):
+    """Páginas seguidas pelo cursor: sem repetição, sem buraco, uma consulta cada"""
+    client = app.test_client()
+    headers = seed['headers']
+
+    for name, path, key in (('GET /api/games/my-games', '/api/games/my-games', 'games'),
+                            ('GET /api/betting/my-bets', '/api/betting/my-bets', 'bets')):
+        seen = []
+        cursor = None
+        while True:
+            url = f'{path}?limit=7' + (f'&cursor={cursor}' if cursor else '')
+            with capture_sql(app) as queries:
+                response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.get_data(as_text=True)
+            assert len(queries) <= QUERY_BUDGET[name], f"{name}: {len(queries)} consultas"
+
+            data = response.get_json()
+            seen.extend(item['id'] for item in data[key])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+
+        assert len(seen) == len(set(seen)) == PAGE_SIZE, f"{name}: {len(seen)} itens"
+        assert seen == sorted(seen, reverse=True)
+
+    response = client.get('/api/betting/my-bets?cursor=lixo', headers=headers)
+    assert response.status_code == 400
+
+def test_player_cards_cached(app, seed, capture_sql):
+    """Com o cache quente a página é uma consulta; invalidação traz o nome novo"""
+    client = app.test_client()
+    headers = seed['headers']
+    player_cards.clear()
+
+    with capture_sql(app) as queries:
+        data = client.get(f'/api/games/my-games?limit={PAGE_SIZE}', headers=headers).get_json()
+    assert len(queries) == 2, queries
+    assert not any('password_hash' in statement for statement, _ in queries), "User completo carregado"
+
+    with capture_sql(app) as queries:
+        client.get(f'/api/games/my-games?limit={PAGE_SIZE}', headers=headers)
+    assert len(queries) == 1, queries
+
+    opponent_id = data['games'][0]['opponent']['id']
+    with app.app_context():
+        db.session.get(User, opponent_id).name = 'Nome Novo'
+        db.session.commit()
+    player_cards.invalidate(opponent_id)
+
+    data = client.get(f'/api/games/my-games?limit={PAGE_SIZE}', headers=headers).get_json()
+    renamed = [game['opponent'] for game in data['games'] if game['opponent']['id'] == opponent_id]
+    assert renamed and all(card['name'] == 'Nome Novo' for card in renamed)
+
+def test_player_cards_bounded(app, seed):
+    """O LRU descarta os cartões menos usados acima do limite"""
+    cards = PlayerCardService(max_size=5)
+    with app.app_context():
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id).limit(8)]
+        assert len(cards.get_cards(user_ids)) == 8
+        cards.get_cards(user_ids[-5:])
+    stats = cards.stats()
+    assert stats['size'] == 5 and stats['hits'] == 5 and stats['misses'] == 8, stats
+    assert list(cards.cards) == user_ids[-5:]
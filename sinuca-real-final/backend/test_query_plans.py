@@ -0,0 +1,171 @@
+"""
+Teste dos planos de consulta das rotas
+
+Monta a API num banco SQLite em memória, chama cada rota GET e roda
+EXPLAIN QUERY PLAN em todas as consultas executadas. Falha quando uma
+consulta varre inteira uma tabela quente (jogos, apostas, transações)
+em vez de usar um índice.
+
+No PostgreSQL (TEST_DATABASE_URL=postgresql://...) o plano vem do EXPLAIN
+com enable_seqscan desligado: com tabelas pequenas o planejador prefere
+Seq Scan, então só sobra Seq Scan onde nenhum índice serve.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from src.models.database import db
+from src.models.user import User
+from src.models.game import Game, Bet
+from src.models.transaction import Transaction
+from src.models.tournament import Tournament
+from src.services.pagination import Keyset, paginate
+from src.routes.auth import auth_bp
+from src.routes.user import user_bp
+from src.routes.game import game_bp
+from src.routes.betting import betting_bp
+from src.routes.matchmaking import matchmaking_bp
+from src.routes.tournament import tournament_bp
+
+# Tabelas que crescem com o uso e não podem ser varridas em rota
+HOT_TABLES = {'games', 'bets', 'transactions'}
+
+# Rotas GET verificadas (as de eventos SSE ficam de fora: não terminam)
+ROUTES = [
+    '/api/auth/profile',
+    '/api/users/leaderboard',
+    '/api/users/search?q=jog',
+    '/api/users/{user_id}',
+    '/api/users/wallet',
+    '/api/users/stats',
+    '/api/games/{game_id}',
+    '/api/games/{game_id}/state',
+    '/api/games/{game_id}/replay',
+    '/api/games/my-games',
+    '/api/games/live',
+    '/api/games/active',
+    '/api/betting/bets',
+    '/api/betting/my-bets',
+    '/api/betting/history',
+    '/api/matchmaking/queue',
+    '/api/matchmaking/stats',
+    '/api/tournaments/',
+    '/api/tournaments/{tournament_id}',
+]
+
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    """API completa (sem pagamentos) com banco em memória"""
+    return make_app(
+        (auth_bp, '/api/auth'),
+        (user_bp, '/api/users'),
+        (game_bp, '/api/games'),
+        (betting_bp, '/api/betting'),
+        (matchmaking_bp, '/api/matchmaking'),
+        (tournament_bp, '/api/tournaments'),
+    )
+
+@pytest.fixture(scope='module')
+def ids(app, create_users):
+    """Algumas linhas em cada tabela"""
+    with app.app_context():
+        users = create_users(10, balance=100)
+        me = users[0]
+
+        for other in users[1:]:
+            fees = Bet.calculate_fees(10)
+            bet = Bet(creator_id=me.id, opponent_id=other.id, amount=fees['amount'],
+                      platform_fee=fees['platform_fee'], total_prize=fees['total_prize'],
+                      status='completed')
+            db.session.add(bet)
+            db.session.flush()
+            db.session.add(Game(player1_id=me.id, player2_id=other.id, status='finished',
+                                winner_id=me.id, bet_id=bet.id))
+            db.session.add(Transaction(user_id=me.id, amount=10, type='bet_win',
+                                       external_reference=f'ref_{other.id}'))
+
+        tournament = Tournament(name='Copa', creator_id=me.id, max_players=8, entry_fee=10,
+                                starts_at=datetime.utcnow() + timedelta(hours=1))
+        db.session.add(tournament)
+        db.session.commit()
+
+        return {
+            'token': create_access_token(identity=me.id),
+            'user_id': me.id,
+            'game_id': Game.query.first().id,
+            'tournament_id': tournament.id
+        }
+
+def table_scans(connection, statement, parameters):
+    """Tabelas quentes varridas sem índice no plano da consulta"""
+    scans = []
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        plan = connection.exec_driver_sql(f'EXPLAIN {statement}', parameters).all()
+        for (detail,) in plan:
+            match = POSTGRES_SCAN.search(detail)
+            if match and match.group(1) in HOT_TABLES:
+                scans.append(detail.strip())
+        return scans
+
+    plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    for row in plan:
+        detail = row[-1]
+        match = SQLITE_SCAN.match(detail)
+        if match and match.group(1) in HOT_TABLES and 'USING' not in detail:
+            scans.append(detail)
+    return scans
+
+def capture_selects(app, ids, capture_sql, path):
+    """Fazer a requisição e devolver as consultas SELECT executadas"""
+    with capture_sql(app, 'SELECT') as selects:
+        response = app.test_client().get(path, headers={'Authorization': f"Bearer {ids['token']}"})
+
+    assert response.status_code < 500, f"{path}: {response.get_data(as_text=True)}"
+    return selects
+
+def assert_indexed(app, name, selects):
+    """Verificar o plano de cada consulta"""
+    with app.app_context():
+        connection = db.session.connection()
+        for statement, parameters in selects:
+            scans = table_scans(connection, statement, parameters)
+            assert not scans, f"{name}: {', '.join(scans)}\n{statement}"
+
+def test_route_query_plans(app, ids, capture_sql):
+    """Nenhuma rota GET varre jogos, apostas ou transações"""
+    for route in ROUTES:
+        path = route.format(**ids)
+        assert_indexed(app, f'GET {route}', capture_selects(app, ids, capture_sql, path))
+
+def test_cursor_pages(app, ids, capture_sql):
+    """Segunda página das listagens (filtro do cursor) também usa índice"""
+    client = app.test_client()
+    headers = {'Authorization': f"Bearer {ids['token']}"}
+    for route in ('/api/users/leaderboard', '/api/games/my-games',
+                  '/api/betting/my-bets', '/api/betting/history'):
+        cursor = client.get(f'{route}?limit=2', headers=headers).get_json()['next_cursor']
+        assert cursor, route
+        selects = capture_selects(app, ids, capture_sql, f'{route}?limit=2&cursor={cursor}')
+        assert_indexed(app, f'GET {route} (cursor)', selects)
+
+def test_payment_lookups(app, ids, capture_sql):
+    """Buscas do webhook e do status de pagamento (rotas exigem o SDK do gateway)"""
+    user_id = ids['user_id']
+    with capture_sql(app) as selects, app.app_context():
+        Transaction.query.filter_by(external_reference='ref_2').first()
+        Transaction.query.filter_by(external_id='123', user_id=user_id).first()
+        Transaction.get_user_transactions(user_id)
+        # Extrato paginado de /api/payments/transactions (segunda página)
+        keyset = Keyset(Transaction.created_at, Transaction.id)
+        first = paginate(Transaction.query.filter_by(user_id=user_id), keyset, 2)
+        keys, offset = keyset.decode(first.next_cursor)
+        paginate(Transaction.query.filter_by(user_id=user_id), keyset, 2, keys, offset)
+
+    assert_indexed(app, 'pagamentos', selects)
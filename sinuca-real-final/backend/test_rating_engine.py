@@ -0,0 +1,74 @@
+"""
+Teste do motor de rating Glicko-2
+
+Confere a atualização contra o exemplo do artigo do Glickman ("Example
+of the Glicko-2 system": 1500/200/0,06 contra 1400/30, 1550/100 e
+1700/300, resultados 1, 0, 0) e que o recálculo em ondas dá o mesmo que
+aplicar as partidas uma a uma, na ordem, com `apply_result` (como a
+liquidação faz).
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.services.rating_engine import (
+    INITIAL_DEVIATION, INITIAL_RATING, INITIAL_VOLATILITY, glicko2_update, rating_engine, recompute
+)
+
+PLAYERS = 6
+GAMES = 40
+
+@pytest.fixture(scope='module')
+def history():
+    """Histórico curto com vitórias, derrotas e empates entre poucos jogadores"""
+    rng = np.random.default_rng(3)
+    player1 = rng.integers(0, PLAYERS, GAMES)
+    player2 = (player1 + rng.integers(1, PLAYERS, GAMES)) % PLAYERS
+    score1 = rng.choice([1.0, 0.0, 0.5], GAMES)
+    return player1, player2, score1
+
+def test_glickman_worked_example():
+    rating, deviation, volatility = glicko2_update(
+        [1500], [200], [0.06], [[1400, 1550, 1700]], [[30, 100, 300]], [[1, 0, 0]]
+    )
+    assert rating[0] == pytest.approx(1464.06, abs=1e-2)
+    assert deviation[0] == pytest.approx(151.52, abs=1e-2)
+    assert volatility[0] == pytest.approx(0.05999, abs=1e-5)
+
+def test_single_game_matches_period_of_one():
+    """Um oponente por jogador é o mesmo que um período de uma partida"""
+    args = [1500, 1320], [200, 80], [0.06, 0.05]
+    single = glicko2_update(*args, [1400, 1700], [30, 300], [1, 0.5])
+    period = glicko2_update(*args, [[1400], [1700]], [[30], [300]], [[1], [0.5]])
+    for a, b in zip(single, period):
+        assert np.allclose(a, b)
+
+def test_recompute_matches_apply_result(history):
+    """Ondas vetorizadas == `apply_result` partida a partida, na ordem
+
+    `User.skill_rating` é inteiro: a cada partida o rating de `apply_result`
+    é o valor exato arredondado, e o valor exato segue para a próxima.
+    """
+    player1, player2, score1 = history
+    ids, rating, deviation, volatility = recompute(player1, player2, score1)
+
+    state = {p: (float(INITIAL_RATING), INITIAL_DEVIATION, INITIAL_VOLATILITY) for p in range(PLAYERS)}
+    for p1, p2, s1 in zip(player1.tolist(), player2.tolist(), score1.tolist()):
+        users = [SimpleNamespace(id=p, skill_rating=state[p][0], rating_deviation=state[p][1],
+                                 rating_volatility=state[p][2]) for p in (p1, p2)]
+        winner_id = p1 if s1 == 1 else p2 if s1 == 0 else None
+        rating_engine.apply_result(*users, winner_id)
+
+        (r1, d1, v1), (r2, d2, v2) = state[p1], state[p2]
+        exact = glicko2_update([r1, r2], [d1, d2], [v1, v2], [r2, r1], [d2, d1], [s1, 1 - s1])
+        for i, user in enumerate(users):
+            assert user.skill_rating == round(exact[0][i])
+            assert user.rating_deviation == exact[1][i] and user.rating_volatility == exact[2][i]
+            state[user.id] = tuple(float(column[i]) for column in exact)
+
+    expected = np.array([state[p] for p in ids.tolist()])
+    assert np.allclose(rating, expected[:, 0], atol=1e-9)
+    assert np.allclose(deviation, expected[:, 1], atol=1e-9)
+    assert np.allclose(volatility, expected[:, 2], atol=1e-12)
@@ -0,0 +1,102 @@
+"""
+Teste do verificador de replays
+
+Uma partida inteira é jogada pelas regras do servidor com tacadas
+sorteadas (semente fixa). O histórico honesto confirma o vencedor, também
+depois de gravado no formato binário; históricos adulterados (tacada fora
+da vez, tacada alterada, branca movida sem bola na mão, partida cortada)
+e vencedor trocado são recusados.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from src.services.match_rules import MatchState
+from src.services.replay_verifier import replay, replay_verifier, verify_result
+from src.services.table_codec import append_shot, decode_shots
+
+PLAYER1, PLAYER2 = 1, 2
+SEED = 3
+MAX_SHOTS = 2000
+
+@pytest.fixture(scope='module')
+def match():
+    """Partida jogada até o fim com tacadas sorteadas pela semente"""
+    rng = np.random.default_rng(SEED)
+    match = MatchState(PLAYER1, PLAYER2)
+    ball_in_hand = []
+    while match.winner_id is None and len(match.shots) < MAX_SHOTS:
+        ball_in_hand.append(match.ball_in_hand)
+        match.apply_shot(match.turn, rng.uniform(-math.pi, math.pi), rng.uniform(20, 100))
+    assert match.winner_id in (PLAYER1, PLAYER2)
+    match.ball_in_hand_before = ball_in_hand
+    return match
+
+def tampered(shots, index, **changes):
+    """Cópia do histórico com campos de uma tacada trocados"""
+    fields = ('player_id', 'angle', 'power', 'cue_x', 'cue_y')
+    shots = [list(shot) for shot in shots]
+    for field, value in changes.items():
+        shots[index][fields.index(field)] = value
+    return shots
+
+def test_honest_log_verifies(match):
+    """Histórico honesto: mesmo vencedor, mesma mesa final"""
+    assert verify_result(PLAYER1, PLAYER2, match.shots, match.winner_id) == (True, "Vencedor confirmado")
+
+    replayed, _ = replay(PLAYER1, PLAYER2, match.shots)
+    assert np.array_equal(replayed.table.positions, match.table.positions)
+    assert np.array_equal(replayed.table.pocketed, match.table.pocketed)
+
+def test_binary_log_verifies(match):
+    """Histórico gravado em `Game.shot_log` (formato binário) também confere"""
+    log = b''
+    for shot in match.shots:
+        log = append_shot(log, shot, PLAYER1, PLAYER2)
+    shots = decode_shots(log, PLAYER1, PLAYER2)
+
+    assert shots == match.shots
+    assert verify_result(PLAYER1, PLAYER2, shots, match.winner_id)[0]
+
+def test_wrong_winner_rejected(match):
+    loser = PLAYER2 if match.winner_id == PLAYER1 else PLAYER1
+    assert verify_result(PLAYER1, PLAYER2, match.shots, loser) == \
+        (False, "Vencedor não confere com o histórico de tacadas")
+
+def test_shot_out_of_turn_rejected(match):
+    """Tacada atribuída ao jogador que não tinha a vez"""
+    shots = tampered(match.shots, 0, player_id=PLAYER2)
+    assert verify_result(PLAYER1, PLAYER2, shots, match.winner_id) == \
+        (False, "Tacada 1 inválida: Não é sua vez")
+
+def test_altered_shot_rejected(match):
+    """Última tacada (a que decidiu a partida) com outro ângulo e força"""
+    last = match.shots[-1]
+    shots = tampered(match.shots, len(match.shots) - 1, angle=-last[1], power=5.0)
+    verified, message = verify_result(PLAYER1, PLAYER2, shots, match.winner_id)
+    assert not verified, message
+
+def test_cue_moved_without_ball_in_hand_rejected(match):
+    """Branca reposicionada numa tacada sem bola na mão"""
+    index = match.ball_in_hand_before.index(False, 1)
+    shot = match.shots[index]
+    shots = tampered(match.shots, index, cue_x=shot[3] + 5.0)
+    assert verify_result(PLAYER1, PLAYER2, shots, match.winner_id) == \
+        (False, f"Tacada {index + 1} inválida: Branca só pode ser reposicionada com bola na mão")
+
+def test_truncated_log_rejected(match):
+    assert verify_result(PLAYER1, PLAYER2, match.shots[:-1], match.winner_id) == \
+        (False, "Histórico de tacadas não termina a partida")
+
+def test_verify_many_keeps_order(match):
+    """Lote misto: cada partida com o seu resultado, na ordem dos jobs"""
+    loser = PLAYER2 if match.winner_id == PLAYER1 else PLAYER1
+    jobs = [
+        (10, PLAYER1, PLAYER2, match.shots, match.winner_id),
+        (11, PLAYER1, PLAYER2, match.shots, loser),
+        (12, PLAYER1, PLAYER2, tampered(match.shots, 0, player_id=PLAYER2), match.winner_id),
+    ]
+    results = replay_verifier.verify_many(jobs)
+    assert [(game_id, verified) for game_id, verified, _ in results] == [(10, True), (11, False), (12, False)]
@@ -0,0 +1,190 @@
+"""
+Teste da liquidação em lote dos jogos finalizados
+
+`finish_game` grava só o resultado e a linha de liquidação pendente; o
+worker liquida os jogos em lotes. Confere que o lote paga os prêmios,
+atualiza estatísticas e rating com um número fixo de UPDATEs em users
+(não um por jogo), que o livro de apostas passa a usar o rating novo do
+criador, que dois workers ao mesmo tempo não pagam duas vezes,
+que o jogo não é finalizado duas vezes e que a métrica de atraso reflete
+a fila.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from src.models.database import db
+from src.models.user import User
+from src.models.game import Game, Bet
+from src.models.settlement import Settlement
+from src.models.transaction import Transaction
+from src.services.bet_book import bet_book
+from src.services.ledger import ledger
+from src.services.settlement import SettlementWorker
+
+PLAYERS = 20
+BET_AMOUNT = Decimal('10.00')
+INITIAL_BALANCE = Decimal('1000.00')
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    return make_app(production=True)
+
+@pytest.fixture(scope='module')
+def user_ids(app, create_users):
+    """PLAYERS jogadores"""
+    with app.app_context():
+        return [user.id for user in create_users(PLAYERS, balance=INITIAL_BALANCE)]
+
+@pytest.fixture(scope='module')
+def finished_games(user_ids, open_bet):
+    """`finished_games(count)`: jogos com aposta, finalizados (vence o criador) e não liquidados"""
+    def finish(count):
+        games = []
+        for i in range(count):
+            creator_id, opponent_id = user_ids[i % PLAYERS], user_ids[(i + 1) % PLAYERS]
+            bet = open_bet(creator_id, BET_AMOUNT)
+            assert bet.accept_bet(opponent_id)[0]
+
+            game = Game.query.filter_by(bet_id=bet.id).one()
+            game.status = 'playing'
+            db.session.commit()
+            assert game.finish_game(creator_id) == (True, "Jogo finalizado")
+            games.append(game.id)
+        return games
+
+    return finish
+
+def to_decimal(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+def test_finish_records_only_the_result(app, finished_games):
+    """Fim do jogo: resultado e liquidação pendente; prêmio e estatísticas depois"""
+    with app.app_context():
+        game_id, = finished_games(1)
+        game = db.session.get(Game, game_id)
+        winner = db.session.get(User, game.winner_id)
+        assert game.status == 'finished'
+        assert game.bet.status == 'matched'
+        assert winner.games_played == 0 and winner.balance == INITIAL_BALANCE - BET_AMOUNT
+        assert Settlement.query.filter_by(game_id=game_id, status='pending').count() == 1
+
+        # Segundo fim do mesmo jogo é recusado: nada a liquidar de novo
+        assert game.finish_game(game.player2_id) == (False, "Jogo não está em andamento")
+        assert Settlement.query.filter_by(game_id=game_id).count() == 1
+
+        assert SettlementWorker().settle_pending() == 1
+        winner = db.session.get(User, game.winner_id)
+        assert winner.games_played == 1 and winner.games_won == 1
+        assert winner.balance == INITIAL_BALANCE - BET_AMOUNT + game.bet.total_prize
+        assert db.session.get(Bet, game.bet_id).status == 'completed'
+
+        prize = Transaction.query.filter_by(bet_id=game.bet_id, type='bet_win').one()
+        assert prize.user_id == winner.id and prize.amount == game.bet.total_prize
+        assert prize.description == f'Prêmio da aposta #{game.bet_id} - R$ {game.bet.total_prize:.2f}'
+
+def test_batch_uses_bulk_updates(app, finished_games, capture_sql):
+    """Lotes de 10 e de 100 jogos: o mesmo número de UPDATEs em users"""
+    with app.app_context():
+        worker = SettlementWorker()
+        updates = {}
+        for size in (10, 100):
+            finished_games(size)
+            with capture_sql(app, 'UPDATE users') as statements:
+                assert worker.settle_pending() == size
+            updates[size] = len(statements)
+
+        assert updates[10] == updates[100] <= 2, updates
+        assert Settlement.query.filter_by(status='pending').count() == 0
+
+        users = User.query.all()
+        games = Game.query.filter_by(status='finished').count()
+        assert sum(user.games_played for user in users) == games * 2
+        assert sum(user.games_won for user in users) == games
+        assert Bet.query.filter_by(status='matched').count() == 0
+        fees = Bet.query.with_entities(db.func.sum(Bet.platform_fee)).scalar()
+        assert sum(user.balance for user in users) == INITIAL_BALANCE * PLAYERS - to_decimal(fees)
+        assert ledger.verify() == []
+
+def test_open_bets_follow_new_rating(app, user_ids, finished_games, open_bet):
+    """Aposta aberta de quem teve o rating alterado: re-indexada com o rating novo"""
+    with app.app_context():
+        SettlementWorker().settle_pending()
+        creator_id = user_ids[0]
+        open_id = open_bet(creator_id, BET_AMOUNT).id
+        bet_book.load()
+        old_rating = db.session.get(User, creator_id).skill_rating
+
+        finished_games(PLAYERS)  # o criador ganha um jogo e perde outro
+        SettlementWorker().settle_pending()
+        new_rating = db.session.get(User, creator_id).skill_rating
+        assert new_rating != old_rating
+
+        entry = bet_book.entries[open_id]
+        assert entry.rating == new_rating and entry.data['creator']['skill_rating'] == new_rating
+        found = bet_book.search(rating=new_rating, rating_window=0, exclude_user_id=-1, limit=100)
+        assert open_id in [bet['id'] for bet in found]
+
+        # Aceite pelo rating atual do criador
+        assert bet_book.best_match(user_ids[5], new_rating, rating_window=0) == open_id
+        bet_book.clear()
+
+def test_concurrent_workers_pay_once(app, finished_games):
+    """Dois workers ao mesmo tempo: cada jogo liquidado e pago uma vez"""
+    with app.app_context():
+        games = finished_games(40)
+        balances = dict(User.query.with_entities(User.id, User.balance).all())
+
+    settled = []
+    barrier = threading.Barrier(2)
+
+    def work():
+        worker = SettlementWorker(batch_size=10)
+        with app.app_context():
+            barrier.wait()
+            while True:
+                count = worker.settle_pending()
+                if not count:
+                    break
+                settled.append(count)
+
+    threads = [threading.Thread(target=work) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(settled) == len(games), settled
+    with app.app_context():
+        for game_id in games:
+            bet = db.session.get(Game, game_id).bet
+            assert bet.status == 'completed'
+            assert ledger.balance(bet.escrow_account) == 0
+        after = dict(User.query.with_entities(User.id, User.balance).all())
+        paid = sum(after.values()) - sum(balances.values())
+        prize = Bet.calculate_fees(BET_AMOUNT)['total_prize']
+        assert paid == to_decimal(prize) * len(games), paid
+        assert ledger.verify() == []
+
+def test_lag_metric(app, finished_games):
+    """Atraso da fila: idade da liquidação pendente mais antiga"""
+    with app.app_context():
+        worker = SettlementWorker()
+        worker.settle_pending()
+        assert worker.stats()['pending'] == 0 and worker.stats()['lag_seconds'] == 0.0
+
+        game_id, = finished_games(1)
+        settlement = Settlement.query.filter_by(game_id=game_id).one()
+        settlement.created_at = datetime.utcnow() - timedelta(seconds=30)
+        db.session.commit()
+
+        stats = worker.stats()
+        assert stats['pending'] == 1 and stats['lag_seconds'] >= 30, stats
+
+        worker.settle_pending()
+        stats = worker.stats()
+        assert stats['pending'] == 0 and stats['lag_seconds'] == 0.0
+        assert stats['batches'] == 1 and stats['failed'] == 0
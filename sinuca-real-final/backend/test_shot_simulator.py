@@ -0,0 +1,62 @@
+"""
+Teste da simulação de tacadas candidatas (`/simulate`)
+
+Confere que o pool só usa fork enquanto o processo tem uma única thread
+(depois, forkserver ou spawn) e que a rota recusa força inválida (NaN,
+infinita, negativa ou acima de 100) antes de simular.
+"""
+
+import threading
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from src.models.database import db
+from src.models.game import Game
+from src.routes.game import game_bp
+from src.services.shot_simulator import ShotSimulator
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    return make_app((game_bp, '/api/games'))
+
+@pytest.fixture(scope='module')
+def game(app, create_users):
+    """Jogo esperando (mesa inicial) e o token do criador"""
+    with app.app_context():
+        player1, player2 = create_users(2)
+        game = Game(player1_id=player1.id, player2_id=player2.id)
+        db.session.add(game)
+        db.session.commit()
+        return game.id, {'Authorization': f"Bearer {create_access_token(identity=player1.id)}"}
+
+def test_pool_avoids_fork_once_threads_run():
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait, daemon=True)
+    thread.start()
+    try:
+        executor = ShotSimulator(workers=2)._create()
+        assert executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+        executor.shutdown()
+    finally:
+        stop.set()
+        thread.join()
+
+@pytest.mark.parametrize('power', ['NaN', 'Infinity', -10, 0, 100.5])
+def test_simulate_rejects_invalid_power(app, game, power):
+    game_id, headers = game
+    body = '{"shots": [{"angle": 0.0, "power": 50}, {"angle": 0.1, "power": %s}]}' % power
+    response = app.test_client().post(f'/api/games/{game_id}/simulate', data=body,
+                                      content_type='application/json', headers=headers)
+    assert response.status_code == 400, response.get_json()
+
+def test_simulate_valid_shots(app, game):
+    game_id, headers = game
+    response = app.test_client().post(f'/api/games/{game_id}/simulate', headers=headers, json={
+        'shots': [{'angle': 0.0, 'power': 50}, {'angle': 0.05, 'power': 100}],
+        'include_table': False
+    })
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['power'] for result in results] == [50, 100]
+    assert all(result['first_hit'] is not None for result in results)
@@ -0,0 +1,131 @@
+"""
+Teste da codificação binária da mesa e do histórico de tacadas
+
+Confere a ida e volta da mesa (posições em 1/64 px: erro de no máximo
+1/128 px, e exata para posições já quantizadas), o registro fixo de
+tacada `<BiHHH` (11 bytes; ângulo em µrad, força em centésimos) e que
+um banco anterior às colunas binárias ganha `games.table_state` e
+`games.shot_log` pela migração, com os jogos antigos lidos do JSON.
+"""
+
+import math
+import struct
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from src.models.database import db
+from src.models.game import Game
+from src.migrations import applied_versions, m0001_game_and_rating_columns, upgrade
+from src.services.physics_engine import BALL_NUMBERS, MAX_X, MAX_Y, MIN_X, MIN_Y, TableState
+from src.services.table_codec import (
+    ANGLE_SCALE, FORMAT_VERSION, POSITION_SCALE, POWER_SCALE,
+    append_shot, decode_shots, decode_table, encode_shot, encode_table,
+    quantize_angle, quantize_position, quantize_power
+)
+
+SEED = 7
+PLAYER1, PLAYER2 = 11, 22
+
+def random_table(rng):
+    """Mesa com posições quaisquer (não quantizadas) e algumas bolas encaçapadas"""
+    count = len(BALL_NUMBERS)
+    positions = np.column_stack([rng.uniform(MIN_X, MAX_X, count), rng.uniform(MIN_Y, MAX_Y, count)])
+    return TableState(positions, pocketed=rng.random(count) < 0.3)
+
+def test_table_round_trip_within_quantization():
+    """Ida e volta: erro ≤ 1/128 px, posições múltiplas de 1/64 e encaçapadas iguais"""
+    rng = np.random.default_rng(SEED)
+    for _ in range(50):
+        state = random_table(rng)
+        blob = encode_table(state)
+        assert len(blob) == 4 + 4 * len(BALL_NUMBERS)
+
+        decoded = decode_table(blob)
+        assert decoded.numbers == BALL_NUMBERS
+        assert np.array_equal(decoded.pocketed, state.pocketed)
+        assert np.abs(decoded.positions - state.positions).max() <= 0.5 / POSITION_SCALE
+        assert np.array_equal(decoded.positions * POSITION_SCALE, np.rint(decoded.positions * POSITION_SCALE))
+
+        # Mesa já quantizada volta bit a bit
+        assert encode_table(decoded) == blob
+        assert np.array_equal(decode_table(blob).positions, decoded.positions)
+
+def test_table_bounds_fit_the_format():
+    """Cantos da mesa cabem no inteiro de 16 bits e voltam exatos"""
+    positions = [(MIN_X, MIN_Y), (MAX_X, MAX_Y)] + [(MIN_X, MAX_Y)] * (len(BALL_NUMBERS) - 2)
+    state = TableState(positions)
+    assert np.array_equal(decode_table(encode_table(state)).positions, state.positions)
+    assert MAX_X * POSITION_SCALE < 2 ** 16 and MAX_Y * POSITION_SCALE < 2 ** 16
+
+def test_table_rejects_unknown_version_and_balls():
+    blob = bytearray(encode_table(TableState.initial()))
+    blob[0] = FORMAT_VERSION + 1
+    with pytest.raises(ValueError):
+        decode_table(bytes(blob))
+    with pytest.raises(ValueError):
+        encode_table(TableState([(100.0, 100.0)], numbers=(0,)))
+
+def test_shot_record_layout():
+    """Registro `<BiHHH`: jogador 0/1, ângulo em µrad, força em centésimos, branca em 1/64 px"""
+    shot = [PLAYER2, -1.234567, 87.65, 100.5, 200.25]
+    record = encode_shot(shot, PLAYER1, PLAYER2)
+
+    assert len(record) == struct.calcsize('<BiHHH') == 11
+    assert struct.unpack('<BiHHH', record) == (1, -1234567, 8765, 100 * 64 + 32, 200 * 64 + 16)
+    with pytest.raises(ValueError):
+        encode_shot([33, 0.0, 50.0, 100.0, 100.0], PLAYER1, PLAYER2)
+
+def test_shot_log_round_trip():
+    """Histórico: quantizado na gravação, exato depois de quantizado"""
+    rng = np.random.default_rng(SEED)
+    shots = [[(PLAYER1, PLAYER2)[i % 2], rng.uniform(-math.pi, math.pi), rng.uniform(0, 100),
+              rng.uniform(MIN_X, MAX_X), rng.uniform(MIN_Y, MAX_Y)] for i in range(100)]
+
+    log = b''
+    for shot in shots:
+        log = append_shot(log, shot, PLAYER1, PLAYER2)
+    assert log[0] == FORMAT_VERSION and len(log) == 1 + 11 * len(shots)
+
+    decoded = decode_shots(log, PLAYER1, PLAYER2)
+    for shot, (player_id, angle, power, cue_x, cue_y) in zip(shots, decoded):
+        assert player_id == shot[0]
+        assert abs(angle - shot[1]) <= 0.5 / ANGLE_SCALE and angle == quantize_angle(shot[1])
+        assert abs(power - shot[2]) <= 0.5 / POWER_SCALE and power == quantize_power(shot[2])
+        assert cue_x == quantize_position(shot[3]) and cue_y == quantize_position(shot[4])
+
+    # Reescrever o histórico decodificado não muda nenhum byte
+    again = b''
+    for shot in decoded:
+        again = append_shot(again, shot, PLAYER1, PLAYER2)
+    assert again == log
+    assert decode_shots(b'', PLAYER1, PLAYER2) == []
+
+def test_migration_adds_binary_columns(make_app, create_users):
+    """Banco anterior às colunas binárias: a migração as cria e jogos antigos leem o JSON"""
+    app = make_app()
+    with app.app_context():
+        player1_id, player2_id = [user.id for user in create_users(2)]
+        game = Game(player1_id=player1_id, player2_id=player2_id, status='playing',
+                    game_data='{"shots": [[%d, 0.5, 40.0, 200.0, 200.0]]}' % player1_id)
+        db.session.add(game)
+        db.session.commit()
+        game_id = game.id
+        db.session.remove()
+
+        # Banco de antes da migração: sem as colunas e sem o registro da versão
+        # (schema_migrations não é recriada com as tabelas dos modelos)
+        applied_versions(db.engine)
+        with db.engine.begin() as conn:
+            conn.execute(text('ALTER TABLE games DROP COLUMN table_state'))
+            conn.execute(text('ALTER TABLE games DROP COLUMN shot_log'))
+            conn.execute(text('DELETE FROM schema_migrations WHERE version = :version'),
+                         {'version': m0001_game_and_rating_columns.VERSION})
+
+        upgrade(db.engine, verbose=False)
+
+        game = db.session.get(Game, game_id)
+        assert game.table_state is None and game.shot_log is None
+        assert game.load_shots() == [[player1_id, 0.5, 40.0, 200.0, 200.0]]
+        assert game.load_table().numbers == BALL_NUMBERS
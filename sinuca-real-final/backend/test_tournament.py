@@ -0,0 +1,221 @@
+"""
+Teste dos torneios: inscrições, chave e prêmio
+
+Confere o dinheiro retido (inscrição, saída e cancelamento devolvem o
+valor ao jogador e zeram o escrow), a forma da chave de 8 jogadores nas
+eliminações simples e dupla (com e sem byes), o avanço pelos resultados
+até o pagamento do campeão, que um jogo de torneio só termina com
+histórico de tacadas e que um horário com fuso é gravado em UTC.
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from src.models.database import db
+from src.models.user import User
+from src.models.game import Game
+from src.models.tournament import Tournament, TournamentEntry, TournamentMatch
+from src.routes.game import game_bp
+from src.routes.tournament import tournament_bp
+from src.services.ledger import PLATFORM_FEE, ledger
+from src.services.tournament_engine import seed_order, tournament_engine
+
+ENTRY_FEE = Decimal('10.00')
+INITIAL_BALANCE = Decimal('100.00')
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    return make_app((game_bp, '/api/games'), (tournament_bp, '/api/tournaments'))
+
+@pytest.fixture
+def players(app, create_users):
+    """`players(count)`: jogadores com skill_rating decrescente (o primeiro é a semente 1)"""
+    def create(count):
+        users = create_users(count, balance=INITIAL_BALANCE)
+        for i, user in enumerate(users):
+            user.skill_rating = 2000 - 10 * i
+        db.session.commit()
+        return users
+
+    with app.app_context():
+        yield create
+
+def new_tournament(creator, tournament_format='single', max_players=8, entry_fee=ENTRY_FEE):
+    tournament = Tournament(name='Copa', creator_id=creator.id, format=tournament_format,
+                            max_players=max_players, entry_fee=entry_fee,
+                            starts_at=datetime.utcnow() + timedelta(minutes=15))
+    tournament.save()
+    return tournament
+
+def started(users, tournament_format='single'):
+    """Torneio com os jogadores inscritos, já iniciado"""
+    tournament = new_tournament(users[0], tournament_format)
+    for user in users:
+        assert tournament.join(user)[0]
+    assert tournament_engine.start_tournament(tournament) == (True, "Torneio iniciado")
+    return tournament
+
+def nodes(tournament, bracket=None):
+    query = TournamentMatch.query.filter_by(tournament_id=tournament.id)
+    if bracket:
+        query = query.filter_by(bracket=bracket)
+    return query.order_by(TournamentMatch.round, TournamentMatch.position).all()
+
+def balance(user):
+    return db.session.get(User, user.id).balance
+
+def play_round(tournament, winner=lambda match: match.player1_id):
+    """Finalizar os jogos em andamento do torneio e avançar a chave"""
+    playing = TournamentMatch.query.filter_by(tournament_id=tournament.id, status='playing').all()
+    for match in playing:
+        game = db.session.get(Game, match.game_id)
+        assert game.finish_game(winner(match))[0]
+    assert tournament_engine.process_pending() == len(playing)
+    return len(playing)
+
+def test_join_leave_and_cancel_balances(players):
+    """Inscrição debita e retém; saída e cancelamento devolvem e zeram o escrow"""
+    users = players(3)
+    tournament = new_tournament(users[0])
+
+    for user in users:
+        assert tournament.join(user) == (True, "Inscrição realizada")
+    assert tournament.join(users[0]) == (False, "Você já está inscrito")
+    assert [balance(user) for user in users] == [INITIAL_BALANCE - ENTRY_FEE] * 3
+    assert tournament.prize_pool == 3 * ENTRY_FEE and tournament.players_count == 3
+    assert ledger.balance(tournament.escrow_account) == 3 * ENTRY_FEE
+
+    assert tournament.leave(users[2]) == (True, "Inscrição cancelada")
+    assert tournament.leave(users[2]) == (False, "Você não está inscrito")
+    assert balance(users[2]) == INITIAL_BALANCE
+    assert tournament.prize_pool == 2 * ENTRY_FEE and tournament.players_count == 2
+
+    assert tournament.cancel() == (True, "Torneio cancelado")
+    assert [balance(user) for user in users] == [INITIAL_BALANCE] * 3
+    assert ledger.balance(tournament.escrow_account) == 0
+    assert tournament.join(users[2]) == (False, "Inscrições encerradas")
+    assert tournament_engine.start_tournament(tournament) == (False, "Torneio já começou")
+
+def test_join_without_balance(players):
+    user, = players(1)
+    tournament = new_tournament(user, entry_fee=INITIAL_BALANCE + 1)
+    assert tournament.join(user) == (False, "Saldo insuficiente")
+    assert balance(user) == INITIAL_BALANCE and tournament.players_count == 0
+
+def test_single_elimination_bracket_of_eight(players):
+    """Sementes nos cruzamentos padrão (1x8, 4x5, 2x7, 3x6) e ligações até a final"""
+    users = players(8)
+    tournament = started(users)
+    matches = nodes(tournament)
+
+    assert [m.round for m in matches] == [1] * 4 + [2] * 2 + [3]
+    first, second, final = matches[:4], matches[4:6], matches[6]
+    seeds = [[users.index(db.session.get(User, p)) + 1 for p in (m.player1_id, m.player2_id)]
+             for m in first]
+    assert seeds == [[1, 8], [4, 5], [2, 7], [3, 6]] and seed_order(8) == [1, 8, 4, 5, 2, 7, 3, 6]
+    assert all(m.status == 'playing' and m.game.tournament_id == tournament.id for m in first)
+
+    assert [(m.next_match_id, m.next_slot) for m in first] == \
+        [(second[0].id, 1), (second[0].id, 2), (second[1].id, 1), (second[1].id, 2)]
+    assert [(m.next_match_id, m.next_slot) for m in second] == [(final.id, 1), (final.id, 2)]
+    assert final.next_match_id is None
+    assert all(m.loser_match_id is None for m in matches)
+    assert [e.seed for e in TournamentEntry.query.filter_by(tournament_id=tournament.id)
+                                                 .order_by(TournamentEntry.seed)] == list(range(1, 9))
+
+def test_single_elimination_byes(players):
+    """6 jogadores numa chave de 8: as sementes 1 e 2 passam direto para a 2ª fase"""
+    users = players(6)
+    tournament = started(users)
+    first, second = nodes(tournament)[:4], nodes(tournament)[4:6]
+
+    assert [m.status for m in first] == ['bye', 'playing', 'bye', 'playing']
+    assert [first[0].winner_id, first[2].winner_id] == [users[0].id, users[1].id]
+    assert [(m.player1_id, m.pending_slots) for m in second] == [(users[0].id, 1), (users[1].id, 1)]
+
+def test_double_elimination_bracket_of_eight(players):
+    """Chave de perdedores 2-2-1-1 e final; todo perdedor da chave de vencedores cai nela"""
+    users = players(8)
+    tournament = started(users, 'double')
+    winners, losers = nodes(tournament, 'winners'), nodes(tournament, 'losers')
+    final, = nodes(tournament, 'final')
+
+    assert len(winners) == 7
+    assert [(m.round, m.position) for m in losers] == [(1, 0), (1, 1), (2, 0), (2, 1), (3, 0), (4, 0)]
+    by_id = {m.id: m for m in losers}
+
+    # Fase 1 dos vencedores: perdedores se enfrentam na fase 1 dos perdedores
+    assert [(by_id[m.loser_match_id].round, by_id[m.loser_match_id].position, m.loser_slot)
+            for m in winners[:4]] == [(1, 0, 1), (1, 0, 2), (1, 1, 1), (1, 1, 2)]
+    # Fase 2 cai invertida na fase 2 dos perdedores; a final dos vencedores, na fase 4
+    assert [(by_id[m.loser_match_id].round, by_id[m.loser_match_id].position, m.loser_slot)
+            for m in winners[4:]] == [(2, 1, 2), (2, 0, 2), (4, 0, 2)]
+
+    assert (winners[-1].next_match_id, winners[-1].next_slot) == (final.id, 1)
+    assert (losers[-1].next_match_id, losers[-1].next_slot) == (final.id, 2)
+    assert all(m.next_match_id for m in losers)
+
+def test_double_elimination_byes(players):
+    """Byes na primeira fase deixam vagas vazias na chave de perdedores, sem travar a chave"""
+    users = players(6)
+    tournament = started(users, 'double')
+    losers = nodes(tournament, 'losers')
+
+    assert [m.status for m in nodes(tournament, 'winners')[:4]] == ['bye', 'playing', 'bye', 'playing']
+    assert [m.pending_slots for m in losers[:2]] == [1, 1]
+
+    # Os dois jogos da 1ª fase: cada perdedor passa direto pela fase 1 dos perdedores
+    assert play_round(tournament) == 2
+    assert [m.status for m in nodes(tournament, 'losers')[:2]] == ['bye', 'bye']
+    assert TournamentMatch.query.filter_by(tournament_id=tournament.id, status='playing').count() == 2
+
+def test_results_advance_to_champion_payout(players):
+    """Semente 1 vence tudo: 3 fases, campeão recebe o prêmio menos a taxa"""
+    users = players(8)
+    tournament = started(users)
+
+    assert [play_round(tournament) for _ in range(3)] == [4, 2, 1]
+    tournament = db.session.get(Tournament, tournament.id)
+    assert tournament.status == 'finished' and tournament.winner_id == users[0].id
+
+    pool = 8 * ENTRY_FEE
+    fee = pool * Tournament.PLATFORM_FEE_RATE
+    assert tournament.platform_fee == fee
+    assert balance(users[0]) == INITIAL_BALANCE - ENTRY_FEE + pool - fee
+    assert [balance(user) for user in users[1:]] == [INITIAL_BALANCE - ENTRY_FEE] * 7
+    assert ledger.balance(tournament.escrow_account) == 0
+    assert ledger.balance(PLATFORM_FEE) >= fee
+
+    statuses = dict(db.session.query(TournamentEntry.user_id, TournamentEntry.status)
+                              .filter_by(tournament_id=tournament.id).all())
+    assert statuses.pop(users[0].id) == 'champion'
+    assert set(statuses.values()) == {'eliminated'}
+
+def test_finish_route_requires_shot_log(app, players):
+    """Jogo de torneio sem histórico de tacadas não termina pelo vencedor informado"""
+    users = players(2)
+    tournament = started(users)
+    match, = [m for m in nodes(tournament) if m.status == 'playing']
+    headers = {'Authorization': f"Bearer {create_access_token(identity=match.player1_id)}"}
+
+    response = app.test_client().post(f'/api/games/{match.game_id}/finish', headers=headers,
+                                      json={'winner_id': match.player1_id})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Jogo de torneio sem histórico de tacadas'
+    assert db.session.get(Game, match.game_id).status == 'playing'
+
+def test_starts_at_with_offset_stored_as_utc(app, players):
+    """Horário com fuso vira UTC sem fuso: a agenda continua comparável com utcnow"""
+    user, = players(1)
+    headers = {'Authorization': f"Bearer {create_access_token(identity=user.id)}"}
+    response = app.test_client().post('/api/tournaments/', headers=headers, json={
+        'name': 'Copa', 'starts_at': '2030-01-01T12:00:00-03:00'
+    })
+    assert response.status_code == 201
+
+    tournament = db.session.get(Tournament, response.get_json()['tournament']['id'])
+    assert tournament.starts_at == datetime(2030, 1, 1, 15, 0)
+    assert 0 <= tournament_engine._next_timeout()
@@ -0,0 +1,138 @@
+"""
+Teste da unidade de trabalho: um commit por operação de dinheiro
+
+Conta os commits ao aceitar, finalizar o jogo, liquidar (worker de
+liquidação) e cancelar uma aposta, e confere que uma falha no meio da
+unidade, ou uma saída antecipada com `abort`, não deixa dinheiro meio
+movimentado.
+
+Commits medidos antes da unidade de trabalho: aceitar 1, liquidar 3
+(aposta, jogo e o commit explícito de `finish_game`), cancelar 1.
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from src.models.database import abort, db, on_commit, unit_of_work
+from src.models.user import User
+from src.models.game import Game, Bet
+from src.models.ledger import LedgerEntry
+from src.services.settlement import SettlementWorker
+
+@pytest.fixture(scope='module')
+def app(make_app):
+    return make_app()
+
+@pytest.fixture(scope='module')
+def user_ids(app, create_users):
+    """Dois jogadores"""
+    with app.app_context():
+        return [user.id for user in create_users(2)]
+
+def test_accept_and_settle_commit_once(app, user_ids, open_bet, count_commits):
+    """Aceitar, finalizar e liquidar: um commit cada"""
+    with app.app_context():
+        creator_id, opponent_id = user_ids
+        bet = open_bet(creator_id)
+
+        with count_commits(app) as commits:
+            assert bet.accept_bet(opponent_id)[0]
+        assert len(commits) == 1, f"aceitar: {len(commits)} commits"
+
+        game = Game.query.filter_by(bet_id=bet.id).one()
+        game.status = 'playing'
+        db.session.commit()
+
+        with count_commits(app) as commits:
+            assert game.finish_game(opponent_id)[0]
+        assert len(commits) == 1, f"finalizar: {len(commits)} commits"
+        assert db.session.get(Bet, bet.id).status == 'matched'  # prêmio fica para o worker
+
+        with count_commits(app) as commits:
+            assert SettlementWorker().settle_pending() == 1
+        assert len(commits) == 1, f"liquidar: {len(commits)} commits"
+
+        assert db.session.get(Bet, bet.id).status == 'completed'
+        assert db.session.get(User, opponent_id).games_won == 1
+
+def test_cancel_commits_once(app, user_ids, open_bet, count_commits):
+    """Cancelar aposta aceita (reembolso dos dois): um commit"""
+    with app.app_context():
+        bet = open_bet(user_ids[0])
+        bet.accept_bet(user_ids[1])
+
+        with count_commits(app) as commits:
+            assert bet.cancel_bet()[0]
+        assert len(commits) == 1, f"cancelar: {len(commits)} commits"
+
+def test_failure_moves_nothing(app, user_ids, count_commits):
+    """Erro no meio da unidade: nem saldo, nem lançamento, nem efeito externo"""
+    with app.app_context():
+        user_id = user_ids[0]
+        balance = db.session.get(User, user_id).balance
+        entries = LedgerEntry.query.count()
+        effects = []
+
+        try:
+            with unit_of_work():
+                user = db.session.get(User, user_id)
+                user.update_balance(Decimal('-5.00'), 'adjustment')
+                with unit_of_work():  # aninhada: entra na externa
+                    user.update_balance(Decimal('-5.00'), 'adjustment')
+                on_commit(lambda: effects.append('publicado'))
+                raise RuntimeError('falha no meio da operação')
+        except RuntimeError:
+            pass
+
+        assert db.session.get(User, user_id).balance == balance
+        assert LedgerEntry.query.count() == entries
+        assert effects == []
+
+        with count_commits(app) as commits:
+            with unit_of_work():
+                db.session.get(User, user_id).update_balance(Decimal('-5.00'), 'adjustment')
+                on_commit(lambda: effects.append('publicado'))
+                assert effects == []
+        assert len(commits) == 1 and effects == ['publicado']
+        assert db.session.get(User, user_id).balance == balance - Decimal('5.00')
+
+def test_early_return_commits_nothing(app, user_ids, open_bet, count_commits):
+    """`return abort(...)` no meio da unidade: o que foi preparado é desfeito"""
+    with app.app_context():
+        user_id = user_ids[0]
+        balance = db.session.get(User, user_id).balance
+        entries = LedgerEntry.query.count()
+        effects = []
+
+        def operation():
+            with unit_of_work():
+                db.session.get(User, user_id).update_balance(Decimal('-5.00'), 'adjustment')
+                on_commit(lambda: effects.append('publicado'))
+                return abort(False, "Operação recusada")
+
+        with count_commits(app) as commits:
+            assert operation() == (False, "Operação recusada")
+        assert commits == [] and effects == []
+        assert db.session.get(User, user_id).balance == balance
+        assert LedgerEntry.query.count() == entries
+
+        # Saída antecipada de uma unidade aninhada (aposta não está em andamento)
+        bet = open_bet(user_id)
+        with count_commits(app) as commits:
+            with unit_of_work():
+                db.session.get(User, user_id).update_balance(Decimal('-5.00'), 'adjustment')
+                assert bet.complete_bet(user_ids[1]) == (False, "Aposta não está em andamento")
+        assert commits == []
+        assert db.session.get(User, user_id).balance == balance
+
+        # Exceção de uma unidade aninhada tratada por quem chamou: nada gravado
+        with unit_of_work():
+            db.session.get(User, user_id).update_balance(Decimal('-5.00'), 'adjustment')
+            try:
+                with unit_of_work():
+                    raise RuntimeError('falha na unidade aninhada')
+            except RuntimeError:
+                pass
+        assert db.session.get(User, user_id).balance == balance
+        assert LedgerEntry.query.count() == entries